@@ -0,0 +1,186 @@
+import os
+import math
+import time
+import logging
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+
+from backend.metrics import Counter, Gauge, Histogram
+from backend import deadlines
+
+# Admission control for the expensive stages. Each stage has a bounded number of slots;
+# callers beyond that wait in a per-lane queue, interactive requests ahead of bulk work.
+# A full queue, or a wait longer than the lane allows, is rejected straight away with
+# AdmissionRejected, which the API turns into a 429 with Retry-After.
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+
+# Lanes in priority order
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+ADMISSION_DEFAULT_LANE = os.getenv("ADMISSION_DEFAULT_LANE", INTERACTIVE)
+
+STAGE_CONCURRENCY = {
+    "extraction": int(os.getenv("ADMISSION_EXTRACTION_CONCURRENCY", str(os.cpu_count() or 4))),
+    # Keep these at least as large as the micro-batch sizes so batches can still fill
+    "embedding": int(os.getenv("ADMISSION_EMBEDDING_CONCURRENCY", "32")),
+    "llm": int(os.getenv("ADMISSION_LLM_CONCURRENCY", "4")),
+}
+LANE_MAX_QUEUE = {
+    INTERACTIVE: int(os.getenv("ADMISSION_INTERACTIVE_MAX_QUEUE", "32")),
+    BULK: int(os.getenv("ADMISSION_BULK_MAX_QUEUE", "256")),
+}
+LANE_MAX_WAIT_S = {
+    INTERACTIVE: float(os.getenv("ADMISSION_INTERACTIVE_MAX_WAIT_S", "15")),
+    BULK: float(os.getenv("ADMISSION_BULK_MAX_WAIT_S", "120")),
+}
+
+QUEUE_WAIT = Histogram("admission_queue_wait_seconds", "Time spent waiting for a stage slot.", ["stage", "lane"])
+QUEUE_DEPTH = Gauge("admission_queue_depth", "Callers currently waiting for a stage slot.", ["stage", "lane"])
+ACTIVE = Gauge("admission_active", "Stage slots currently in use.", ["stage"])
+REJECTED = Counter("admission_rejected_total", "Calls rejected by admission control.", ["stage", "lane", "reason"])
+
+_current_lane = contextvars.ContextVar("admission_lane", default=None)
+
+class AdmissionRejected(Exception):
+    def __init__(self, stage, lane, reason, retry_after):
+        super().__init__(f"Server busy: {stage} queue for {lane} requests is {reason}. Retry after {retry_after}s.")
+        self.stage = stage
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+def normalize_lane(lane):
+    lane = (lane or "").strip().lower()
+    return lane if lane in LANES else ADMISSION_DEFAULT_LANE
+
+def current_lane():
+    return _current_lane.get() or normalize_lane(ADMISSION_DEFAULT_LANE)
+
+def set_lane(lane):
+    # Returns a token for reset_lane
+    return _current_lane.set(normalize_lane(lane))
+
+def reset_lane(token):
+    _current_lane.reset(token)
+
+@contextmanager
+def lane(name):
+    token = set_lane(name)
+    try:
+        yield
+    finally:
+        reset_lane(token)
+
+class StageLimiter:
+    def __init__(self, stage, max_concurrency):
+        self.stage = stage
+        self.max_concurrency = max(1, max_concurrency)
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = {name: 0 for name in LANES}
+        # Moving average of how long a slot is held, used for Retry-After
+        self._avg_hold_s = 1.0
+
+    def _lanes_ahead_are_empty(self, lane_name, include_own=False):
+        for name in LANES:
+            if name == lane_name:
+                return not include_own or self._waiting[name] == 0
+            if self._waiting[name] > 0:
+                return False
+        return True
+
+    def _retry_after(self):
+        queued = sum(self._waiting.values()) + 1
+        return max(1, math.ceil(self._avg_hold_s * queued / self.max_concurrency))
+
+    def _reject(self, lane_name, reason):
+        retry_after = self._retry_after()
+        REJECTED.inc(stage=self.stage, lane=lane_name, reason=reason)
+        logging.warning(f"Admission: rejected {lane_name} call to {self.stage} ({reason}), retry after {retry_after}s")
+        raise AdmissionRejected(self.stage, lane_name, reason, retry_after)
+
+    def acquire(self, lane_name):
+        start = time.perf_counter()
+        with self._cond:
+            # Take a free slot only if nobody of equal or higher priority is already waiting for one
+            if not (self._active < self.max_concurrency and self._lanes_ahead_are_empty(lane_name, include_own=True)):
+                if self._waiting[lane_name] >= LANE_MAX_QUEUE[lane_name]:
+                    self._reject(lane_name, "full")
+                # Never queue past the request's own deadline
+                request_left = deadlines.remaining()
+                bound_by_request = request_left is not None and request_left < LANE_MAX_WAIT_S[lane_name]
+                deadline = start + (request_left if bound_by_request else LANE_MAX_WAIT_S[lane_name])
+                self._waiting[lane_name] += 1
+                QUEUE_DEPTH.inc(stage=self.stage, lane=lane_name)
+                admitted = False
+                try:
+                    while not (self._active < self.max_concurrency and self._lanes_ahead_are_empty(lane_name)):
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            if bound_by_request:
+                                deadlines.fail(self.stage)
+                            self._reject(lane_name, "timed out")
+                        self._cond.wait(remaining)
+                    admitted = True
+                finally:
+                    self._waiting[lane_name] -= 1
+                    QUEUE_DEPTH.dec(stage=self.stage, lane=lane_name)
+                    if not admitted:
+                        # Lower-priority waiters may have been held back by this one
+                        self._cond.notify_all()
+            self._active += 1
+        ACTIVE.inc(stage=self.stage)
+        QUEUE_WAIT.observe(time.perf_counter() - start, stage=self.stage, lane=lane_name)
+        return time.perf_counter()
+
+    def release(self, acquired_at):
+        held = time.perf_counter() - acquired_at
+        with self._cond:
+            self._active -= 1
+            self._avg_hold_s = 0.8 * self._avg_hold_s + 0.2 * held
+            # Waiters of several lanes share the condition, so wake them all to re-check priority
+            self._cond.notify_all()
+        ACTIVE.dec(stage=self.stage)
+
+    @contextmanager
+    def slot(self, lane_name=None):
+        acquired_at = self.acquire(normalize_lane(lane_name or current_lane()))
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "waiting": dict(self._waiting),
+                "avg_hold_s": round(self._avg_hold_s, 4),
+            }
+
+limiters = {stage: StageLimiter(stage, limit) for stage, limit in STAGE_CONCURRENCY.items()}
+
+def limit_stage(stage):
+    # Decorator: the call runs only once a slot for stage is free, in the caller's lane
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return fn(*args, **kwargs)
+            with limiters[stage].slot():
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_stats():
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "stages": {stage: limiter.get_stats() for stage, limiter in limiters.items()},
+        "max_queue": dict(LANE_MAX_QUEUE),
+        "max_wait_s": dict(LANE_MAX_WAIT_S),
+    }
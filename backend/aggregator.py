@@ -1,33 +1,101 @@
 import json
+import numpy as np
 
-def aggregate_scores(
+# Default verdict cut-offs; /rescore can try others without touching stored evaluations
+VERDICT_HIGH_THRESHOLD = 80
+VERDICT_MEDIUM_THRESHOLD = 50
+
+def validate_weights(hard_match_weight, semantic_match_weight):
+    if not (0 <= hard_match_weight <= 1 and 0 <= semantic_match_weight <= 1 and (hard_match_weight + semantic_match_weight) > 0):
+        raise ValueError("Weights must be between 0 and 1 and their sum must be greater than 0.")
+
+def validate_verdict_thresholds(high_threshold, medium_threshold):
+    if not (0 <= medium_threshold <= high_threshold <= 100):
+        raise ValueError("Verdict thresholds must satisfy 0 <= medium_threshold <= high_threshold <= 100.")
+
+def available_scores(
+    semantic_fit_score,
+    hard_match_weight: float = 0.5,
+    semantic_match_weight: float = 0.5
+):
+    # A semantic stage that ran out of request time leaves semantic_fit_score as None;
+    # the final score then rests on the hard match alone.
+    # Returns (semantic_fit_score, hard_match_weight, semantic_match_weight) to score with.
+    if semantic_fit_score is None:
+        return 0, 1.0, 0.0
+    return semantic_fit_score, hard_match_weight, semantic_match_weight
+
+def compute_final_relevance_score(
     hard_match_score: int,
     semantic_fit_score: int,
-    llm_analysis_result: str, # Expecting the JSON string output from LLM
     hard_match_weight: float = 0.5,
     semantic_match_weight: float = 0.5
 ):
     # Validate weights
-    if not (0 <= hard_match_weight <= 1 and 0 <= semantic_match_weight <= 1 and (hard_match_weight + semantic_match_weight) > 0):
-        raise ValueError("Weights must be between 0 and 1 and their sum must be greater than 0.")
+    validate_weights(hard_match_weight, semantic_match_weight)
 
     # Normalize weights if their sum is not 1 (optional, but good for consistency)
     total_weight = hard_match_weight + semantic_match_weight
     normalized_hard_match_weight = hard_match_weight / total_weight
     normalized_semantic_match_weight = semantic_match_weight / total_weight
 
-    # Calculate final relevance score
-    final_relevance_score = int(
+    # The final score only depends on the cheap stages, so it can be known before any LLM call
+    return int(
         (hard_match_score * normalized_hard_match_weight) +
         (semantic_fit_score * normalized_semantic_match_weight)
     )
-    
-    # Determine suitability verdict
+
+def derive_suitability_verdict(
+    final_relevance_score: int,
+    high_threshold: float = VERDICT_HIGH_THRESHOLD,
+    medium_threshold: float = VERDICT_MEDIUM_THRESHOLD
+):
     suitability_verdict = "Low"
-    if final_relevance_score >= 80:
+    if final_relevance_score >= high_threshold:
         suitability_verdict = "High"
-    elif final_relevance_score >= 50:
+    elif final_relevance_score >= medium_threshold:
         suitability_verdict = "Medium"
+    return suitability_verdict
+
+def rescore_arrays(
+    hard_match_scores,
+    semantic_fit_scores,
+    hard_match_weight: float = 0.5,
+    semantic_match_weight: float = 0.5,
+    high_threshold: float = VERDICT_HIGH_THRESHOLD,
+    medium_threshold: float = VERDICT_MEDIUM_THRESHOLD,
+    semantic_missing=None
+):
+    # Vectorized compute_final_relevance_score + derive_suitability_verdict over stored scores.
+    # Gives the same integers and verdicts as the per-candidate functions.
+    # semantic_missing is a boolean mask of rows without a semantic score; like available_scores,
+    # those are scored on the hard match alone.
+    validate_weights(hard_match_weight, semantic_match_weight)
+    validate_verdict_thresholds(high_threshold, medium_threshold)
+    total_weight = hard_match_weight + semantic_match_weight
+    hard = np.asarray(hard_match_scores, dtype=np.float64)
+    semantic = np.asarray(semantic_fit_scores, dtype=np.float64)
+    combined = hard * (hard_match_weight / total_weight) + semantic * (semantic_match_weight / total_weight)
+    if semantic_missing is not None:
+        combined = np.where(np.asarray(semantic_missing, dtype=bool), hard, combined)
+    final_scores = np.trunc(combined).astype(np.int64)
+    verdicts = np.where(final_scores >= high_threshold, "High", np.where(final_scores >= medium_threshold, "Medium", "Low"))
+    return final_scores, verdicts
+
+def aggregate_scores(
+    hard_match_score: int,
+    semantic_fit_score: int,
+    llm_analysis_result: str, # Expecting the JSON string output from LLM
+    hard_match_weight: float = 0.5,
+    semantic_match_weight: float = 0.5
+):
+    final_relevance_score = compute_final_relevance_score(
+        hard_match_score,
+        semantic_fit_score,
+        hard_match_weight,
+        semantic_match_weight
+    )
+    suitability_verdict = derive_suitability_verdict(final_relevance_score)
 
     # Parse LLM analysis result
     try:
@@ -1,22 +1,50 @@
 import os
 import sys
 import json
+import hmac
+import time
 import logging
+import tempfile
 from datetime import datetime
-from flask import Flask, jsonify, request
+from flask import Flask, Request, jsonify, request, Response, stream_with_context, g, send_from_directory
+from sqlalchemy import or_
 
 # Add the parent directory to sys.path to allow absolute imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from backend.parser import parse_resume, parse_job_description # Import both functions
+from backend.parser import parse_resume, as_seekable_stream, UPLOAD_SPOOL_MAX_MEMORY # Import the parser
 from backend.matcher import match_resume_to_jd # Import the matching function
-from backend.semantic_matcher import calculate_semantic_fit_score # Import the semantic matching function
-from backend.llm_analyzer import analyze_match, generate_feedback # Import both LLM functions
-from backend.aggregator import aggregate_scores # Import the aggregation function
-from backend.database.database import init_db, SessionLocal # Import database initialization and session
-from backend.database.models import Resume, JobDescription, EvaluationResult, ImprovementSuggestion, AuditTrail # Import models
+from backend.semantic_matcher import calculate_semantic_fit_score, embedding_batcher # Import the semantic matching function
+from backend.llm_analyzer import analyze_match, generate_feedback, generation_batcher # Import both LLM functions
+from backend.cascade import screen_candidates # Tiered LLM cascade for bulk screening
+from backend.pipeline import evaluate_stages, run_evaluation, StageError # Staged evaluation pipeline
+from backend.metrics import render_metrics, time_stage, IN_FLIGHT, REQUESTS, REQUEST_LATENCY, ERRORS # Prometheus metrics
+from backend import profiling # Opt-in per-request profiling
+from backend import retention # Archiving of old evaluations and audit rows
+from backend import admission # Per-stage concurrency limits and priority lanes
+from backend.admission import AdmissionRejected
+from backend import deadlines # Per-request time budgets
+from backend import coalescing # Single-flight sharing of identical in-flight evaluations
+from backend.deadlines import DeadlineExceeded
+from backend.jd_registry import resolve_jd, jd_to_dict, load_jd, JDNotFoundError # Registered JDs with precomputed artifacts
+from backend.rescoring import resolve_scoring_params, save_scoring_profile, rescore_jd, profile_to_dict, ScoringProfileNotFoundError # Re-ranking of stored evaluations
+from backend.persistence import save_evaluation # Evaluation rows shared with the batch CLI
+from backend.export import parse_export_filters, iter_export_rows, gzip_stream, export_filename, ExportError, ENCODERS as EXPORT_ENCODERS, EXPORT_MIMETYPES # Streaming evaluation export
+from backend.leaderboard import leaderboard_page, LEADERBOARD_DEFAULT_LIMIT, LEADERBOARD_MAX_LIMIT # Keyset-paginated top candidates per JD
+from backend.database.score_stats import parse_stats_filters, score_stats_summary, rebuild_score_stats, StatsError # Summary tables behind /stats
+from backend.database.near_duplicates import near_duplicate_report, index_missing_resumes, NEAR_DUPLICATE_THRESHOLD # MinHash LSH near-duplicate resumes
+from backend.parse_results import as_json_value # Typed parse results in API payloads
+from backend.database.database import init_db, SessionLocal, ReadSessionLocal # Import database initialization and sessions (ReadSessionLocal for GET endpoints)
+from backend.database.models import Resume, JobDescription, EvaluationResult, ImprovementSuggestion, AuditTrail, ScoringProfile # Import models
+
+class SpooledRequest(Request):
+    # Keep uploads in memory up to UPLOAD_SPOOL_MAX_MEMORY; larger ones spill to an
+    # anonymous temp file that is removed as soon as the stream is closed.
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY)
 
 app = Flask(__name__)
+app.request_class = SpooledRequest
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -28,6 +56,52 @@ def initialize_database():
     # In a real app, you might want a more sophisticated init strategy.
     init_db()
 
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    g.metrics_start = time.perf_counter()
+    IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+# Endpoints whose work always runs in the bulk lane, whatever the client asks for
+BULK_ENDPOINTS = {"/bulk_aggregate_match_results"}
+
+@app.before_request
+def assign_admission_lane():
+    # X-Request-Priority: interactive|bulk picks the lane for this request's expensive stages.
+    # Set on every request, so a reused worker thread never inherits the previous lane.
+    if request.url_rule and request.url_rule.rule in BULK_ENDPOINTS:
+        admission.set_lane(admission.BULK)
+    else:
+        admission.set_lane(request.headers.get("X-Request-Priority"))
+
+@app.before_request
+def start_request_deadline():
+    # X-Request-Deadline-Ms sets this request's time budget; otherwise the configured default applies.
+    # Bulk screening has no default budget unless BULK_REQUEST_DEADLINE_S is set.
+    is_bulk = bool(request.url_rule and request.url_rule.rule in BULK_ENDPOINTS)
+    default_s = deadlines.BULK_REQUEST_DEADLINE_S if is_bulk else deadlines.REQUEST_DEADLINE_S
+    deadlines.set_budget(deadlines.parse_budget(request.headers.get(deadlines.DEADLINE_HEADER), default_s))
+
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    response = jsonify({"error": str(e), "stage": e.stage, "lane": e.lane, "retry_after": e.retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+@app.after_request
+def record_request_status(response):
+    if "metrics_endpoint" in g:
+        REQUESTS.inc(endpoint=g.metrics_endpoint, status=str(response.status_code))
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # Runs after streamed responses have been fully sent, so in-flight covers the whole stream
+    if "metrics_start" in g:
+        REQUEST_LATENCY.observe(time.perf_counter() - g.metrics_start, endpoint=g.metrics_endpoint)
+        IN_FLIGHT.dec(endpoint=g.metrics_endpoint)
+
 # Helper function to get database session
 def get_db():
     db = SessionLocal()
@@ -36,14 +110,184 @@ def get_db():
     finally:
         db.close()
 
-UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "ok", "time": datetime.now().isoformat()}), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+# Admin endpoints fail closed: they need ADMIN_TOKEN to be set and X-Admin-Token to match it
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def is_admin_request():
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), ADMIN_TOKEN.encode())
+
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+def admin_profiling():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    if request.method == 'POST':
+        data = request.json or {}
+        try:
+            settings = profiling.set_profiling(data.get('enabled'), data.get('sample_rate'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        logging.info(f"Profiling settings updated: {settings}")
+        return jsonify(settings), 200
+    return jsonify(profiling.profiling_settings), 200
+
+@app.route('/admin/profiles', methods=['GET'])
+def admin_list_profiles():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    return jsonify(profiling.list_profiles()), 200
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def admin_download_profile(profile_id):
+    # ?format=prof (default) returns the raw cProfile dump for pstats/snakeviz, ?format=txt the summary
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    file_format = request.args.get('format', 'prof')
+    if not profiling.is_valid_profile_id(profile_id) or file_format not in ('prof', 'txt'):
+        return jsonify({'error': 'Invalid profile id or format'}), 400
+    filename = f"{profile_id}.{file_format}"
+    if not os.path.exists(os.path.join(profiling.PROFILE_DIR, filename)):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(os.path.abspath(profiling.PROFILE_DIR), filename, as_attachment=(file_format == 'prof'))
+
+@app.route('/admin/retention', methods=['POST'])
+def admin_run_retention():
+    # Body: older_than_days (default RETENTION_DAYS), dry_run
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    data = request.get_json(silent=True) or {}
+    try:
+        older_than_days = int(data.get('older_than_days', retention.RETENTION_DAYS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'older_than_days must be an integer'}), 400
+    if older_than_days < 0:
+        return jsonify({'error': 'older_than_days must not be negative'}), 400
+    db = SessionLocal()
+    try:
+        return jsonify(retention.archive_expired(db, older_than_days, dry_run=bool(data.get('dry_run')))), 200
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Retention run failed: {e}", exc_info=True)
+        return jsonify({'error': f'Retention run failed: {str(e)}'}), 500
+    finally:
+        db.close()
+
+@app.route('/admin/stats/rebuild', methods=['POST'])
+def admin_rebuild_stats():
+    # Recomputes the /stats summary tables from the stored and archived evaluations
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    db = SessionLocal()
+    try:
+        count = rebuild_score_stats(db)
+        db.add(AuditTrail(evaluation_id=None, action="Score statistics rebuilt", details=f"From {count} evaluations"))
+        db.commit()
+        return jsonify({'evaluations': count}), 200
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Score statistics rebuild failed: {e}", exc_info=True)
+        return jsonify({'error': f'Score statistics rebuild failed: {str(e)}'}), 500
+    finally:
+        db.close()
+
+@app.route('/admin/near_duplicates/reindex', methods=['POST'])
+def admin_reindex_near_duplicates():
+    # Adds resumes stored before the near-duplicate index existed
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    db = SessionLocal()
+    try:
+        count = index_missing_resumes(db)
+        db.add(AuditTrail(evaluation_id=None, action="Near-duplicate index rebuilt", details=f"Indexed {count} resumes"))
+        db.commit()
+        return jsonify({'indexed': count}), 200
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Near-duplicate reindex failed: {e}", exc_info=True)
+        return jsonify({'error': f'Near-duplicate reindex failed: {str(e)}'}), 500
+    finally:
+        db.close()
+
+@app.route('/admin/archives', methods=['GET'])
+def admin_list_archives():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    return jsonify(retention.list_archives()), 200
+
+def read_archive_filters(values):
+    # Shared by archive queries (query string) and restores (JSON body). Returns (filters, None) or (None, error).
+    try:
+        ids = values.get('ids')
+        if isinstance(ids, str):
+            ids = [int(i) for i in ids.split(',') if i.strip()]
+        return {
+            'month_from': values.get('month_from'),
+            'month_to': values.get('month_to'),
+            'jd_id': int(values['jd_id']) if values.get('jd_id') is not None else None,
+            'ids': [int(i) for i in ids] if ids else None,
+            'limit': int(values['limit']) if values.get('limit') is not None else None,
+        }, None
+    except (TypeError, ValueError):
+        return None, 'jd_id, ids and limit must be integers'
+
+@app.route('/admin/archives/<kind>', methods=['GET'])
+def admin_query_archive(kind):
+    # ?month_from=YYYY-MM&month_to=YYYY-MM&jd_id=&ids=1,2,3&limit=
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    if kind not in retention.ARCHIVE_KINDS:
+        return jsonify({'error': f'Unknown archive kind: {kind}'}), 404
+    filters, error = read_archive_filters(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(retention.query_archive(kind, **filters)), 200
+
+@app.route('/admin/archives/<kind>/restore', methods=['POST'])
+def admin_restore_archive(kind):
+    # Same filters as the query endpoint, in the JSON body
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden: requires ADMIN_TOKEN'}), 403
+    if kind not in retention.ARCHIVE_KINDS:
+        return jsonify({'error': f'Unknown archive kind: {kind}'}), 404
+    filters, error = read_archive_filters(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'error': error}), 400
+    if not any(filters.values()):
+        return jsonify({'error': 'Give at least one filter (month_from, month_to, jd_id, ids or limit)'}), 400
+    db = SessionLocal()
+    try:
+        counts = retention.restore_records(db, kind, retention.query_archive(kind, **filters))
+        db.commit()
+        return jsonify(counts), 200
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Archive restore failed: {e}", exc_info=True)
+        return jsonify({'error': f'Archive restore failed: {str(e)}'}), 500
+    finally:
+        db.close()
+
+@app.route('/admission_stats', methods=['GET'])
+def admission_stats():
+    return jsonify(admission.get_stats()), 200
+
+@app.route('/coalescing_stats', methods=['GET'])
+def coalescing_stats():
+    return jsonify(coalescing.get_stats()), 200
+
+@app.route('/batching_stats', methods=['GET'])
+def batching_stats():
+    return jsonify({
+        "embedding": embedding_batcher.get_stats(),
+        "text_generation": generation_batcher.get_stats()
+    }), 200
+
 @app.route('/')
 def hello_world():
     return "Hello from Flask Backend!"
@@ -57,16 +301,14 @@ def upload_resume():
         return jsonify({'error': 'No selected file'}), 400
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
         
         try:
-            parsed_data = parse_resume(filepath)
-            resume_text = parsed_data.get('raw_text', '') # Ensure raw_text is extracted
+            # Parsed straight from the upload stream, no copy under uploads/
+            parsed_data = parse_resume(file.stream, filename)
             
             db = SessionLocal()
             try:
-                new_resume = Resume(filename=filename, raw_text=resume_text, parsed_data=json.dumps(parsed_data))
+                new_resume = Resume(filename=filename, raw_text=parsed_data.raw_text, parsed_data=parsed_data.to_storage())
                 db.add(new_resume)
                 db.flush() # Flush to get the ID for audit trail
                 
@@ -77,13 +319,18 @@ def upload_resume():
                 return jsonify({
                     'message': 'Resume uploaded and parsed successfully!', 
                     'resume_id': new_resume.id,
-                    'parsed_data': parsed_data
+                    # Set by the near-duplicate index when the resume was stored
+                    'near_duplicate_of': new_resume.near_duplicate_of,
+                    'near_duplicate_similarity': new_resume.near_duplicate_similarity,
+                    'parsed_data': parsed_data.to_dict()
                 }), 200
             except Exception as e:
                 db.rollback()
                 return jsonify({'error': f'Database error: {str(e)}'}), 500
             finally:
                 db.close()
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return jsonify({'error': f'Error parsing resume: {str(e)}'}), 500
     return jsonify({'error': 'File type not allowed'}), 400
@@ -100,31 +347,101 @@ def upload_jd():
     if not jd_text:
         return jsonify({'error': 'No job description provided'}), 400
     
+    # Registration is an upsert on the JD's content hash: the same text always maps to the same jd_id
     try:
-        parsed_jd = parse_job_description(jd_text)
-        
-        db = SessionLocal()
+        registered_jd, created = resolve_jd(jd_text=jd_text)
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Error registering job description: {str(e)}'}), 500
+    return jsonify({
+        'message': 'Job Description parsed successfully!' if created else 'Job Description already registered.',
+        'jd_id': registered_jd['id'],
+        'content_hash': registered_jd['content_hash'],
+        'created': created,
+        'parsed_data': registered_jd['parsed_data'].to_dict()
+    }), 200
+
+@app.route('/jds/<int:jd_id>', methods=['GET'])
+def get_jd(jd_id):
+    db = SessionLocal()
+    try:
+        registered_jd = jd_to_dict(load_jd(db, jd_id))
+        db.commit()  # load_jd may have backfilled artifacts for older rows
+    except JDNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': f'Database fetch error: {str(e)}'}), 500
+    finally:
+        db.close()
+    return jsonify({
+        'jd_id': registered_jd['id'],
+        'content_hash': registered_jd['content_hash'],
+        'role_title': registered_jd['role_title'],
+        'parsed_data': registered_jd['parsed_data'].to_dict(),
+        'artifacts': registered_jd['artifacts']
+    }), 200
+
+@app.route('/jds/<int:jd_id>/leaderboard', methods=['GET'])
+def get_jd_leaderboard(jd_id):
+    # ?limit=N (default 20, max 200) and ?cursor=<next_cursor of the previous page>
+    try:
+        limit = int(request.args.get('limit', LEADERBOARD_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= LEADERBOARD_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {LEADERBOARD_MAX_LIMIT}'}), 400
+    db = ReadSessionLocal()
+    try:
+        if db.get(JobDescription, jd_id) is None:
+            return jsonify({'error': f'Job description {jd_id} not found'}), 404
         try:
-            new_jd = JobDescription(role_title=parsed_jd.get('Role Title', 'N/A'), raw_text=jd_text, parsed_data=json.dumps(parsed_jd))
-            db.add(new_jd)
-            db.flush() # Flush to get the ID for audit trail
-            
-            audit_entry = AuditTrail(evaluation_id=None, action="Job Description uploaded and parsed", details=f"JD ID: {new_jd.id}, Role: {parsed_jd.get('Role Title', 'N/A')}")
-            db.add(audit_entry)
-            db.commit()
-            
-            return jsonify({
-                'message': 'Job Description parsed successfully!', 
-                'jd_id': new_jd.id,
-                'parsed_data': parsed_jd
-            }), 200
-        except Exception as e:
-            db.rollback()
-            return jsonify({'error': f'Database error: {str(e)}'}), 500
-        finally:
-            db.close()
+            page = leaderboard_page(db, jd_id, limit, request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        return jsonify(page), 200
+    except Exception as e:
+        return jsonify({'error': f'Database fetch error: {str(e)}'}), 500
+    finally:
+        db.close()
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    # Score distributions from the summary tables (backend/database/score_stats.py).
+    # ?jd_id=, ?date_from=/?date_to= (UTC days, inclusive) or ?days=N, ?top_missing=N
+    try:
+        filters = parse_stats_filters(request.args)
+    except StatsError as e:
+        return jsonify({'error': str(e)}), 400
+    db = ReadSessionLocal()
+    try:
+        return jsonify(score_stats_summary(db, filters)), 200
+    except Exception as e:
+        return jsonify({'error': f'Database fetch error: {str(e)}'}), 500
+    finally:
+        db.close()
+
+@app.route('/resumes/duplicates', methods=['GET'])
+def get_resume_duplicates():
+    # Groups of near-duplicate resumes across the corpus. ?threshold= (0-1, default
+    # NEAR_DUPLICATE_THRESHOLD) and ?limit= (groups returned, default 100)
+    try:
+        threshold = float(request.args.get('threshold', NEAR_DUPLICATE_THRESHOLD))
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'threshold must be a number and limit an integer'}), 400
+    if not 0 < threshold <= 1:
+        return jsonify({'error': 'threshold must be greater than 0 and at most 1'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    db = ReadSessionLocal()
+    try:
+        return jsonify(near_duplicate_report(db, threshold, limit)), 200
     except Exception as e:
-        return jsonify({'error': f'Error parsing job description: {str(e)}'}), 500
+        return jsonify({'error': f'Database fetch error: {str(e)}'}), 500
+    finally:
+        db.close()
 
 @app.route('/match_resume_jd', methods=['POST'])
 def match_resume_jd_endpoint():
@@ -174,213 +491,549 @@ def llm_feedback_endpoint():
     llm_feedback = generate_feedback(resume_text, jd_text)
     return jsonify(llm_feedback), 200
 
+def validate_aggregation_params(resume_filename, job_description_text, hard_match_weight_str, semantic_match_weight_str, cascade_threshold_str, jd_id_str=None):
+    # Framework-independent validation shared by the Flask and ASGI servers.
+    # Either job_description_text or the jd_id of a registered JD must be given.
+    # Returns (params, None) or (None, (error_message, status_code)).
+    if not resume_filename or not (job_description_text or jd_id_str):
+        logging.error("Validation Error: Missing resume file or job description text.")
+        return None, ("Missing resume file or job description text", 400)
+
+    try:
+        jd_id = int(jd_id_str) if jd_id_str else None
+    except ValueError:
+        logging.error(f"Validation Error: Invalid jd_id: {jd_id_str}")
+        return None, ("Invalid format for jd_id", 400)
+
+    try:
+        hard_match_weight = float(hard_match_weight_str) if hard_match_weight_str else 0.5
+        semantic_match_weight = float(semantic_match_weight_str) if semantic_match_weight_str else 0.5
+        if not (0 <= hard_match_weight <= 1 and 0 <= semantic_match_weight <= 1):
+            logging.error(f"Validation Error: Invalid weight values. Hard: {hard_match_weight}, Semantic: {semantic_match_weight}")
+            return None, ("Invalid hard_match_weight or semantic_match_weight. Must be between 0 and 1.", 400)
+    except ValueError:
+        logging.error(f"Validation Error: Could not convert weights to float. Hard: {hard_match_weight_str}, Semantic: {semantic_match_weight_str}", exc_info=True)
+        return None, ("Invalid format for hard_match_weight or semantic_match_weight", 400)
+
+    try:
+        cascade_threshold = float(cascade_threshold_str) if cascade_threshold_str else None
+    except ValueError:
+        logging.error(f"Validation Error: Invalid cascade_threshold: {cascade_threshold_str}")
+        return None, ("Invalid format for cascade_threshold", 400)
+
+    logging.debug(f"Received request for aggregation. Resume: {resume_filename}, JD ID: {jd_id}, JD length: {len(job_description_text or '')}, Weights: Hard={hard_match_weight}, Semantic={semantic_match_weight}")
+    return {
+        "jd_id": jd_id,
+        "job_description_text": job_description_text,
+        "hard_match_weight": hard_match_weight,
+        "semantic_match_weight": semantic_match_weight,
+        "cascade_threshold": cascade_threshold
+    }, None
+
+def read_aggregation_form():
+    # Flask wrapper around validate_aggregation_params. Returns (params, None) or (None, error_response).
+    if "resume_file" not in request.files:
+        logging.error("Validation Error: No resume file part in request.")
+        return None, (jsonify({"error": "No resume file part"}), 400)
+
+    resume_file = request.files["resume_file"]
+    params, error = validate_aggregation_params(
+        resume_file.filename,
+        request.form.get("job_description_text", ""),
+        request.form.get("hard_match_weight"),
+        request.form.get("semantic_match_weight"),
+        request.form.get("cascade_threshold"),
+        request.form.get("jd_id")
+    )
+    if error:
+        return None, (jsonify({"error": error[0]}), error[1])
+    params["resume_file"] = resume_file
+    return params, None
+
+def resolve_registered_jd(params):
+    # Looks up params["jd_id"] or registers params["job_description_text"].
+    # Returns (registered_jd, None) or (None, (error_message, status_code)).
+    try:
+        registered_jd, _ = resolve_jd(params["jd_id"], params["job_description_text"])
+        return registered_jd, None
+    except JDNotFoundError as e:
+        return None, (str(e), 404)
+    except AdmissionRejected:
+        raise
+    except DeadlineExceeded:
+        return None, ("Request deadline exceeded while registering the job description", 504)
+    except Exception as e:
+        ERRORS.inc(stage="jd_registry")
+        logging.error(f"JD Registry Error: Failed to resolve job description. Error: {e}", exc_info=True)
+        return None, (f"Failed to parse job description: {str(e)}", 500)
+
+class PersistenceError(Exception):
+    # Saving a finished evaluation failed; the pipeline itself succeeded
+    pass
+
+def persist_pipeline_results(resume_filename, jd_id, stage_results):
+    # Stores one finished pipeline run against a registered JD. Returns the new EvaluationResult id.
+    session = SessionLocal()
+    try:
+        parsed_resume_data = stage_results["parsed_resume"]
+        aggregated_results = stage_results["aggregate"]
+        jd_db = session.get(JobDescription, jd_id)
+
+        new_resume_db, evaluation_result = save_evaluation(
+            session,
+            jd_db,
+            resume_filename,
+            parsed_resume_data.raw_text,
+            parsed_resume_data,
+            stage_results["hard_match"],
+            stage_results["semantic_fit"],
+            aggregated_results,
+            stage_results["llm_analysis"]
+        )
+        with time_stage("db_commit"):
+            session.commit()
+        logging.info(f"Aggregation results saved for Resume ID: {new_resume_db.id}, JD ID: {jd_id}")
+        return evaluation_result.id
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def open_upload(resume_file):
+    # Uploads are parsed from their request stream (see SpooledRequest), so concurrent
+    # uploads with the same filename never collide on disk.
+    resume_filename = secure_filename(resume_file.filename)
+    with time_stage("upload_read"):
+        resume_stream = as_seekable_stream(resume_file.stream)
+    return resume_filename, resume_stream
+
+def close_upload(resume_stream):
+    if resume_stream is not None:
+        resume_stream.close()
+
 @app.route('/aggregate_match_results', methods=['POST'])
+@profiling.profile_request
 def aggregate_match_results_endpoint():
-    resume_filepath = None  # Initialize to None
-    session = None
+    resume_stream = None  # Initialize to None
     try:
         # 1. Input Validation
-        if "resume_file" not in request.files:
-            logging.error("Validation Error: No resume file part in request.")
-            return jsonify({"error": "No resume file part"}), 400
+        params, error_response = read_aggregation_form()
+        if error_response:
+            return error_response
+
+        # Read resume upload
+        try:
+            resume_filename, resume_stream = open_upload(params["resume_file"])
+        except Exception as e:
+            logging.error(f"Upload Error: Could not read resume file {params['resume_file'].filename}. Error: {e}", exc_info=True)
+            return jsonify({"error": f"Could not read resume file: {str(e)}"}), 500
 
-        resume_file = request.files["resume_file"]
-        job_description_text = request.form.get("job_description_text", "")
-        hard_match_weight_str = request.form.get("hard_match_weight")
-        semantic_match_weight_str = request.form.get("semantic_match_weight")
+        # Look up or register the JD once; its parse, artifacts and embedding are reused
+        registered_jd, error = resolve_registered_jd(params)
+        if error:
+            return jsonify({"error": error[0]}), error[1]
 
-        if resume_file.filename == "" or not job_description_text:
-            logging.error("Validation Error: Missing resume file or job description text.")
-            return jsonify({"error": "Missing resume file or job description text"}), 400
+        def evaluate_and_save():
+            # 2-7. Parse, match, analyze and aggregate (see backend/pipeline.py)
+            stage_results = run_evaluation(
+                resume_stream,
+                resume_filename,
+                registered_jd["raw_text"],
+                params["hard_match_weight"],
+                params["semantic_match_weight"],
+                params["cascade_threshold"],
+                registered_jd
+            )
+            # 8. Database Operations
+            try:
+                evaluation_id = persist_pipeline_results(resume_filename, registered_jd["id"], stage_results)
+            except Exception as e:
+                raise PersistenceError(e) from e
+            return evaluation_id, stage_results["aggregate"]
 
+        # An identical request already running (double-click, client retry) is waited for, not repeated
         try:
-            hard_match_weight = float(hard_match_weight_str) if hard_match_weight_str else 0.5
-            semantic_match_weight = float(semantic_match_weight_str) if semantic_match_weight_str else 0.5
-            if not (0 <= hard_match_weight <= 1 and 0 <= semantic_match_weight <= 1):
-                logging.error(f"Validation Error: Invalid weight values. Hard: {hard_match_weight}, Semantic: {semantic_match_weight}")
-                return jsonify({"error": "Invalid hard_match_weight or semantic_match_weight. Must be between 0 and 1."}), 400
-        except ValueError:
-            logging.error(f"Validation Error: Could not convert weights to float. Hard: {hard_match_weight_str}, Semantic: {semantic_match_weight_str}", exc_info=True)
-            return jsonify({"error": "Invalid format for hard_match_weight or semantic_match_weight"}), 400
+            (evaluation_id, aggregated_results), _ = coalescing.evaluations.do(
+                coalescing.evaluation_key(resume_stream, registered_jd, params),
+                evaluate_and_save
+            )
+        except StageError as e:
+            ERRORS.inc(stage=e.stage)
+            return jsonify({"error": e.message}), e.status_code
+        except PersistenceError as e:
+            ERRORS.inc(stage="database")
+            logging.error(f"Database Error: Failed during database operations. Error: {e}", exc_info=True)
+            return jsonify({"error": f"Database interaction error: {str(e)}"}), 500
+        except DeadlineExceeded:
+            return jsonify({"error": "Request deadline exceeded"}), 504
 
-        logging.debug(f"Received request for aggregation. Resume: {resume_file.filename}, JD length: {len(job_description_text)}, Weights: Hard={hard_match_weight}, Semantic={semantic_match_weight}")
+        return jsonify({
+            "message": "Aggregation complete and results saved!",
+            "evaluation_id": evaluation_id,
+            "results": aggregated_results
+        }), 200
 
-        # Save resume file
-        resume_filename = secure_filename(resume_file.filename)
-        resume_filepath = os.path.join(UPLOAD_FOLDER, resume_filename)
-        try:
-            resume_file.save(resume_filepath)
-            logging.debug(f"Resume file saved to {resume_filepath}")
-        except Exception as e:
-            logging.error(f"File Save Error: Could not save resume file {resume_filename}. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Could not save resume file: {str(e)}"}), 500
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        ERRORS.inc(stage="unhandled")
+        logging.error(f"Unhandled Error in /aggregate_match_results: {e}", exc_info=True)
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+    finally:
+        close_upload(resume_stream)
 
-        parsed_resume_data = {}
-        resume_raw_text = ""
+def stream_event(stage, result=None, **extra):
+    # One NDJSON line per event
+    event = {"stage": stage}
+    if result is not None:
+        # LLM stages return JSON strings; decode them so clients get structured data
+        if stage in ("llm_analysis", "feedback") and isinstance(result, str):
+            try:
+                result = json.loads(result)
+            except json.JSONDecodeError:
+                pass
+        event["result"] = as_json_value(result)
+    event.update(extra)
+    return json.dumps(event) + "\n"
 
-        # 2. Parse Resume
-        try:
-            parsed_resume_data = parse_resume(resume_filepath)
-            resume_raw_text = parsed_resume_data.get("raw_text", "")
-            if not resume_raw_text:
-                logging.warning(f"Resume Parsing Warning: No raw text extracted from {resume_filename}.")
-            logging.debug(f"Resume parsed: {json.dumps(parsed_resume_data.get('Name', 'N/A'))}")
-        except Exception as e:
-            logging.error(f"Resume Parsing Error: Failed to parse resume file {resume_filename}. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Failed to parse resume: {str(e)}"}), 500
+@app.route('/aggregate_match_results/stream', methods=['POST'])
+def aggregate_match_results_stream_endpoint():
+    # Same pipeline as /aggregate_match_results, but each stage's result is written as an
+    # NDJSON line as soon as it is ready. The last line is either "saved" or "error".
+    params, error_response = read_aggregation_form()
+    if error_response:
+        return error_response
 
-        # 3. Parse Job Description
-        parsed_jd_data = {}
-        try:
-            parsed_jd_data = parse_job_description(job_description_text)
-            if not parsed_jd_data.get('Role Title'):
-                logging.warning("JD Parsing Warning: No role title extracted from JD.")
-            logging.debug(f"JD parsed: {json.dumps(parsed_jd_data.get('Role Title', 'N/A'))}")
-        except Exception as e:
-            logging.error(f"JD Parsing Error: Failed to parse job description. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Failed to parse job description: {str(e)}"}), 500
+    try:
+        resume_filename, resume_stream = open_upload(params["resume_file"])
+    except Exception as e:
+        logging.error(f"Upload Error: Could not read resume file {params['resume_file'].filename}. Error: {e}", exc_info=True)
+        return jsonify({"error": f"Could not read resume file: {str(e)}"}), 500
 
-        # 4. Hard Match
-        hard_match_score = 0
-        try:
-            hard_match_score = match_resume_to_jd(parsed_resume_data, parsed_jd_data)
-            logging.debug(f"Hard match score: {hard_match_score}")
-        except Exception as e:
-            logging.error(f"Hard Matching Error: Failed to compute hard match score. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Failed to compute hard match: {str(e)}"}), 500
+    try:
+        registered_jd, error = resolve_registered_jd(params)
+    except AdmissionRejected:
+        close_upload(resume_stream)
+        raise
+    if error:
+        close_upload(resume_stream)
+        return jsonify({"error": error[0]}), error[1]
 
-        # 5. Semantic Match
-        semantic_fit_score = 0
+    def generate():
+        stage_results = {}
         try:
-            semantic_fit_score = calculate_semantic_fit_score(resume_raw_text, job_description_text)
-            logging.debug(f"Semantic fit score: {semantic_fit_score}")
-        except Exception as e:
-            logging.error(f"Semantic Matching Error: Failed to compute semantic fit score. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Failed to compute semantic match: {str(e)}"}), 500
+            for stage, result in evaluate_stages(
+                resume_stream,
+                resume_filename,
+                registered_jd["raw_text"],
+                params["hard_match_weight"],
+                params["semantic_match_weight"],
+                params["cascade_threshold"],
+                registered_jd
+            ):
+                stage_results[stage] = result
+                yield stream_event(stage, result)
 
-        # 6. LLM Analysis
-        llm_analysis = {}
-        llm_feedback = {}
-        try:
-            llm_analysis = analyze_match(resume_raw_text, job_description_text)
-            logging.debug(f"LLM analysis received: {llm_analysis}")
-            llm_feedback = generate_feedback(resume_raw_text, job_description_text)
-            logging.debug(f"LLM feedback received: {llm_feedback}")
+            evaluation_id = persist_pipeline_results(resume_filename, registered_jd["id"], stage_results)
+            yield stream_event("saved", evaluation_id=evaluation_id)
+        except StageError as e:
+            ERRORS.inc(stage=e.stage)
+            yield stream_event("error", failed_stage=e.stage, error=e.message)
+        except AdmissionRejected as e:
+            # The 200 status has already been sent, so the rejection travels as an event
+            yield stream_event("error", failed_stage=e.stage, error=str(e), retry_after=e.retry_after)
         except Exception as e:
-            logging.error(f"LLM Analysis Error: Failed to get LLM analysis or feedback. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Failed to get LLM analysis/feedback: {str(e)}"}), 500
+            ERRORS.inc(stage="unhandled")
+            logging.error(f"Unhandled Error in /aggregate_match_results/stream: {e}", exc_info=True)
+            yield stream_event("error", error=f"An unexpected error occurred: {str(e)}")
+        finally:
+            close_upload(resume_stream)
 
-        # 7. Aggregate Scores
-        aggregated_results = {}
-        try:
-            aggregated_results = aggregate_scores(
-                hard_match_score,
-                semantic_fit_score,
-                llm_analysis,
-                hard_match_weight,
-                semantic_match_weight
-            )
-            logging.debug(f"Aggregated results: {aggregated_results}")
-        except Exception as e:
-            logging.error(f"Aggregation Error: Failed to aggregate scores. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Failed to aggregate scores: {str(e)}"}), 500
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route('/bulk_aggregate_match_results', methods=['POST'])
+def bulk_aggregate_match_results_endpoint():
+    # Screens many resumes against one JD. Only candidates that pass the cascade
+    # (score threshold and optional top N) go through the LLM stages.
+    resume_files = request.files.getlist("resume_files")
+    job_description_text = request.form.get("job_description_text", "")
+    jd_id_str = request.form.get("jd_id")
+    if not resume_files or not (job_description_text or jd_id_str):
+        return jsonify({"error": "Missing resume files or job description text"}), 400
+
+    try:
+        jd_id = int(jd_id_str) if jd_id_str else None
+        hard_match_weight = float(request.form.get("hard_match_weight") or 0.5)
+        semantic_match_weight = float(request.form.get("semantic_match_weight") or 0.5)
+        cascade_threshold = float(request.form["cascade_threshold"]) if request.form.get("cascade_threshold") else None
+        top_n = int(request.form["top_n"]) if request.form.get("top_n") else None
+    except ValueError:
+        return jsonify({"error": "Invalid format for jd_id, weights, cascade_threshold or top_n"}), 400
+    if not (0 <= hard_match_weight <= 1 and 0 <= semantic_match_weight <= 1):
+        return jsonify({"error": "Invalid hard_match_weight or semantic_match_weight. Must be between 0 and 1."}), 400
+
+    registered_jd, error = resolve_registered_jd({"jd_id": jd_id, "job_description_text": job_description_text})
+    if error:
+        return jsonify({"error": error[0]}), error[1]
+
+    session = None
+    try:
+        candidates = []
+        for resume_file in resume_files:
+            if not resume_file.filename or not allowed_file(resume_file.filename):
+                continue
+            resume_filename, resume_stream = open_upload(resume_file)
+            try:
+                parsed_resume_data = parse_resume(resume_stream, resume_filename)
+            finally:
+                close_upload(resume_stream)
+            candidates.append({
+                "filename": resume_filename,
+                "parsed_resume": parsed_resume_data,
+                "raw_text": parsed_resume_data.raw_text
+            })
+        if not candidates:
+            return jsonify({"error": "No valid resume files (PDF/DOCX) provided"}), 400
+
+        screen_candidates(
+            candidates,
+            registered_jd["parsed_data"],
+            registered_jd["raw_text"],
+            hard_match_weight,
+            semantic_match_weight,
+            cascade_threshold,
+            top_n,
+            registered_jd["artifacts"],
+            registered_jd["embedding"]
+        )
 
-        # 8. Database Operations
         session = SessionLocal()
-        try:
-            new_resume_db = Resume(filename=resume_filename, raw_text=resume_raw_text, parsed_data=json.dumps(parsed_resume_data))
-            session.add(new_resume_db)
-            session.flush()  # Get ID before commit
+        jd_db = session.get(JobDescription, registered_jd["id"])
 
-            new_jd_db = JobDescription(role_title=parsed_jd_data.get("Role Title", "N/A"), raw_text=job_description_text, parsed_data=json.dumps(parsed_jd_data))
-            session.add(new_jd_db)
-            session.flush()  # Get ID before commit
-            
-            evaluation_result = EvaluationResult(
-                resume_id=new_resume_db.id,
-                jd_id=new_jd_db.id,
-                hard_match_score=hard_match_score,
-                semantic_fit_score=semantic_fit_score,
-                final_relevance_score=aggregated_results.get("final_relevance_score", 0),
-                suitability_verdict=aggregated_results.get("suitability_verdict", "N/A"),
-                llm_analysis_raw=json.dumps(llm_analysis)
-            )
-            session.add(evaluation_result)
-            session.flush()  # Get ID before commit
-            
-            for suggestion_text in aggregated_results.get("improvement_suggestions", []):
-                element_type = "general" 
-                if "skills" in suggestion_text.lower():
-                    element_type = "skills"
-                elif "project" in suggestion_text.lower():
-                    element_type = "projects"
-                elif "certifications" in suggestion_text.lower():
-                    element_type = "certifications"
-                
-                suggestion_entry = ImprovementSuggestion(
-                    evaluation_id=evaluation_result.id,
-                    element=element_type,
-                    suggestion=suggestion_text
-                )
-                session.add(suggestion_entry)
-            
-            audit_entry = AuditTrail(
-                evaluation_id=evaluation_result.id,
-                action="Full pipeline executed",
-                details=f"Resume ID: {new_resume_db.id}, JD ID: {new_jd_db.id}, Final Score: {aggregated_results.get('final_relevance_score', 0)}"
+        results = []
+        for candidate in candidates:
+            _, evaluation_result = save_evaluation(
+                session,
+                jd_db,
+                candidate["filename"],
+                candidate["raw_text"],
+                candidate["parsed_resume"],
+                candidate["hard_match_score"],
+                candidate["semantic_fit_score"],
+                candidate["aggregated_results"],
+                candidate["llm_analysis"]
             )
-            session.add(audit_entry)
-            session.commit()
-            logging.info(f"Aggregation results saved for Resume ID: {new_resume_db.id}, JD ID: {new_jd_db.id}")
-            
-            return jsonify({
-                "message": "Aggregation complete and results saved!",
+            results.append({
                 "evaluation_id": evaluation_result.id,
-                "results": aggregated_results
-            }), 200
-        except Exception as e:
-            if session:
-                session.rollback()
-            logging.error(f"Database Error: Failed during database operations. Error: {e}", exc_info=True)
-            return jsonify({"error": f"Database interaction error: {str(e)}"}), 500
-        finally:
-            if session:
-                session.close()
-            
+                "resume_filename": candidate["filename"],
+                "results": candidate["aggregated_results"]
+            })
+        with time_stage("db_commit"):
+            session.commit()
+
+        llm_calls_skipped = sum(1 for c in candidates if c["llm_skipped"])
+        logging.info(f"Bulk screening done: {len(candidates)} candidates, LLM skipped for {llm_calls_skipped}")
+        return jsonify({
+            "message": "Bulk aggregation complete and results saved!",
+            "jd_id": registered_jd["id"],
+            "llm_skipped_count": llm_calls_skipped,
+            "evaluations": results
+        }), 200
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        logging.error(f"Unhandled Error in /aggregate_match_results: {e}", exc_info=True)
+        if session:
+            session.rollback()
+        logging.error(f"Unhandled Error in /bulk_aggregate_match_results: {e}", exc_info=True)
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
     finally:
-        if resume_filepath and os.path.exists(resume_filepath):
-            os.remove(resume_filepath)
-            logging.debug(f"Cleaned up uploaded resume file: {resume_filepath}")
+        if session:
+            session.close()
+
+EVALUATIONS_MAX_PAGE = 200
+
+def evaluation_details(db, eval_result):
+    # Full view of one evaluation, including the LLM output, suggestions and audit trail
+    resume = db.query(Resume).filter(Resume.id == eval_result.resume_id).first()
+    jd = db.query(JobDescription).filter(JobDescription.id == eval_result.jd_id).first()
+    suggestions = db.query(ImprovementSuggestion).filter(ImprovementSuggestion.evaluation_id == eval_result.id).all()
+    audit_entries = db.query(AuditTrail).filter(AuditTrail.evaluation_id == eval_result.id).all()
+    return {
+        'evaluation_id': eval_result.id,
+        'resume_filename': resume.filename if resume else 'N/A',
+        'jd_role_title': jd.role_title if jd else 'N/A',
+        'hard_match_score': eval_result.hard_match_score,
+        'semantic_fit_score': eval_result.semantic_fit_score,
+        'final_relevance_score': eval_result.final_relevance_score,
+        'suitability_verdict': eval_result.suitability_verdict,
+        'llm_analysis_raw': json.loads(eval_result.llm_analysis_raw) if eval_result.llm_analysis_raw else {},
+        'evaluated_at': eval_result.evaluated_at.isoformat() if eval_result.evaluated_at else None,
+        'improvement_suggestions': [{'element': s.element, 'suggestion': s.suggestion} for s in suggestions],
+        'audit_trail': [{'action': a.action, 'timestamp': a.timestamp.isoformat(), 'details': a.details} for a in audit_entries]
+    }
+
+def evaluation_summaries_page(db, limit, before_id=None, after_id=None, search=None):
+    # One page of list rows (scores and names, no LLM output), a single joined query.
+    # before_id pages back through older evaluations, newest first; after_id returns the
+    # evaluations added since the client's newest one, oldest first, for incremental refresh.
+    query = (
+        db.query(
+            EvaluationResult.id,
+            EvaluationResult.hard_match_score,
+            EvaluationResult.semantic_fit_score,
+            EvaluationResult.final_relevance_score,
+            EvaluationResult.suitability_verdict,
+            EvaluationResult.evaluated_at,
+            Resume.filename,
+            JobDescription.role_title
+        )
+        .outerjoin(Resume, Resume.id == EvaluationResult.resume_id)
+        .outerjoin(JobDescription, JobDescription.id == EvaluationResult.jd_id)
+    )
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(or_(JobDescription.role_title.ilike(pattern), Resume.filename.ilike(pattern)))
+    if after_id is not None:
+        query = query.filter(EvaluationResult.id > after_id).order_by(EvaluationResult.id)
+    else:
+        if before_id is not None:
+            query = query.filter(EvaluationResult.id < before_id)
+        query = query.order_by(EvaluationResult.id.desc())
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'evaluations': [
+            {
+                'evaluation_id': row.id,
+                'resume_filename': row.filename or 'N/A',
+                'jd_role_title': row.role_title or 'N/A',
+                'hard_match_score': row.hard_match_score,
+                'semantic_fit_score': row.semantic_fit_score,
+                'final_relevance_score': row.final_relevance_score,
+                'suitability_verdict': row.suitability_verdict,
+                'evaluated_at': row.evaluated_at.isoformat() if row.evaluated_at else None
+            }
+            for row in rows
+        ],
+        'has_more': has_more,
+        'next_before_id': rows[-1].id if has_more and after_id is None else None
+    }
 
 @app.route('/evaluations', methods=['GET'])
 def get_evaluations():
-    db = SessionLocal()
+    # Without ?limit, every evaluation with full details (the original response).
+    # With ?limit=N (max 200): one page of summaries, see evaluation_summaries_page, plus
+    # ?before_id=, ?after_id= and ?q= (matches JD role title or resume filename).
+    db = ReadSessionLocal()
     try:
+        if request.args.get('limit'):
+            try:
+                limit = int(request.args['limit'])
+                before_id = int(request.args['before_id']) if request.args.get('before_id') else None
+                after_id = int(request.args['after_id']) if request.args.get('after_id') else None
+            except ValueError:
+                return jsonify({'error': 'limit, before_id and after_id must be integers'}), 400
+            if not 1 <= limit <= EVALUATIONS_MAX_PAGE:
+                return jsonify({'error': f'limit must be between 1 and {EVALUATIONS_MAX_PAGE}'}), 400
+            return jsonify(evaluation_summaries_page(db, limit, before_id, after_id, request.args.get('q', '').strip() or None)), 200
+
         evaluations = db.query(EvaluationResult).all()
-        results = []
-        for eval_result in evaluations:
-            resume = db.query(Resume).filter(Resume.id == eval_result.resume_id).first()
-            jd = db.query(JobDescription).filter(JobDescription.id == eval_result.jd_id).first()
-            suggestions = db.query(ImprovementSuggestion).filter(ImprovementSuggestion.evaluation_id == eval_result.id).all()
-            audit_entries = db.query(AuditTrail).filter(AuditTrail.evaluation_id == eval_result.id).all()
+        return jsonify([evaluation_details(db, eval_result) for eval_result in evaluations]), 200
+    except Exception as e:
+        return jsonify({'error': f'Database fetch error: {str(e)}'}), 500
+    finally:
+        db.close()
 
-            results.append({
-                'evaluation_id': eval_result.id,
-                'resume_filename': resume.filename if resume else 'N/A',
-                'jd_role_title': jd.role_title if jd else 'N/A',
-                'hard_match_score': eval_result.hard_match_score,
-                'semantic_fit_score': eval_result.semantic_fit_score,
-                'final_relevance_score': eval_result.final_relevance_score,
-                'suitability_verdict': eval_result.suitability_verdict,
-                'llm_analysis_raw': json.loads(eval_result.llm_analysis_raw) if eval_result.llm_analysis_raw else {},
-                'evaluated_at': eval_result.evaluated_at.isoformat() if eval_result.evaluated_at else None,
-                'improvement_suggestions': [{'element': s.element, 'suggestion': s.suggestion} for s in suggestions],
-                'audit_trail': [{'action': a.action, 'timestamp': a.timestamp.isoformat(), 'details': a.details} for a in audit_entries]
-            })
-        return jsonify(results), 200
+@app.route('/evaluations/<int:evaluation_id>', methods=['GET'])
+def get_evaluation(evaluation_id):
+    db = ReadSessionLocal()
+    try:
+        eval_result = db.get(EvaluationResult, evaluation_id)
+        if eval_result is None:
+            return jsonify({'error': f'Evaluation {evaluation_id} not found'}), 404
+        return jsonify(evaluation_details(db, eval_result)), 200
+    except Exception as e:
+        return jsonify({'error': f'Database fetch error: {str(e)}'}), 500
+    finally:
+        db.close()
+
+@app.route('/evaluations/export', methods=['GET'])
+def export_evaluations():
+    # ?format=csv|ndjson|parquet&jd_id=&verdict=High,Medium&date_from=&date_to= (ISO dates or datetimes; a date-only date_to includes that day)
+    # Rows are streamed straight from the database cursor. csv/ndjson are gzipped on the wire when
+    # the client accepts it; parquet is compressed internally.
+    try:
+        filters = parse_export_filters(request.args)
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        db = ReadSessionLocal()
+        try:
+            yield from EXPORT_ENCODERS[filters["format"]](iter_export_rows(db, filters))
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated file
+            logging.error(f"Evaluation export failed: {e}", exc_info=True)
+            raise
+        finally:
+            db.close()
+
+    body = generate()
+    headers = {
+        "Content-Disposition": f'attachment; filename="{export_filename(filters["format"])}"',
+        "Vary": "Accept-Encoding"
+    }
+    if filters["format"] != "parquet" and "gzip" in request.accept_encodings:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(body), mimetype=EXPORT_MIMETYPES[filters["format"]], headers=headers)
+
+@app.route('/rescore', methods=['POST'])
+def rescore():
+    # Re-ranks a JD's stored evaluations under new weights/thresholds without re-running the pipeline.
+    # Body: jd_id, optional profile (name of a saved profile), hard_match_weight, semantic_match_weight,
+    # high_threshold, medium_threshold, limit, and save_profile_as to persist the parameters used.
+    data = request.get_json(silent=True) or {}
+    try:
+        jd_id = int(data["jd_id"])
+        limit = int(data["limit"]) if data.get("limit") is not None else None
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "jd_id is required and jd_id/limit must be integers"}), 400
+    if limit is not None and limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    db = SessionLocal()
+    try:
+        if db.get(JobDescription, jd_id) is None:
+            return jsonify({"error": f"Job description {jd_id} not found"}), 404
+        try:
+            params = resolve_scoring_params(db, data)
+        except ScoringProfileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid scoring parameters: {str(e)}"}), 400
+
+        result = rescore_jd(db, jd_id, params, limit)
+        profile_name = data.get("save_profile_as")
+        if profile_name:
+            save_scoring_profile(db, str(profile_name), params)
+            db.commit()
+        return jsonify({"jd_id": jd_id, "scoring_params": params, "saved_profile": profile_name or None, **result}), 200
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Rescore Error for JD {jd_id}: {e}", exc_info=True)
+        return jsonify({"error": f"Rescore error: {str(e)}"}), 500
+    finally:
+        db.close()
+
+@app.route('/scoring_profiles', methods=['GET'])
+def get_scoring_profiles():
+    db = ReadSessionLocal()
+    try:
+        profiles = db.query(ScoringProfile).order_by(ScoringProfile.name).all()
+        return jsonify([profile_to_dict(profile) for profile in profiles]), 200
     except Exception as e:
         return jsonify({'error': f'Database fetch error: {str(e)}'}), 500
     finally:
@@ -0,0 +1,326 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+import contextlib
+import contextvars
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, Mount
+from starlette.middleware import Middleware
+from a2wsgi import WSGIMiddleware
+from werkzeug.utils import secure_filename
+
+# Add the parent directory to sys.path to allow absolute imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Importing the Flask app loads the models once and gives us the shared helpers;
+# every route not defined below is served by it through the WSGI bridge.
+from backend import app as flask_backend
+from backend.parser import parse_resume
+from backend.matcher import match_resume_to_jd
+from backend.semantic_matcher import calculate_semantic_fit_score
+from backend.llm_analyzer import analyze_match, generate_feedback
+from backend.pipeline import evaluate_stages, StageError
+from backend.database.database import init_db, SessionLocal
+from backend.database.models import Resume, AuditTrail
+from backend.jd_registry import resolve_jd
+from backend.metrics import ERRORS
+from backend import admission
+from backend.admission import AdmissionRejected
+from backend import deadlines
+from backend.deadlines import DeadlineExceeded
+from backend import coalescing
+
+# Async serving mode: handlers await on bounded executors instead of pinning a thread for
+# the whole request, so one process can hold many idle or waiting connections.
+# CPU-bound stages (parsing, matching, inference) and blocking I/O (disk, database) get
+# separate pools so slow model calls cannot starve database access.
+ASGI_CPU_WORKERS = int(os.getenv("ASGI_CPU_WORKERS", str(os.cpu_count() or 4)))
+ASGI_IO_WORKERS = int(os.getenv("ASGI_IO_WORKERS", "16"))
+cpu_executor = ThreadPoolExecutor(max_workers=ASGI_CPU_WORKERS, thread_name_prefix="asgi-cpu")
+io_executor = ThreadPoolExecutor(max_workers=ASGI_IO_WORKERS, thread_name_prefix="asgi-io")
+
+# run_in_executor does not carry context variables over; copy them so the request's
+# admission lane follows its work onto the pools
+async def run_cpu(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, contextvars.copy_context().run, fn, *args)
+
+async def run_io(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(io_executor, contextvars.copy_context().run, fn, *args)
+
+def error_response(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+async def admission_rejected(request, exc):
+    return JSONResponse(
+        {"error": str(exc), "stage": exc.stage, "lane": exc.lane, "retry_after": exc.retry_after},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+class RequestContextMiddleware:
+    # Sets the admission lane (X-Request-Priority) and the request deadline (X-Request-Deadline-Ms)
+    # for the native routes; the mounted Flask app sets its own in before_request hooks.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            headers = dict(scope["headers"])
+            admission.set_lane(headers.get(b"x-request-priority", b"").decode("latin-1"))
+            deadline_header = headers.get(deadlines.DEADLINE_HEADER.lower().encode("latin-1"), b"").decode("latin-1")
+            deadlines.set_budget(deadlines.parse_budget(deadline_header, deadlines.REQUEST_DEADLINE_S))
+        await self.app(scope, receive, send)
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, ValueError):
+        return {}
+
+def receive_upload(upload):
+    # The multipart body has already been received asynchronously into a SpooledTemporaryFile
+    # (memory, or an anonymous temp file for large uploads); the parser reads it directly.
+    return secure_filename(upload.filename), upload.file
+
+async def health_check(request):
+    return JSONResponse({"status": "ok", "time": datetime.now().isoformat()})
+
+def store_parsed_resume(filename, parsed_data):
+    session = SessionLocal()
+    try:
+        new_resume = Resume(filename=filename, raw_text=parsed_data.raw_text, parsed_data=parsed_data.to_storage())
+        session.add(new_resume)
+        session.flush()
+        session.add(AuditTrail(evaluation_id=None, action="Resume uploaded and parsed", details=f"Resume ID: {new_resume.id}, Filename: {filename}"))
+        # Linked by the near-duplicate index during the flush
+        near_duplicate = {"near_duplicate_of": new_resume.near_duplicate_of, "near_duplicate_similarity": new_resume.near_duplicate_similarity}
+        session.commit()
+        return new_resume.id, near_duplicate
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+async def upload_resume(request):
+    form = await request.form()
+    file = form.get('file')
+    if file is None or not hasattr(file, 'filename'):
+        return error_response('No file part', 400)
+    if file.filename == '':
+        return error_response('No selected file', 400)
+    if not flask_backend.allowed_file(file.filename):
+        return error_response('File type not allowed', 400)
+
+    filename, resume_stream = receive_upload(file)
+    try:
+        try:
+            parsed_data = await run_cpu(parse_resume, resume_stream, filename)
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            return error_response(f'Error parsing resume: {str(e)}', 500)
+        try:
+            resume_id, near_duplicate = await run_io(store_parsed_resume, filename, parsed_data)
+        except Exception as e:
+            return error_response(f'Database error: {str(e)}', 500)
+        return JSONResponse({
+            'message': 'Resume uploaded and parsed successfully!',
+            'resume_id': resume_id,
+            **near_duplicate,
+            'parsed_data': parsed_data.to_dict()
+        })
+    finally:
+        await run_io(flask_backend.close_upload, resume_stream)
+
+async def upload_jd(request):
+    jd_text = (await read_json(request)).get('job_description', '')
+    if not jd_text:
+        return error_response('No job description provided', 400)
+    try:
+        # Parsing and embedding a new JD is CPU work; an already registered one is a lookup
+        registered_jd, created = await run_cpu(resolve_jd, None, jd_text)
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        return error_response(f'Error registering job description: {str(e)}', 500)
+    return JSONResponse({
+        'message': 'Job Description parsed successfully!' if created else 'Job Description already registered.',
+        'jd_id': registered_jd['id'],
+        'content_hash': registered_jd['content_hash'],
+        'created': created,
+        'parsed_data': registered_jd['parsed_data'].to_dict()
+    })
+
+async def match_resume_jd(request):
+    data = await read_json(request)
+    parsed_resume = data.get('parsed_resume')
+    parsed_jd = data.get('parsed_jd')
+    if not parsed_resume or not parsed_jd:
+        return error_response('Missing parsed resume or job description', 400)
+    return JSONResponse({'match_percentage': await run_cpu(match_resume_to_jd, parsed_resume, parsed_jd)})
+
+def text_pair_endpoint(fn, result_key=None):
+    # Builds the handlers for the endpoints that take resume_text and jd_text
+    async def endpoint(request):
+        data = await read_json(request)
+        resume_text = data.get('resume_text')
+        jd_text = data.get('jd_text')
+        if not resume_text or not jd_text:
+            return error_response('Missing resume_text or jd_text', 400)
+        result = await run_cpu(fn, resume_text, jd_text)
+        return JSONResponse({result_key: result} if result_key else result)
+    return endpoint
+
+async def read_aggregation_request(request):
+    # Returns (params, filename, resume_stream, None) or (None, None, None, error_response)
+    form = await request.form()
+    resume_file = form.get("resume_file")
+    if resume_file is None or not hasattr(resume_file, "filename"):
+        logging.error("Validation Error: No resume file part in request.")
+        return None, None, None, error_response("No resume file part", 400)
+    params, error = flask_backend.validate_aggregation_params(
+        resume_file.filename,
+        form.get("job_description_text", ""),
+        form.get("hard_match_weight"),
+        form.get("semantic_match_weight"),
+        form.get("cascade_threshold"),
+        form.get("jd_id")
+    )
+    if error:
+        return None, None, None, error_response(*error)
+    registered_jd, error = await run_cpu(flask_backend.resolve_registered_jd, params)
+    if error:
+        return None, None, None, error_response(*error)
+    params["registered_jd"] = registered_jd
+    filename, resume_stream = receive_upload(resume_file)
+    return params, filename, resume_stream, None
+
+async def iterate_stages(params, filename, resume_stream):
+    # Drives the synchronous stage generator one step at a time on the CPU pool
+    stages = evaluate_stages(
+        resume_stream,
+        filename,
+        params["registered_jd"]["raw_text"],
+        params["hard_match_weight"],
+        params["semantic_match_weight"],
+        params["cascade_threshold"],
+        params["registered_jd"]
+    )
+    done = object()
+    while True:
+        item = await run_cpu(next, stages, done)
+        if item is done:
+            return
+        yield item
+
+async def aggregate_match_results(request):
+    params, filename, resume_stream, error = await read_aggregation_request(request)
+    if error:
+        return error
+    try:
+        async def evaluate_and_save():
+            stage_results = {}
+            async for stage, result in iterate_stages(params, filename, resume_stream):
+                stage_results[stage] = result
+            try:
+                evaluation_id = await run_io(flask_backend.persist_pipeline_results, filename, params["registered_jd"]["id"], stage_results)
+            except Exception as e:
+                raise flask_backend.PersistenceError(e) from e
+            return evaluation_id, stage_results["aggregate"]
+
+        # Identical requests already in flight are joined, see backend/coalescing.py
+        try:
+            key = await run_io(coalescing.evaluation_key, resume_stream, params["registered_jd"], params)
+            (evaluation_id, aggregated_results), _ = await coalescing.evaluations.do_async(key, evaluate_and_save)
+        except StageError as e:
+            ERRORS.inc(stage=e.stage)
+            return error_response(e.message, e.status_code)
+        except AdmissionRejected as e:
+            return await admission_rejected(request, e)
+        except flask_backend.PersistenceError as e:
+            ERRORS.inc(stage="database")
+            logging.error(f"Database Error: Failed during database operations. Error: {e}", exc_info=True)
+            return error_response(f"Database interaction error: {str(e)}", 500)
+        except DeadlineExceeded:
+            return error_response("Request deadline exceeded", 504)
+
+        return JSONResponse({
+            "message": "Aggregation complete and results saved!",
+            "evaluation_id": evaluation_id,
+            "results": aggregated_results
+        })
+    except Exception as e:
+        ERRORS.inc(stage="unhandled")
+        logging.error(f"Unhandled Error in /aggregate_match_results: {e}", exc_info=True)
+        return error_response(f"An unexpected error occurred: {str(e)}", 500)
+    finally:
+        await run_io(flask_backend.close_upload, resume_stream)
+
+async def aggregate_match_results_stream(request):
+    params, filename, resume_stream, error = await read_aggregation_request(request)
+    if error:
+        return error
+
+    async def generate():
+        stage_results = {}
+        try:
+            async for stage, result in iterate_stages(params, filename, resume_stream):
+                stage_results[stage] = result
+                yield flask_backend.stream_event(stage, result)
+            evaluation_id = await run_io(flask_backend.persist_pipeline_results, filename, params["registered_jd"]["id"], stage_results)
+            yield flask_backend.stream_event("saved", evaluation_id=evaluation_id)
+        except StageError as e:
+            ERRORS.inc(stage=e.stage)
+            yield flask_backend.stream_event("error", failed_stage=e.stage, error=e.message)
+        except AdmissionRejected as e:
+            yield flask_backend.stream_event("error", failed_stage=e.stage, error=str(e), retry_after=e.retry_after)
+        except Exception as e:
+            ERRORS.inc(stage="unhandled")
+            logging.error(f"Unhandled Error in /aggregate_match_results/stream: {e}", exc_info=True)
+            yield flask_backend.stream_event("error", error=f"An unexpected error occurred: {str(e)}")
+        finally:
+            await run_io(flask_backend.close_upload, resume_stream)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await run_io(init_db)
+    yield
+    cpu_executor.shutdown(wait=False)
+    io_executor.shutdown(wait=False)
+
+routes = [
+    Route('/health', health_check, methods=['GET']),
+    Route('/upload_resume', upload_resume, methods=['POST']),
+    Route('/upload_jd', upload_jd, methods=['POST']),
+    Route('/match_resume_jd', match_resume_jd, methods=['POST']),
+    Route('/semantic_match', text_pair_endpoint(calculate_semantic_fit_score, 'semantic_fit_score'), methods=['POST']),
+    Route('/llm_analyze_match', text_pair_endpoint(analyze_match), methods=['POST']),
+    Route('/llm_feedback', text_pair_endpoint(generate_feedback), methods=['POST']),
+    Route('/aggregate_match_results', aggregate_match_results, methods=['POST']),
+    Route('/aggregate_match_results/stream', aggregate_match_results_stream, methods=['POST']),
+    # Everything else (evaluations, bulk screening, metrics, admin) keeps its Flask implementation
+    Mount('/', app=WSGIMiddleware(flask_backend.app, workers=ASGI_IO_WORKERS)),
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[Middleware(RequestContextMiddleware)],
+    exception_handlers={AdmissionRejected: admission_rejected}
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    host = "127.0.0.1"
+    port = 5000
+    logging.info(f"ASGI backend starting at http://{host}:{port}")
+    uvicorn.run(app, host=host, port=port, backlog=4096)
@@ -0,0 +1,318 @@
+import os
+import io
+import csv
+import sys
+import json
+import time
+import logging
+import zipfile
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Allow running as `python backend/batch.py` from the repo root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Offline batch scoring: python -m backend.batch resumes/ --jd jd.txt --output results.csv
+# Resumes are parsed across a process pool, then matched and semantically scored a batch at
+# a time through the same cascade as /bulk_aggregate_match_results. LLM stages only run with
+# --llm. Processed resumes are recorded in a checkpoint file after every batch, so an
+# interrupted run picks up where it stopped.
+# Heavy modules (spaCy, models, database) are imported inside functions: pool workers are
+# spawned and re-import this module, and they only need the parser.
+
+RESUME_EXTENSIONS = ('.pdf', '.docx')
+BATCH_SIZE = int(os.getenv("BATCH_SCORING_BATCH_SIZE", "64"))
+
+CSV_COLUMNS = [
+    "resume", "status", "error", "hard_match_score", "semantic_fit_score", "final_relevance_score",
+    "suitability_verdict", "llm_skipped", "partial", "missing_elements", "improvement_suggestions", "evaluation_id"
+]
+
+def list_resume_tasks(source):
+    # Returns (kind, container, name) tasks; names are unique within one run and key the checkpoint
+    if os.path.isdir(source):
+        tasks = []
+        for root, _, files in os.walk(source):
+            for filename in files:
+                if filename.lower().endswith(RESUME_EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    tasks.append(("file", path, os.path.relpath(path, source)))
+        return sorted(tasks, key=lambda task: task[2])
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith(RESUME_EXTENSIONS)]
+        return [("zip", source, name) for name in sorted(names)]
+    raise ValueError(f"{source} is neither a directory nor a zip archive")
+
+def init_parse_worker():
+    # Workers serve one caller each, so stage admission only adds overhead
+    from backend import admission
+    admission.ADMISSION_ENABLED = False
+
+def parse_task(task):
+    # Runs in a pool worker. Returns (name, parsed_resume or None, error or None).
+    from backend.parser import parse_resume
+    kind, container, name = task
+    try:
+        if kind == "zip":
+            with zipfile.ZipFile(container) as archive:
+                content = archive.read(name)
+            return name, parse_resume(io.BytesIO(content), name), None
+        return name, parse_resume(container, name), None
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+
+def read_jd_text(path):
+    if path.lower().endswith('.pdf'):
+        from backend.parser import extract_text_from_pdf
+        return extract_text_from_pdf(path)
+    if path.lower().endswith('.docx'):
+        from backend.parser import extract_text_from_docx
+        return extract_text_from_docx(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def load_jd(args):
+    # With the database involved the JD goes through the registry, so evaluations link to a
+    # registered JD. Otherwise it is parsed locally into the same shape as jd_to_dict.
+    if args.jd_id is not None or args.save_db:
+        from backend.database.database import init_db
+        from backend.jd_registry import resolve_jd
+        init_db()
+        registered_jd, _ = resolve_jd(args.jd_id, read_jd_text(args.jd) if args.jd else None)
+        return registered_jd
+    from backend.parser import parse_job_description
+    from backend.matcher import prepare_jd_artifacts
+    from backend.semantic_matcher import embed_text
+    jd_text = read_jd_text(args.jd)
+    parsed_jd = parse_job_description(jd_text)
+    return {
+        "id": None,
+        "raw_text": jd_text,
+        "parsed_data": parsed_jd,
+        "artifacts": prepare_jd_artifacts(parsed_jd),
+        "embedding": embed_text(jd_text),
+    }
+
+def load_checkpoint(path):
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                done.update(json.loads(line)["resumes"])
+    return done
+
+def append_checkpoint(path, names):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"resumes": names, "time": time.time()}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def result_row(name, candidate=None, error=None, evaluation_id=None):
+    if candidate is None:
+        return {"resume": name, "status": "error", "error": error}
+    aggregated = candidate["aggregated_results"]
+    return {
+        "resume": name,
+        "status": "ok",
+        "error": None,
+        "hard_match_score": candidate["hard_match_score"],
+        "semantic_fit_score": candidate["semantic_fit_score"],
+        "final_relevance_score": aggregated.get("final_relevance_score"),
+        "suitability_verdict": aggregated.get("suitability_verdict"),
+        "llm_skipped": candidate["llm_skipped"],
+        "partial": aggregated.get("partial", False),
+        "missing_elements": aggregated.get("missing_elements", []),
+        "improvement_suggestions": aggregated.get("improvement_suggestions", []),
+        "evaluation_id": evaluation_id,
+    }
+
+class ResultWriter:
+    # Appends rows to CSV or NDJSON; the CSV header is only written to a new file
+    def __init__(self, path, output_format):
+        self.format = output_format
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        if self.format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_COLUMNS)
+            if is_new:
+                self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.format == "csv":
+                self.writer.writerow({
+                    column: "; ".join(map(str, value)) if isinstance(value, list) else value
+                    for column, value in row.items()
+                })
+            else:
+                self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def score_batch(parsed_batch, registered_jd, args):
+    # parsed_batch: [(name, parsed_resume)]. Returns the output rows, saving to the database if asked.
+    from backend.cascade import screen_candidates
+    candidates = [
+        {
+            "filename": name,
+            "parsed_resume": parsed,
+            "raw_text": parsed.raw_text
+        }
+        for name, parsed in parsed_batch
+    ]
+    screen_candidates(
+        candidates,
+        registered_jd["parsed_data"],
+        registered_jd["raw_text"],
+        args.hard_match_weight,
+        args.semantic_match_weight,
+        args.cascade_threshold,
+        args.top_n,
+        registered_jd["artifacts"],
+        registered_jd["embedding"],
+        batch_semantic=True,
+        allow_llm=args.llm
+    )
+
+    evaluation_ids = [None] * len(candidates)
+    if args.save_db:
+        from backend.database.database import SessionLocal
+        from backend.persistence import save_evaluations_bulk
+        session = SessionLocal()
+        try:
+            evaluations = save_evaluations_bulk(
+                session,
+                registered_jd["id"],
+                candidates,
+                audit_details="Source: batch CLI"
+            )
+            session.commit()
+            evaluation_ids = [evaluation.id for evaluation in evaluations]
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return [result_row(c["filename"], c, evaluation_id=evaluation_id) for c, evaluation_id in zip(candidates, evaluation_ids)]
+
+def bounded_map(pool, fn, items, window):
+    # Like pool.map, in order, but with at most `window` tasks submitted and not yet consumed,
+    # so parsed resumes do not pile up in memory while the main process is scoring
+    in_flight = deque()
+    items = iter(items)
+    for item in items:
+        in_flight.append(pool.submit(fn, item))
+        if len(in_flight) >= window:
+            break
+    while in_flight:
+        result = in_flight.popleft().result()
+        for item in items:
+            in_flight.append(pool.submit(fn, item))
+            break
+        yield result
+
+def run(args):
+    from backend import admission
+    # A single caller: nothing to queue against
+    admission.ADMISSION_ENABLED = False
+
+    tasks = list_resume_tasks(args.resumes)
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    if args.no_resume:
+        for path in (args.output, checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+    done = load_checkpoint(checkpoint_path)
+    pending = [task for task in tasks if task[2] not in done]
+    logging.info(f"Batch scoring: {len(tasks)} resumes found, {len(tasks) - len(pending)} already done, {len(pending)} to score")
+    if not pending:
+        return {"resumes": 0, "errors": 0, "elapsed_s": 0.0}
+
+    registered_jd = load_jd(args)
+    writer = ResultWriter(args.output, args.format)
+    start = time.perf_counter()
+    scored = errors = 0
+    try:
+        # spawn: forking after the models are loaded is not safe with torch's thread pools
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_parse_worker) as pool:
+            # Enough parsing ahead to fill the next batch while this one is scored
+            results = bounded_map(pool, parse_task, pending, window=2 * args.batch_size + args.workers)
+            batch_start = time.perf_counter()
+            parsed_batch, rows, names = [], [], []
+            for i, (name, parsed, error) in enumerate(results, start=1):
+                names.append(name)
+                if error:
+                    logging.warning(f"Failed to parse {name}: {error}")
+                    rows.append(result_row(name, error=error))
+                    errors += 1
+                else:
+                    parsed_batch.append((name, parsed))
+                if len(names) < args.batch_size and i < len(pending):
+                    continue
+
+                parse_done = time.perf_counter()
+                if parsed_batch:
+                    rows.extend(score_batch(parsed_batch, registered_jd, args))
+                writer.write(rows)
+                # Rows are on disk before the checkpoint names them, so a crash can only repeat work
+                append_checkpoint(checkpoint_path, names)
+                scored += len(names)
+                now = time.perf_counter()
+                logging.info(
+                    f"Batch of {len(names)}: parse wait {parse_done - batch_start:.2f}s, scoring {now - parse_done:.2f}s; "
+                    f"{scored}/{len(pending)} done, {scored / (now - start):.1f} resumes/s overall"
+                )
+                batch_start = now
+                parsed_batch, rows, names = [], [], []
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {"resumes": scored, "errors": errors, "elapsed_s": elapsed, "resumes_per_s": scored / elapsed if elapsed > 0 else 0.0}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a directory or zip of resumes against one job description.")
+    parser.add_argument("resumes", help="Directory or .zip of PDF/DOCX resumes")
+    jd_source = parser.add_mutually_exclusive_group(required=True)
+    jd_source.add_argument("--jd", help="Job description file (.txt, .pdf or .docx)")
+    jd_source.add_argument("--jd-id", type=int, help="ID of a job description already in the database")
+    parser.add_argument("--output", default="batch_results.csv", help="Results file (.csv or .ndjson)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Output format; defaults to the output file's extension")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parsing processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Resumes scored per batch")
+    parser.add_argument("--llm", action="store_true", help="Run the LLM stages for candidates that pass the cascade")
+    parser.add_argument("--cascade-threshold", type=float, help="Minimum preliminary score for the LLM stages (with --llm)")
+    parser.add_argument("--top-n", type=int, help="Only the N best candidates of each batch go to the LLM (with --llm)")
+    parser.add_argument("--hard-match-weight", type=float, default=0.5)
+    parser.add_argument("--semantic-match-weight", type=float, default=0.5)
+    parser.add_argument("--save-db", action="store_true", help="Also save the evaluations to the database")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--no-resume", action="store_true", help="Start over, discarding the output and checkpoint of a previous run")
+    args = parser.parse_args(argv)
+
+    if args.format is None:
+        args.format = "ndjson" if args.output.lower().endswith((".ndjson", ".jsonl")) else "csv"
+    if not (0 <= args.hard_match_weight <= 1 and 0 <= args.semantic_match_weight <= 1):
+        parser.error("Weights must be between 0 and 1")
+    if args.batch_size < 1 or args.workers < 1:
+        parser.error("--batch-size and --workers must be at least 1")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        summary = run(args)
+    except (LookupError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Scored {summary['resumes']} resumes ({summary['errors']} parse errors) in {summary['elapsed_s']:.1f}s"
+          + (f", {summary['resumes_per_s']:.1f} resumes/s" if summary['resumes'] else "")
+          + f". Results in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+class MicroBatcher:
+    # Collects single-item requests from concurrent threads and runs them through
+    # one batched call. A batch is flushed when it reaches max_batch_size or when
+    # the oldest request has waited max_wait_ms, whichever comes first.
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5, name="batcher"):
+        self.batch_fn = batch_fn  # list of inputs -> list of outputs, same order
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.stats = {"batches": 0, "items": 0, "busy_seconds": 0.0, "last_batch_size": 0, "last_batch_latency_ms": 0.0}
+        self._worker = threading.Thread(target=self._run, name=f"{name}-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]  # Block until there is work
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Callers that gave up (e.g. ran out of request time) cancel their future; skip those
+            batch = [entry for entry in self._collect() if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [entry[0] for entry in batch]
+            started = time.perf_counter()
+            try:
+                outputs = self.batch_fn(items)
+                if len(outputs) != len(items):
+                    raise RuntimeError(f"{self.name}: batch function returned {len(outputs)} results for {len(items)} inputs")
+                for (_, future, _), output in zip(batch, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finished = time.perf_counter()
+            self._record(batch, started, finished)
+
+    def _record(self, batch, started, finished):
+        busy = finished - started
+        # Latency seen by the oldest request in the batch (queue wait + forward pass)
+        latency_ms = (finished - batch[0][2]) * 1000
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+            self.stats["busy_seconds"] += busy
+            self.stats["last_batch_size"] = len(batch)
+            self.stats["last_batch_latency_ms"] = latency_ms
+        throughput = len(batch) / busy if busy > 0 else float("inf")
+        logging.debug(f"{self.name}: batch of {len(batch)} in {busy * 1000:.1f} ms ({throughput:.1f} items/s), max latency {latency_ms:.1f} ms")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["avg_batch_size"] = stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        stats["throughput_items_per_s"] = stats["items"] / stats["busy_seconds"] if stats["busy_seconds"] > 0 else 0.0
+        return stats
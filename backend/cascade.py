@@ -0,0 +1,148 @@
+import os
+import json
+from fuzzywuzzy import fuzz
+
+from backend.matcher import match_resume_to_jd
+from backend.semantic_matcher import calculate_semantic_fit_score, calculate_semantic_fit_scores
+from backend.llm_analyzer import analyze_match, generate_feedback
+from backend.aggregator import aggregate_scores, compute_final_relevance_score, available_scores
+from backend.deadlines import DeadlineExceeded
+
+# Tiered evaluation: the hard match and semantic stages are cheap, the two distilgpt2
+# generations are not. Candidates whose cheap score is below the threshold get a
+# templated analysis instead of an LLM one.
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "1") == "1"
+CASCADE_LLM_THRESHOLD = float(os.getenv("CASCADE_LLM_THRESHOLD", "50"))
+# Single evaluations (/aggregate_match_results and friends) always get the LLM analysis unless
+# this is set or the request sends its own cascade_threshold; bulk screening always cascades.
+CASCADE_SINGLE_REQUESTS = os.getenv("CASCADE_SINGLE_REQUESTS", "0") == "1"
+# In bulk screening, only the best N candidates above the threshold reach the LLM (0 = no limit)
+CASCADE_TOP_N = int(os.getenv("CASCADE_TOP_N", "0"))
+
+def should_run_llm(preliminary_score, threshold=None):
+    if not CASCADE_ENABLED:
+        return True
+    if threshold is None:
+        threshold = CASCADE_LLM_THRESHOLD
+    return preliminary_score >= threshold
+
+def should_run_llm_for_request(preliminary_score, threshold=None):
+    # The cascade decision for a single evaluation, see CASCADE_SINGLE_REQUESTS
+    if threshold is None and not CASCADE_SINGLE_REQUESTS:
+        return True
+    return should_run_llm(preliminary_score, threshold)
+
+def select_for_llm(preliminary_scores, threshold=None, top_n=None):
+    # Returns one flag per candidate telling whether it should go through the LLM stages
+    if top_n is None:
+        top_n = CASCADE_TOP_N
+    flags = [should_run_llm(score, threshold) for score in preliminary_scores]
+    if CASCADE_ENABLED and top_n > 0:
+        eligible = [i for i, flag in enumerate(flags) if flag]
+        eligible.sort(key=lambda i: preliminary_scores[i], reverse=True)
+        keep = set(eligible[:top_n])
+        flags = [i in keep for i in range(len(flags))]
+    return flags
+
+def find_missing_skills(parsed_resume, parsed_jd, threshold=80, limit=3):
+    # Cheap stand-in for the LLM's "missing elements": must-have skills with no fuzzy match in the resume
+    resume_skills = [s.lower() for s in parsed_resume.get("Skills", []) if isinstance(s, str)]
+    missing = []
+    for jd_skill in parsed_jd.get("MustHaveSkills", []):
+        if not isinstance(jd_skill, str) or not jd_skill.strip():
+            continue
+        if not any(fuzz.ratio(jd_skill.lower(), r_skill) >= threshold for r_skill in resume_skills):
+            missing.append(jd_skill.strip())
+        if len(missing) >= limit:
+            break
+    return missing
+
+def templated_llm_analysis(parsed_resume, parsed_jd, preliminary_score):
+    # Same JSON shape as analyze_match so aggregate_scores can consume it unchanged
+    missing_elements = [
+        {"element": skill, "suggestion": f"Add concrete evidence of {skill} to your skills, projects or experience."}
+        for skill in find_missing_skills(parsed_resume, parsed_jd)
+    ]
+    if not missing_elements:
+        missing_elements.append({
+            "element": "Overall relevance",
+            "suggestion": "Tailor your summary and experience to the responsibilities listed in the job description."
+        })
+    return json.dumps({"match_score": preliminary_score, "missing_elements": missing_elements, "cascade": "templated"})
+
+def mark_deadline_exceeded(templated_json):
+    # Templated results that stand in for an LLM stage that ran out of request time
+    result = json.loads(templated_json)
+    result["deadline_exceeded"] = True
+    return json.dumps(result)
+
+def templated_feedback(parsed_resume, parsed_jd):
+    # Same JSON shape as generate_feedback
+    feedback = [
+        {"area": "skills", "suggestion": f"Highlight hands-on experience with {skill}."}
+        for skill in find_missing_skills(parsed_resume, parsed_jd)
+    ]
+    if not feedback:
+        feedback.append({"area": "general", "suggestion": "Quantify achievements that relate directly to this role."})
+    return json.dumps({"feedback": feedback, "cascade": "templated"})
+
+def screen_candidates(candidates, parsed_jd, jd_text, hard_match_weight=0.5, semantic_match_weight=0.5, threshold=None, top_n=None, jd_artifacts=None, jd_embedding=None, batch_semantic=False, allow_llm=True):
+    # candidates: list of {"filename", "parsed_resume", "raw_text"}
+    # Cheap stages run for everyone first; the LLM only sees the candidates that survive the cascade.
+    # batch_semantic embeds all resumes in one call (offline scoring, see backend/batch.py);
+    # allow_llm=False gives every candidate the templated analysis.
+    # Once the request deadline passes, the remaining expensive stages fall back the same way
+    # as in backend/pipeline.py: no semantic score, templated LLM output, flagged per candidate.
+    batch_semantic_scores = None
+    if batch_semantic:
+        try:
+            batch_semantic_scores = calculate_semantic_fit_scores([c["raw_text"] for c in candidates], jd_text, jd_embedding)
+        except DeadlineExceeded:
+            batch_semantic_scores = [None] * len(candidates)
+    for i, candidate in enumerate(candidates):
+        candidate["timed_out_stages"] = []
+        candidate["hard_match_score"] = match_resume_to_jd(candidate["parsed_resume"], parsed_jd, jd_artifacts)
+        try:
+            if batch_semantic_scores is not None:
+                candidate["semantic_fit_score"] = batch_semantic_scores[i]
+            else:
+                candidate["semantic_fit_score"] = calculate_semantic_fit_score(candidate["raw_text"], jd_text, jd_embedding)
+        except DeadlineExceeded:
+            candidate["semantic_fit_score"] = None
+        if candidate["semantic_fit_score"] is None:
+            candidate["timed_out_stages"].append("semantic_fit")
+        candidate["preliminary_score"] = compute_final_relevance_score(
+            candidate["hard_match_score"],
+            *available_scores(candidate["semantic_fit_score"], hard_match_weight, semantic_match_weight)
+        )
+
+    if allow_llm:
+        run_llm_flags = select_for_llm([c["preliminary_score"] for c in candidates], threshold, top_n)
+    else:
+        run_llm_flags = [False] * len(candidates)
+
+    for candidate, run_llm in zip(candidates, run_llm_flags):
+        if run_llm:
+            try:
+                candidate["llm_analysis"] = analyze_match(candidate["raw_text"], jd_text)
+                candidate["llm_feedback"] = generate_feedback(candidate["raw_text"], jd_text)
+            except DeadlineExceeded:
+                candidate["timed_out_stages"].extend(["llm_analysis", "feedback"])
+                candidate["llm_analysis"] = mark_deadline_exceeded(templated_llm_analysis(candidate["parsed_resume"], parsed_jd, candidate["preliminary_score"]))
+                candidate["llm_feedback"] = mark_deadline_exceeded(templated_feedback(candidate["parsed_resume"], parsed_jd))
+        else:
+            candidate["llm_analysis"] = templated_llm_analysis(candidate["parsed_resume"], parsed_jd, candidate["preliminary_score"])
+            candidate["llm_feedback"] = templated_feedback(candidate["parsed_resume"], parsed_jd)
+        candidate["llm_skipped"] = not run_llm
+        semantic_fit_score, hard_weight, semantic_weight = available_scores(candidate["semantic_fit_score"], hard_match_weight, semantic_match_weight)
+        candidate["aggregated_results"] = aggregate_scores(
+            candidate["hard_match_score"],
+            semantic_fit_score,
+            candidate["llm_analysis"],
+            hard_weight,
+            semantic_weight
+        )
+        candidate["aggregated_results"]["llm_skipped"] = not run_llm
+        candidate["aggregated_results"]["partial"] = bool(candidate["timed_out_stages"])
+        candidate["aggregated_results"]["timed_out_stages"] = candidate["timed_out_stages"]
+    return candidates
@@ -0,0 +1,175 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from backend import deadlines
+from backend.metrics import Counter
+from backend.pipeline import StageError
+
+# Single-flight coalescing of identical evaluations. Double-clicks and client retries often
+# send the same resume and JD while the first request is still running; the later ones wait
+# for the first one's result instead of parsing, embedding and calling the LLM again, and
+# get the same saved evaluation back. Only complete evaluations and genuine stage errors are
+# shared: an outcome that depends on the first request's lane or deadline (a 429, a 504, a
+# partial result) makes the others run the evaluation themselves.
+
+COALESCING_ENABLED = os.getenv("REQUEST_COALESCING", "1") != "0"
+HASH_CHUNK_BYTES = 64 * 1024
+
+COALESCED = Counter("coalesced_requests_total", "Requests answered by an identical in-flight computation.", ["group"])
+COALESCING_LEADERS = Counter("coalescing_leaders_total", "Computations that identical requests could attach to.", ["group"])
+COALESCED_SECONDS_SAVED = Counter("coalesced_seconds_saved_total", "Compute time not spent thanks to coalescing (leader duration per follower).", ["group"])
+
+# Handed to followers instead of an outcome they must not share; they try again
+_RETRY = object()
+
+class _Call:
+    __slots__ = ("future", "followers")
+
+    def __init__(self):
+        self.future = Future()
+        self.followers = 0
+
+class SingleFlight:
+    # do()/do_async() run fn once per key at a time; callers arriving while it runs share its
+    # result when share_result accepts it (all results by default) and its exception when it
+    # is one of shared_errors. Otherwise the waiting callers retry, one of them as the new
+    # leader. Threads (Flask) and coroutines (ASGI) can share one instance.
+    def __init__(self, name, share_result=None, shared_errors=()):
+        self.name = name
+        self.share_result = share_result
+        self.shared_errors = shared_errors
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"leaders": 0, "followers": 0, "retried": 0, "seconds_saved": 0.0}
+
+    def _is_shared(self, result, error):
+        if error is not None:
+            return isinstance(error, self.shared_errors)
+        return self.share_result is None or self.share_result(result)
+
+    def _join(self, key):
+        # Returns (call, is_leader)
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.stats["followers"] += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.stats["leaders"] += 1
+            return call, True
+
+    def _finish(self, key, call, started, result=None, error=None):
+        shared = self._is_shared(result, error)
+        with self._lock:
+            del self._calls[key]
+            followers = call.followers
+            if shared:
+                saved = (time.perf_counter() - started) * followers
+                self.stats["seconds_saved"] += saved
+            else:
+                self.stats["retried"] += followers
+        if not shared:
+            if followers:
+                logging.debug(f"{self.name}: {followers} identical request(s) retrying after a result they cannot share")
+            call.future.set_result(_RETRY)
+            return
+        if followers:
+            COALESCING_LEADERS.inc(group=self.name)
+            COALESCED.inc(followers, group=self.name)
+            COALESCED_SECONDS_SAVED.inc(saved, group=self.name)
+            logging.debug(f"{self.name}: {followers} identical request(s) shared one computation")
+        if error is not None:
+            call.future.set_exception(error)
+        else:
+            call.future.set_result(result)
+
+    def do(self, key, fn):
+        # Returns (result, shared); shared is True when another request computed it
+        if not COALESCING_ENABLED:
+            return fn(), False
+        while True:
+            call, is_leader = self._join(key)
+            if is_leader:
+                break
+            try:
+                # A follower waits no longer than its own request deadline
+                result = call.future.result(timeout=deadlines.bounded_timeout(None))
+            except FutureTimeoutError:
+                deadlines.fail(f"{self.name}_wait")
+            if result is not _RETRY:
+                return result, True
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, started, error=e)
+            raise
+        self._finish(key, call, started, result=result)
+        return result, False
+
+    async def do_async(self, key, coroutine_fn):
+        # Coroutine version of do(). The computation runs as its own task, so a leader whose
+        # client disconnects does not take the followers' result down with it.
+        if not COALESCING_ENABLED:
+            return await coroutine_fn(), False
+        while True:
+            call, is_leader = self._join(key)
+            if is_leader:
+                break
+            try:
+                result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(call.future)), deadlines.bounded_timeout(None))
+            except asyncio.TimeoutError:
+                deadlines.fail(f"{self.name}_wait")
+            if result is not _RETRY:
+                return result, True
+        started = time.perf_counter()
+
+        async def run():
+            try:
+                result = await coroutine_fn()
+            except BaseException as e:
+                self._finish(key, call, started, error=e)
+                raise
+            self._finish(key, call, started, result=result)
+            return result
+
+        return await asyncio.shield(asyncio.ensure_future(run())), False
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, "seconds_saved": round(self.stats["seconds_saved"], 3), "in_flight": len(self._calls)}
+
+def hash_upload(stream):
+    # sha256 of a seekable upload, which is left rewound for the parser
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def evaluation_key(resume_stream, registered_jd, params):
+    # Identical requests: same resume bytes, same JD text and the same scoring settings.
+    # Registered JDs are keyed by the hash of their cleaned text (see backend/jd_registry.py).
+    return (
+        hash_upload(resume_stream),
+        registered_jd["content_hash"] or registered_jd["id"],
+        params["hard_match_weight"],
+        params["semantic_match_weight"],
+        params["cascade_threshold"],
+    )
+
+def is_complete_evaluation(result):
+    # result is (evaluation_id, aggregated_results); a partial aggregate reflects the leader's deadline
+    return not result[1].get("partial")
+
+evaluations = SingleFlight("evaluation", share_result=is_complete_evaluation, shared_errors=(StageError,))
+
+def get_stats():
+    return {"enabled": COALESCING_ENABLED, "evaluation": evaluations.get_stats()}
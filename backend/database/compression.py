@@ -0,0 +1,61 @@
+import os
+import zlib
+from sqlalchemy.types import TypeDecorator, Text
+
+try:
+    import zstandard
+except ImportError:  # Optional: zlib is used when zstandard is not installed
+    zstandard = None
+
+# Transparent compression for the large text columns (resume/JD text, parsed data, LLM output).
+# Values are written as BLOBs starting with the codec's own frame magic, and SQLite keeps
+# BLOBs as-is in TEXT columns, so no table rebuild is needed: rows written before
+# compression still hold plain strings and are returned unchanged.
+
+STORAGE_COMPRESSION = os.getenv("STORAGE_COMPRESSION", "zstd" if zstandard else "zlib")  # zstd|zlib|none
+STORAGE_COMPRESSION_LEVEL = int(os.getenv("STORAGE_COMPRESSION_LEVEL", "6"))
+# Shorter values stay plain text; compressing them saves little and hides them from the sqlite shell
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "256"))
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+if STORAGE_COMPRESSION not in ("zstd", "zlib", "none"):
+    raise ValueError(f"Unknown STORAGE_COMPRESSION '{STORAGE_COMPRESSION}', expected 'zstd', 'zlib' or 'none'")
+if STORAGE_COMPRESSION == "zstd" and zstandard is None:
+    raise ImportError("STORAGE_COMPRESSION=zstd needs the zstandard package")
+
+def compress_text(text):
+    # Returns bytes, or the text itself when it is short or compression is off
+    if text is None:
+        return None
+    data = text.encode("utf-8")
+    if STORAGE_COMPRESSION == "none" or len(data) < COMPRESSION_MIN_BYTES:
+        return text
+    if STORAGE_COMPRESSION == "zstd":
+        # Compressor objects are not thread-safe, so each call makes its own
+        return zstandard.ZstdCompressor(level=STORAGE_COMPRESSION_LEVEL).compress(data)
+    return zlib.compress(data, STORAGE_COMPRESSION_LEVEL)
+
+def decompress_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Stored value is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(value).decode("utf-8")
+    return zlib.decompress(value).decode("utf-8")
+
+def is_compressed(value):
+    return isinstance(value, (bytes, bytearray, memoryview))
+
+class CompressedText(TypeDecorator):
+    # Text column stored compressed; reads accept both compressed and legacy plain values
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
@@ -1,15 +1,116 @@
-from sqlalchemy import create_engine
+import os
+import threading
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 
+# WAL lets readers run alongside the single writer instead of blocking on it. synchronous=NORMAL
+# is safe in WAL mode (a power cut can lose the last commits, never corrupt the file).
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "5"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+
+def _apply_pragmas(dbapi_connection, read_only):
+    cursor = dbapi_connection.cursor()
+    try:
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")  # Stored in the file; readers pick it up
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    poolclass=QueuePool,
+    pool_size=WRITE_POOL_SIZE,
+    max_overflow=WRITE_POOL_SIZE
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Separate pool for GET endpoints. Its connections are query_only, so a read path can never
+# take the write lock, and in WAL mode they read a consistent snapshot without waiting for writers.
+read_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    poolclass=QueuePool,
+    pool_size=READ_POOL_SIZE,
+    max_overflow=READ_POOL_SIZE
+)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+@event.listens_for(engine, "connect")
+def _configure_write_connection(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, read_only=False)
+
+@event.listens_for(read_engine, "connect")
+def _configure_read_connection(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, read_only=True)
+
 Base = declarative_base()
 
+# Columns added after the first release. create_all() does not alter existing tables,
+# so init_db adds any that are missing.
+ADDED_COLUMNS = {
+    "resumes": {
+        "near_duplicate_of": "INTEGER",
+        "near_duplicate_similarity": "FLOAT",
+    },
+    "job_descriptions": {
+        "content_hash": "VARCHAR",
+        "artifacts": "TEXT",
+        "embedding": "BLOB",
+    },
+}
+ADDED_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_job_descriptions_content_hash ON job_descriptions (content_hash)",
+    # Covers the leaderboard: rows for a JD in score order, with every column the page returns
+    "CREATE INDEX IF NOT EXISTS ix_evaluation_results_jd_score ON evaluation_results "
+    "(jd_id, final_relevance_score DESC, id DESC, resume_id, suitability_verdict, hard_match_score, semantic_fit_score)",
+    "CREATE INDEX IF NOT EXISTS ix_evaluation_results_resume_id ON evaluation_results (resume_id)",
+    "CREATE INDEX IF NOT EXISTS ix_evaluation_results_evaluated_at ON evaluation_results (evaluated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_improvement_suggestions_evaluation_id ON improvement_suggestions (evaluation_id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_trail_evaluation_id ON audit_trail (evaluation_id, timestamp)",
+]
+
+_init_lock = threading.Lock()
+_initialized = False
+
+def migrate_schema():
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        for statement in ADDED_INDEXES:
+            connection.execute(text(statement))
+        # Refreshes planner statistics for tables whose indexes changed
+        connection.execute(text("PRAGMA optimize"))
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    # Called before every request; the schema work only runs once per process
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        Base.metadata.create_all(bind=engine)
+        migrate_schema()
+        from .score_stats import backfill_score_stats  # Imported here: it needs the models, which import this module
+        backfill_score_stats()
+        _initialized = True
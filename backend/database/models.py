@@ -1,18 +1,21 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, LargeBinary, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
 # Assuming Base is imported or defined here from database.py
 # For simplicity, if database.py and models.py are in the same folder, you might import Base from database
 from .database import Base # Assuming database.py is in the same directory
+from .compression import CompressedText # zstd/zlib-compressed large text columns
 
 class Resume(Base):
     __tablename__ = "resumes"
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True)
-    raw_text = Column(Text)
-    parsed_data = Column(Text) # Store JSON string of parsed data
+    raw_text = Column(CompressedText)
+    parsed_data = Column(CompressedText) # Store JSON string of parsed data
     uploaded_at = Column(DateTime, default=func.now())
+    near_duplicate_of = Column(Integer, ForeignKey("resumes.id"), nullable=True) # Closest earlier near-duplicate, see backend/database/near_duplicates.py
+    near_duplicate_similarity = Column(Float, nullable=True) # Estimated Jaccard similarity to near_duplicate_of
 
     evaluations = relationship("EvaluationResult", back_populates="resume")
 
@@ -20,8 +23,11 @@ class JobDescription(Base):
     __tablename__ = "job_descriptions"
     id = Column(Integer, primary_key=True, index=True)
     role_title = Column(String, index=True)
-    raw_text = Column(Text)
-    parsed_data = Column(Text) # Store JSON string of parsed data
+    raw_text = Column(CompressedText)
+    parsed_data = Column(CompressedText) # Store JSON string of parsed data
+    content_hash = Column(String, unique=True, index=True, nullable=True) # sha256 of the cleaned JD text, see backend/jd_registry.py
+    artifacts = Column(CompressedText, nullable=True) # JSON of precomputed JD-side match data (normalized skills, tokens)
+    embedding = Column(LargeBinary, nullable=True) # float32 sentence embedding of raw_text
     created_at = Column(DateTime, default=func.now())
 
     evaluations = relationship("EvaluationResult", back_populates="job_description")
@@ -35,7 +41,7 @@ class EvaluationResult(Base):
     semantic_fit_score = Column(Float)
     final_relevance_score = Column(Float)
     suitability_verdict = Column(String)
-    llm_analysis_raw = Column(Text) # Store raw JSON output from LLM
+    llm_analysis_raw = Column(CompressedText) # Store raw JSON output from LLM
     evaluated_at = Column(DateTime, default=func.now())
 
     resume = relationship("Resume", back_populates="evaluations")
@@ -43,6 +49,17 @@ class EvaluationResult(Base):
     suggestions = relationship("ImprovementSuggestion", back_populates="evaluation_result")
     audit_trail = relationship("AuditTrail", back_populates="evaluation_result")
 
+class ScoringProfile(Base):
+    __tablename__ = "scoring_profiles"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    hard_match_weight = Column(Float)
+    semantic_match_weight = Column(Float)
+    high_threshold = Column(Float)
+    medium_threshold = Column(Float)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 class ImprovementSuggestion(Base):
     __tablename__ = "improvement_suggestions"
     id = Column(Integer, primary_key=True, index=True)
@@ -62,3 +79,41 @@ class AuditTrail(Base):
     details = Column(Text, nullable=True)
 
     evaluation_result = relationship("EvaluationResult", back_populates="audit_trail")
+
+# Summary tables behind /stats, kept up to date by backend/database/score_stats.py as
+# evaluations are inserted. One row per JD per UTC day, so a query reads days x JDs rows.
+class ScoreStatsDaily(Base):
+    __tablename__ = "score_stats_daily"
+    jd_id = Column(Integer, primary_key=True)
+    day = Column(String, primary_key=True, index=True) # YYYY-MM-DD (UTC) of evaluated_at
+    evaluation_count = Column(Integer, default=0)
+    hard_match_sum = Column(Float, default=0)
+    hard_match_count = Column(Integer, default=0)
+    semantic_fit_sum = Column(Float, default=0)
+    semantic_fit_count = Column(Integer, default=0)
+    final_score_sum = Column(Float, default=0)
+    final_score_count = Column(Integer, default=0)
+
+class ScoreStatsCounter(Base):
+    # Counts per category: kind is "verdict", "score_bucket" or "missing_element"
+    __tablename__ = "score_stats_counters"
+    jd_id = Column(Integer, primary_key=True)
+    day = Column(String, primary_key=True, index=True)
+    kind = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
+
+# MinHash LSH index of resume text for near-duplicate detection
+class ResumeSignature(Base):
+    __tablename__ = "resume_signatures"
+    resume_id = Column(Integer, ForeignKey("resumes.id"), primary_key=True)
+    signature = Column(LargeBinary) # uint64 MinHash values; empty for resumes without text
+
+class ResumeLSHBand(Base):
+    __tablename__ = "resume_lsh_bands"
+    bucket = Column(Integer, primary_key=True) # 64-bit hash of the band number and its slice of the signature
+    resume_id = Column(Integer, ForeignKey("resumes.id"), primary_key=True)
+    band = Column(Integer)
+
+from . import score_stats # Registers the listener that maintains the summary tables
+from . import near_duplicates # Registers the listener that indexes new resumes
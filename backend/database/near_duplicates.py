@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+
+import numpy as np
+from sqlalchemy import event, select, update, func
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .database import SessionLocal, ReadSessionLocal
+from .models import Resume, EvaluationResult, ResumeSignature, ResumeLSHBand
+
+# Near-duplicate resume detection. Each stored resume gets a MinHash signature over word
+# shingles of its cleaned text (parser.clean_text), split into LSH bands kept in
+# resume_lsh_bands next to the resumes table. Resumes sharing any band bucket are candidates;
+# their signatures then estimate the Jaccard similarity. With 16 bands of 8 rows a pair at
+# 0.9 similarity is found with probability >0.9999 and one at 0.5 with about 6%.
+# New resumes are indexed, and linked to the closest earlier near-duplicate, in the same
+# transaction that stores them. Resumes stored before the index existed are added by
+# index_missing_resumes (POST /admin/near_duplicates/reindex).
+
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+# Reuse the semantic and LLM results of a near-duplicate already evaluated against the same JD
+NEAR_DUPLICATE_REUSE = os.getenv("NEAR_DUPLICATE_REUSE", "1") != "0"
+
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+MINHASH_SEED = 1
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+# Buckets holding more resumes than this are skipped by the report (boilerplate-only text)
+MAX_BUCKET_SIZE = 1000
+INDEX_BATCH_SIZE = 500
+
+# Universal hash family h(x) = (a*x + b) mod p. Shingle hashes are 32-bit and a < 2^31,
+# so a*x + b stays inside uint64.
+_random = np.random.RandomState(MINHASH_SEED)
+_PERMUTATION_A = _random.randint(1, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+
+def shingle_hashes(text):
+    words = _WORD_RE.findall((text or "").lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    if len(words) < SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+def minhash_signature(text):
+    # NUM_PERMUTATIONS uint64 minima, or None for text without words
+    hashes = shingle_hashes(text)
+    if not hashes.size:
+        return None
+    return ((np.outer(hashes, _PERMUTATION_A) + _PERMUTATION_B) % MERSENNE_PRIME).min(axis=0)
+
+def signature_from_bytes(data):
+    return np.frombuffer(data, dtype=np.uint64)
+
+def band_buckets(signature):
+    # One signed 64-bit bucket id per band (fits SQLite INTEGER). The band number is part of
+    # the hash, so bucket ids alone are distinct across bands and lookups use only that column.
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes(), digest_size=8, salt=band.to_bytes(16, "big")).digest(), "big", signed=True))
+        for band in range(LSH_BANDS)
+    ]
+
+def estimate_similarity(signature_a, signature_b):
+    return float(np.count_nonzero(signature_a == signature_b)) / NUM_PERMUTATIONS
+
+def _candidate_ids(connection, signature, exclude_ids=()):
+    rows = connection.execute(
+        select(ResumeLSHBand.resume_id).distinct()
+        .where(ResumeLSHBand.bucket.in_([bucket for _, bucket in band_buckets(signature)]))
+    ).scalars().all()
+    return [resume_id for resume_id in rows if resume_id not in exclude_ids]
+
+def _load_signatures(connection, resume_ids):
+    signatures = {}
+    resume_ids = list(resume_ids)
+    for start in range(0, len(resume_ids), INDEX_BATCH_SIZE):
+        chunk = resume_ids[start:start + INDEX_BATCH_SIZE]
+        for resume_id, data in connection.execute(select(ResumeSignature.resume_id, ResumeSignature.signature).where(ResumeSignature.resume_id.in_(chunk))):
+            signatures[resume_id] = signature_from_bytes(data)
+    return signatures
+
+def near_duplicates_of_signature(connection, signature, threshold=NEAR_DUPLICATE_THRESHOLD, exclude_ids=()):
+    # [(resume_id, similarity)], most similar first
+    candidates = _candidate_ids(connection, signature, exclude_ids)
+    if not candidates:
+        return []
+    matches = [
+        (resume_id, estimate_similarity(signature, candidate))
+        for resume_id, candidate in _load_signatures(connection, candidates).items()
+    ]
+    return sorted((match for match in matches if match[1] >= threshold), key=lambda match: (-match[1], match[0]))
+
+def find_near_duplicates(session, text, threshold=NEAR_DUPLICATE_THRESHOLD, exclude_ids=()):
+    signature = minhash_signature(text)
+    if signature is None:
+        return []
+    return near_duplicates_of_signature(session.connection(), signature, threshold, exclude_ids)
+
+def _index_resume(connection, resume_id, text):
+    # Stores the signature and bands and returns the closest earlier near-duplicate, if any
+    signature = minhash_signature(text)
+    if signature is None:
+        # Nothing to compare; the empty row marks the resume as indexed
+        connection.execute(ResumeSignature.__table__.insert(), [{"resume_id": resume_id, "signature": b""}])
+        return None
+    matches = near_duplicates_of_signature(connection, signature, exclude_ids={resume_id})
+    connection.execute(ResumeSignature.__table__.insert(), [{"resume_id": resume_id, "signature": signature.tobytes()}])
+    connection.execute(ResumeLSHBand.__table__.insert(), [
+        {"band": band, "bucket": bucket, "resume_id": resume_id} for band, bucket in band_buckets(signature)
+    ])
+    if not matches:
+        return None
+    duplicate_of, similarity = matches[0]
+    connection.execute(
+        update(Resume).where(Resume.id == resume_id).values(near_duplicate_of=duplicate_of, near_duplicate_similarity=similarity)
+    )
+    return duplicate_of, similarity
+
+@event.listens_for(SessionLocal, "after_flush")
+def _index_new_resumes(session, flush_context):
+    resumes = [instance for instance in session.new if isinstance(instance, Resume)]
+    if not resumes:
+        return
+    connection = session.connection()
+    for resume in resumes:
+        match = _index_resume(connection, resume.id, resume.raw_text)
+        if match:
+            # Visible on the instance without marking it dirty
+            set_committed_value(resume, "near_duplicate_of", match[0])
+            set_committed_value(resume, "near_duplicate_similarity", match[1])
+
+def index_missing_resumes(session, batch_size=INDEX_BATCH_SIZE):
+    # Signs resumes stored before the index existed, oldest first, so each one links to an
+    # earlier copy. Commits per batch; returns the number indexed.
+    count = 0
+    while True:
+        batch = (
+            session.query(Resume.id, Resume.raw_text)
+            .outerjoin(ResumeSignature, ResumeSignature.resume_id == Resume.id)
+            .filter(ResumeSignature.resume_id.is_(None))
+            .order_by(Resume.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        connection = session.connection()
+        for resume_id, raw_text in batch:
+            _index_resume(connection, resume_id, raw_text)
+            count += 1
+        session.commit()
+    logging.info(f"Indexed {count} resumes for near-duplicate detection")
+    return count
+
+def stored_llm_analysis(llm_analysis_raw):
+    # llm_analysis_raw holds the analysis JSON string, JSON-encoded again by the writers
+    value = json.loads(llm_analysis_raw)
+    return value if isinstance(value, str) else json.dumps(value)
+
+def find_reusable_evaluation(resume_text, jd_id, threshold=NEAR_DUPLICATE_THRESHOLD):
+    # Closest stored near-duplicate of resume_text, with its latest complete evaluation
+    # against jd_id when there is one. Returns None when there is no near-duplicate.
+    signature = minhash_signature(resume_text)
+    if signature is None:
+        return None
+    session = ReadSessionLocal()
+    try:
+        matches = near_duplicates_of_signature(session.connection(), signature, threshold)
+        if not matches:
+            return None
+        result = {"resume_id": matches[0][0], "similarity": matches[0][1], "evaluation_id": None}
+        if not NEAR_DUPLICATE_REUSE:
+            return result
+        similarity = dict(matches)
+        evaluations = (
+            session.query(EvaluationResult)
+            .filter(EvaluationResult.resume_id.in_(list(similarity)), EvaluationResult.jd_id == jd_id, EvaluationResult.semantic_fit_score.isnot(None))
+            .order_by(EvaluationResult.id.desc())
+            .all()
+        )
+        for evaluation in sorted(evaluations, key=lambda evaluation: -similarity[evaluation.resume_id]):
+            try:
+                llm_analysis = stored_llm_analysis(evaluation.llm_analysis_raw)
+                analysis = json.loads(llm_analysis)
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(analysis, dict) or analysis.get("deadline_exceeded"):
+                continue  # Partial results are not worth copying
+            return {
+                "resume_id": evaluation.resume_id,
+                "similarity": similarity[evaluation.resume_id],
+                "evaluation_id": evaluation.id,
+                "semantic_fit_score": evaluation.semantic_fit_score,
+                "llm_analysis": llm_analysis,
+                "llm_skipped": analysis.get("cascade") == "templated",
+            }
+        return result
+    finally:
+        session.close()
+
+def near_duplicate_report(session, threshold=NEAR_DUPLICATE_THRESHOLD, limit=100):
+    # Groups of near-duplicate resumes across the corpus, largest group first.
+    # Candidate pairs come from shared LSH buckets; each pair is then checked against threshold.
+    buckets = (
+        session.query(func.group_concat(ResumeLSHBand.resume_id))
+        .group_by(ResumeLSHBand.bucket)
+        .having(func.count() > 1, func.count() <= MAX_BUCKET_SIZE)
+        .all()
+    )
+    pairs = set()
+    for (members,) in buckets:
+        ids = sorted({int(resume_id) for resume_id in members.split(",")})
+        pairs.update((a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+    signatures = _load_signatures(session.connection(), {resume_id for pair in pairs for resume_id in pair})
+
+    # Union-find over the pairs above threshold
+    parent = {}
+
+    def root(resume_id):
+        parent.setdefault(resume_id, resume_id)
+        while parent[resume_id] != resume_id:
+            parent[resume_id] = parent[parent[resume_id]]
+            resume_id = parent[resume_id]
+        return resume_id
+
+    best = {}
+    for a, b in pairs:
+        similarity = estimate_similarity(signatures[a], signatures[b])
+        if similarity >= threshold:
+            parent[root(b)] = root(a)
+            best[a] = max(best.get(a, 0.0), similarity)
+            best[b] = max(best.get(b, 0.0), similarity)
+    groups = {}
+    for resume_id in parent:
+        groups.setdefault(root(resume_id), []).append(resume_id)
+    groups = sorted((sorted(members) for members in groups.values() if len(members) > 1), key=lambda members: (-len(members), members[0]))
+
+    shown = groups[:limit]
+    filenames = {}
+    shown_ids = [resume_id for members in shown for resume_id in members]
+    for start in range(0, len(shown_ids), INDEX_BATCH_SIZE):
+        filenames.update(session.query(Resume.id, Resume.filename).filter(Resume.id.in_(shown_ids[start:start + INDEX_BATCH_SIZE])).all())
+    indexed = session.query(func.count(ResumeSignature.resume_id)).scalar()
+    total = session.query(func.count(Resume.id)).scalar()
+    return {
+        "threshold": threshold,
+        "indexed_resumes": indexed,
+        "unindexed_resumes": max(0, total - indexed),
+        "groups_total": len(groups),
+        "duplicate_resumes_total": sum(len(members) - 1 for members in groups),
+        "groups": [
+            {
+                "size": len(members),
+                "resumes": [
+                    {"resume_id": resume_id, "filename": filenames.get(resume_id, "N/A"), "best_similarity": round(best[resume_id], 3)}
+                    for resume_id in members
+                ],
+            }
+            for members in shown
+        ],
+    }
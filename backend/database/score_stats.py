@@ -0,0 +1,339 @@
+import os
+import json
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import event, func, select, delete, or_, and_
+from sqlalchemy.dialects.sqlite import insert
+
+from .database import SessionLocal
+from .models import EvaluationResult, ScoreStatsDaily, ScoreStatsCounter
+
+# Incrementally maintained score statistics. Every flush that inserts EvaluationResult rows
+# adds their scores, verdicts, score buckets and missing elements to per-JD, per-day summary
+# rows in the same transaction, so /stats never has to read the evaluations themselves.
+# The summaries record evaluations as they were scored: archiving old evaluations (see
+# backend/retention.py) leaves them in place, and restoring them from an archive does not
+# count them twice. rebuild_score_stats recomputes everything from evaluation_results plus
+# the evaluation archives, so a rebuild after a retention run keeps the archived ones.
+
+SCORE_BUCKET_WIDTH = 10
+TOP_MISSING_ELEMENTS = 10
+MAX_MISSING_ELEMENTS = 100
+MAX_ELEMENT_LENGTH = 200
+REBUILD_BATCH_SIZE = 1000
+# Set in session.info by writers whose inserted evaluations must not be counted
+SKIP_SCORE_STATS = "skip_score_stats"
+VERDICTS = ("High", "Medium", "Low")
+# Element written by llm_analyzer when the LLM output could not be parsed; not a real gap
+PLACEHOLDER_ELEMENT = "n/a"
+# Missing elements are LLM free text, often different for every evaluation. Only this many
+# distinct elements get their own counter per JD and day; the rest are counted under
+# OTHER_ELEMENT, so the counter table grows with JDs and days rather than with evaluations.
+MISSING_ELEMENT_KEYS = int(os.getenv("STATS_MISSING_ELEMENT_KEYS", "50"))
+OTHER_ELEMENT = "(other)"
+
+class StatsError(ValueError):
+    pass
+
+def score_bucket(score):
+    # Lower bound of the score's bucket; 100 falls in the top bucket
+    return min(int(score) // SCORE_BUCKET_WIDTH, 100 // SCORE_BUCKET_WIDTH - 1) * SCORE_BUCKET_WIDTH
+
+def stats_day(evaluated_at):
+    # evaluated_at is naive UTC (SQLite's CURRENT_TIMESTAMP)
+    return (evaluated_at or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+
+def missing_elements(llm_analysis_raw):
+    # Element names from the stored LLM analysis. The column holds the analysis JSON,
+    # itself JSON-encoded as a string by the writers.
+    try:
+        analysis = json.loads(llm_analysis_raw) if llm_analysis_raw else {}
+        if isinstance(analysis, str):
+            analysis = json.loads(analysis)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(analysis, dict):
+        return []
+    elements = set()
+    for item in analysis.get("missing_elements") or []:
+        element = item.get("element") if isinstance(item, dict) else None
+        if isinstance(element, str) and element.strip():
+            elements.add(" ".join(element.split()).lower()[:MAX_ELEMENT_LENGTH])
+    elements.discard(PLACEHOLDER_ELEMENT)
+    return sorted(elements)
+
+def add_evaluation(daily, counters, jd_id, day, hard_match_score, semantic_fit_score, final_score, verdict, llm_analysis_raw):
+    # Accumulates one evaluation into the pending increments
+    jd_id = jd_id or 0  # Evaluations without a JD are grouped under 0
+    totals = daily[(jd_id, day)]
+    totals["evaluation_count"] += 1
+    if hard_match_score is not None:
+        totals["hard_match_sum"] += hard_match_score
+        totals["hard_match_count"] += 1
+    if semantic_fit_score is not None:
+        totals["semantic_fit_sum"] += semantic_fit_score
+        totals["semantic_fit_count"] += 1
+    if final_score is not None:
+        totals["final_score_sum"] += final_score
+        totals["final_score_count"] += 1
+        counters[(jd_id, day, "score_bucket", str(score_bucket(final_score)))] += 1
+    if verdict:
+        counters[(jd_id, day, "verdict", verdict)] += 1
+    for element in missing_elements(llm_analysis_raw):
+        counters[(jd_id, day, "missing_element", element)] += 1
+
+def new_increments():
+    return defaultdict(Counter), Counter()
+
+def _cap_missing_elements(connection, counters):
+    # Folds missing elements beyond the MISSING_ELEMENT_KEYS already counted for their JD and day
+    # into OTHER_ELEMENT. Within one flush the most frequent elements take the free slots.
+    capped = Counter()
+    pending = defaultdict(list)
+    for (jd_id, day, kind, key), count in counters.items():
+        if kind == "missing_element" and key != OTHER_ELEMENT:
+            pending[(jd_id, day)].append((key, count))
+        else:
+            capped[(jd_id, day, kind, key)] += count
+    for (jd_id, day), elements in pending.items():
+        existing = set(connection.execute(
+            select(ScoreStatsCounter.key).where(
+                ScoreStatsCounter.jd_id == jd_id,
+                ScoreStatsCounter.day == day,
+                ScoreStatsCounter.kind == "missing_element",
+                ScoreStatsCounter.key != OTHER_ELEMENT
+            )
+        ).scalars())
+        free = MISSING_ELEMENT_KEYS - len(existing)
+        for key, count in sorted(elements, key=lambda element: (-element[1], element[0])):
+            if key not in existing:
+                if free > 0:
+                    free -= 1
+                else:
+                    key = OTHER_ELEMENT
+            capped[(jd_id, day, "missing_element", key)] += count
+    return capped
+
+def apply_increments(connection, daily, counters):
+    # One upsert statement per table, executed for all pending rows
+    if daily:
+        statement = insert(ScoreStatsDaily)
+        columns = ["evaluation_count", "hard_match_sum", "hard_match_count", "semantic_fit_sum", "semantic_fit_count", "final_score_sum", "final_score_count"]
+        statement = statement.on_conflict_do_update(
+            index_elements=["jd_id", "day"],
+            set_={column: getattr(ScoreStatsDaily, column) + getattr(statement.excluded, column) for column in columns}
+        )
+        connection.execute(statement, [
+            {"jd_id": jd_id, "day": day, **{column: totals[column] for column in columns}}
+            for (jd_id, day), totals in daily.items()
+        ])
+    if counters:
+        counters = _cap_missing_elements(connection, counters)
+        statement = insert(ScoreStatsCounter)
+        statement = statement.on_conflict_do_update(
+            index_elements=["jd_id", "day", "kind", "key"],
+            set_={"count": ScoreStatsCounter.count + statement.excluded.count}
+        )
+        connection.execute(statement, [
+            {"jd_id": jd_id, "day": day, "kind": kind, "key": key, "count": count}
+            for (jd_id, day, kind, key), count in counters.items()
+        ])
+
+@event.listens_for(SessionLocal, "after_flush")
+def _count_new_evaluations(session, flush_context):
+    if session.info.get(SKIP_SCORE_STATS):
+        return
+    evaluations = [instance for instance in session.new if isinstance(instance, EvaluationResult)]
+    if not evaluations:
+        return
+    connection = session.connection()
+    # evaluated_at is filled in by the database, so it is read back for the new rows
+    evaluated_at = {}
+    ids = [evaluation.id for evaluation in evaluations]
+    for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+        chunk = ids[start:start + REBUILD_BATCH_SIZE]
+        evaluated_at.update(connection.execute(
+            select(EvaluationResult.id, EvaluationResult.evaluated_at).where(EvaluationResult.id.in_(chunk))
+        ).all())
+    daily, counters = new_increments()
+    for evaluation in evaluations:
+        add_evaluation(
+            daily, counters, evaluation.jd_id, stats_day(evaluated_at.get(evaluation.id)),
+            evaluation.hard_match_score, evaluation.semantic_fit_score, evaluation.final_relevance_score,
+            evaluation.suitability_verdict, evaluation.llm_analysis_raw
+        )
+    apply_increments(connection, daily, counters)
+
+def _archived_evaluations(archive_dir, stored_ids):
+    # Archived evaluations in the shape of the rows query; restored ones are already stored.
+    # Imported here because retention imports this module.
+    from backend import retention
+    for record in retention.iter_archive("evaluations", archive_dir or retention.ARCHIVE_DIR):
+        evaluation = record["evaluation"]
+        if evaluation["id"] in stored_ids:
+            continue
+        evaluated_at = datetime.fromisoformat(evaluation["evaluated_at"]) if evaluation.get("evaluated_at") else None
+        yield (
+            evaluation["id"], evaluation.get("jd_id"), evaluated_at, evaluation.get("hard_match_score"),
+            evaluation.get("semantic_fit_score"), evaluation.get("final_relevance_score"),
+            evaluation.get("suitability_verdict"), evaluation.get("llm_analysis_raw")
+        )
+
+def rebuild_score_stats(session, batch_size=REBUILD_BATCH_SIZE, archive_dir=None):
+    # Recomputes the summary tables from the stored and the archived evaluations
+    # (archive_dir defaults to retention.ARCHIVE_DIR). The caller commits.
+    session.execute(delete(ScoreStatsDaily))
+    session.execute(delete(ScoreStatsCounter))
+    rows = session.query(
+        EvaluationResult.id,
+        EvaluationResult.jd_id,
+        EvaluationResult.evaluated_at,
+        EvaluationResult.hard_match_score,
+        EvaluationResult.semantic_fit_score,
+        EvaluationResult.final_relevance_score,
+        EvaluationResult.suitability_verdict,
+        EvaluationResult.llm_analysis_raw
+    ).order_by(EvaluationResult.id).yield_per(batch_size)
+    connection = session.connection()
+    daily, counters = new_increments()
+    count = 0
+    stored_ids = set()
+
+    def stored_rows():
+        for row in rows:
+            stored_ids.add(row[0])
+            yield row
+
+    for rows_source in (stored_rows(), _archived_evaluations(archive_dir, stored_ids)):
+        for _, jd_id, evaluated_at, hard_match_score, semantic_fit_score, final_score, verdict, llm_analysis_raw in rows_source:
+            add_evaluation(daily, counters, jd_id, stats_day(evaluated_at), hard_match_score, semantic_fit_score, final_score, verdict, llm_analysis_raw)
+            count += 1
+            if count % batch_size == 0:
+                apply_increments(connection, daily, counters)
+                daily, counters = new_increments()
+    apply_increments(connection, daily, counters)
+    logging.info(f"Rebuilt score statistics from {count} evaluations ({len(stored_ids)} stored, {count - len(stored_ids)} archived)")
+    return count
+
+def backfill_score_stats():
+    # Fills the summary tables for a database that has evaluations from before they existed.
+    # Archives written before then are folded in by the rebuild as well.
+    session = SessionLocal()
+    try:
+        if session.query(ScoreStatsDaily.jd_id).first() is None and session.query(EvaluationResult.id).first() is not None:
+            rebuild_score_stats(session)
+            session.commit()
+    finally:
+        session.close()
+
+def _parse_day(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise StatsError(f"{name} must be an ISO date, e.g. 2024-05-01")
+
+def parse_stats_filters(args, today=None):
+    # ?jd_id=, a window of whole UTC days (?date_from=/?date_to=, inclusive, or ?days=N
+    # for the last N days including today) and ?top_missing= (default 10)
+    filters = {"jd_id": None, "date_from": None, "date_to": None, "top_missing": TOP_MISSING_ELEMENTS}
+    if args.get("jd_id"):
+        try:
+            filters["jd_id"] = int(args["jd_id"])
+        except ValueError:
+            raise StatsError("jd_id must be an integer")
+    if args.get("days"):
+        if args.get("date_from") or args.get("date_to"):
+            raise StatsError("Use either days or date_from/date_to, not both")
+        try:
+            days = int(args["days"])
+        except ValueError:
+            raise StatsError("days must be an integer")
+        if days < 1:
+            raise StatsError("days must be at least 1")
+        today = today or datetime.now(timezone.utc).date()
+        filters["date_from"] = today - timedelta(days=days - 1)
+    if args.get("date_from"):
+        filters["date_from"] = _parse_day(args["date_from"], "date_from")
+    if args.get("date_to"):
+        filters["date_to"] = _parse_day(args["date_to"], "date_to")
+    if args.get("top_missing"):
+        try:
+            filters["top_missing"] = int(args["top_missing"])
+        except ValueError:
+            raise StatsError("top_missing must be an integer")
+        if not 0 <= filters["top_missing"] <= MAX_MISSING_ELEMENTS:
+            raise StatsError(f"top_missing must be between 0 and {MAX_MISSING_ELEMENTS}")
+    return filters
+
+def _filtered(query, model, filters):
+    if filters["jd_id"] is not None:
+        query = query.filter(model.jd_id == filters["jd_id"])
+    if filters["date_from"]:
+        query = query.filter(model.day >= filters["date_from"].isoformat())
+    if filters["date_to"]:
+        query = query.filter(model.day <= filters["date_to"].isoformat())
+    return query
+
+def _average(total, count):
+    return round(total / count, 2) if count else None
+
+def score_stats_summary(session, filters):
+    totals = _filtered(session.query(
+        func.coalesce(func.sum(ScoreStatsDaily.evaluation_count), 0),
+        func.coalesce(func.sum(ScoreStatsDaily.hard_match_sum), 0),
+        func.coalesce(func.sum(ScoreStatsDaily.hard_match_count), 0),
+        func.coalesce(func.sum(ScoreStatsDaily.semantic_fit_sum), 0),
+        func.coalesce(func.sum(ScoreStatsDaily.semantic_fit_count), 0),
+        func.coalesce(func.sum(ScoreStatsDaily.final_score_sum), 0),
+        func.coalesce(func.sum(ScoreStatsDaily.final_score_count), 0)
+    ), ScoreStatsDaily, filters).one()
+    evaluation_count, hard_sum, hard_count, semantic_sum, semantic_count, final_sum, final_count = totals
+
+    count_total = func.sum(ScoreStatsCounter.count)
+    categories = dict(
+        ((kind, key), count)
+        for kind, key, count in _filtered(
+            session.query(ScoreStatsCounter.kind, ScoreStatsCounter.key, count_total)
+            .filter(or_(
+                ScoreStatsCounter.kind.in_(("verdict", "score_bucket")),
+                and_(ScoreStatsCounter.kind == "missing_element", ScoreStatsCounter.key == OTHER_ELEMENT)
+            )),
+            ScoreStatsCounter, filters
+        ).group_by(ScoreStatsCounter.kind, ScoreStatsCounter.key).all()
+    )
+    top_missing = []
+    if filters["top_missing"]:
+        top_missing = _filtered(
+            session.query(ScoreStatsCounter.key, count_total)
+            .filter(ScoreStatsCounter.kind == "missing_element", ScoreStatsCounter.key.notin_((PLACEHOLDER_ELEMENT, OTHER_ELEMENT))),
+            ScoreStatsCounter, filters
+        ).group_by(ScoreStatsCounter.key).order_by(count_total.desc(), ScoreStatsCounter.key).limit(filters["top_missing"]).all()
+
+    verdict_counts = {verdict: categories.get(("verdict", verdict), 0) for verdict in VERDICTS}
+    other_verdicts = sum(count for (kind, key), count in categories.items() if kind == "verdict" and key not in VERDICTS)
+    if other_verdicts:
+        verdict_counts["Other"] = other_verdicts
+    return {
+        "jd_id": filters["jd_id"],
+        "date_from": filters["date_from"].isoformat() if filters["date_from"] else None,
+        "date_to": filters["date_to"].isoformat() if filters["date_to"] else None,
+        "evaluation_count": evaluation_count,
+        "average_scores": {
+            "hard_match": _average(hard_sum, hard_count),
+            "semantic_fit": _average(semantic_sum, semantic_count),
+            "final_relevance": _average(final_sum, final_count),
+        },
+        "verdict_counts": verdict_counts,
+        "score_histogram": [
+            {
+                "range": f"{low}-{low + SCORE_BUCKET_WIDTH - 1 if low + SCORE_BUCKET_WIDTH < 100 else 100}",
+                "count": categories.get(("score_bucket", str(low)), 0)
+            }
+            for low in range(0, 100, SCORE_BUCKET_WIDTH)
+        ],
+        "top_missing_elements": [{"element": element, "count": count} for element, count in top_missing],
+        # Mentions of elements beyond the per-day cap, see MISSING_ELEMENT_KEYS
+        "other_missing_elements": categories.get(("missing_element", OTHER_ELEMENT), 0),
+    }
@@ -0,0 +1,79 @@
+import os
+import math
+import time
+import contextvars
+from contextlib import contextmanager
+
+from backend.metrics import TIMEOUTS
+
+# Per-request time budgets. The deadline is an absolute time.monotonic() value kept in a
+# context variable, so every stage of a request (and work it hands to executors with a
+# copied context) can ask how much time is left. Stages that cannot finish in time raise
+# DeadlineExceeded; the pipeline then returns what the finished stages produced.
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+# 0 disables the default; a client header still applies
+REQUEST_DEADLINE_S = float(os.getenv("REQUEST_DEADLINE_S", "60"))
+BULK_REQUEST_DEADLINE_S = float(os.getenv("BULK_REQUEST_DEADLINE_S", "0"))
+MAX_REQUEST_DEADLINE_S = float(os.getenv("MAX_REQUEST_DEADLINE_S", "600"))
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage):
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+def parse_budget(header_value, default_s):
+    # Header is the remaining budget in milliseconds. Missing, invalid, zero or negative values
+    # fall back to the default, so only the server configuration can turn the deadline off.
+    try:
+        budget_s = float(header_value) / 1000.0 if header_value else None
+    except ValueError:
+        budget_s = None
+    if budget_s is None or not math.isfinite(budget_s) or budget_s <= 0:
+        budget_s = default_s
+    if budget_s <= 0:
+        return None
+    return min(budget_s, MAX_REQUEST_DEADLINE_S)
+
+def set_budget(budget_s):
+    # Starts the clock for this request; None means no deadline
+    return _deadline.set(time.monotonic() + budget_s if budget_s else None)
+
+def reset(token):
+    _deadline.reset(token)
+
+@contextmanager
+def budget(budget_s):
+    token = set_budget(budget_s)
+    try:
+        yield
+    finally:
+        reset(token)
+
+def remaining():
+    # Seconds left, or None when the request has no deadline
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+def bounded_timeout(timeout):
+    # The smaller of timeout and the time left (timeout may be None for "no limit")
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+def fail(stage):
+    TIMEOUTS.inc(stage=stage)
+    raise DeadlineExceeded(stage)
+
+def check(stage):
+    if expired():
+        fail(stage)
@@ -0,0 +1,205 @@
+import io
+import os
+import csv
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from backend.database.models import Resume, JobDescription, EvaluationResult
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional: only needed for format=parquet
+    pyarrow = None
+
+# Streaming export of evaluations for spreadsheets and BI tools. Rows come off the database
+# cursor EXPORT_BATCH_SIZE at a time (yield_per) and each batch is encoded and handed to
+# the response before the next is read, so memory stays flat however large the table is.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+VERDICTS = ("High", "Medium", "Low")
+
+EXPORT_COLUMNS = [
+    "evaluation_id", "evaluated_at", "jd_id", "jd_role_title", "resume_id", "resume_filename",
+    "hard_match_score", "semantic_fit_score", "final_relevance_score", "suitability_verdict"
+]
+
+class ExportError(ValueError):
+    pass
+
+def _parse_date(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"{name} must be an ISO date or datetime, e.g. 2024-05-01")
+
+def _is_date_only(value):
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+def parse_export_filters(args):
+    # Validates the query string up front, before any of the response has been sent
+    export_format = (args.get("format") or "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if export_format == "parquet" and pyarrow is None:
+        raise ExportError("Parquet export needs the pyarrow package")
+    filters = {"format": export_format, "jd_id": None, "verdicts": None, "date_from": None, "date_to": None, "date_before": None}
+    if args.get("jd_id"):
+        try:
+            filters["jd_id"] = int(args["jd_id"])
+        except ValueError:
+            raise ExportError("jd_id must be an integer")
+    if args.get("verdict"):
+        verdicts = [v.strip().capitalize() for v in args["verdict"].split(",") if v.strip()]
+        unknown = [v for v in verdicts if v not in VERDICTS]
+        if unknown:
+            raise ExportError(f"Unknown verdict(s) {unknown}; use {', '.join(VERDICTS)}")
+        filters["verdicts"] = verdicts
+    if args.get("date_from"):
+        filters["date_from"] = _parse_date(args["date_from"], "date_from")
+    if args.get("date_to"):
+        # A date-only date_to includes that whole day, as in /stats; a datetime is an inclusive bound
+        if _is_date_only(args["date_to"]):
+            filters["date_before"] = _parse_date(args["date_to"], "date_to") + timedelta(days=1)
+        else:
+            filters["date_to"] = _parse_date(args["date_to"], "date_to")
+    return filters
+
+def iter_export_rows(session, filters, batch_size=EXPORT_BATCH_SIZE):
+    # Plain tuples in EXPORT_COLUMNS order, oldest evaluation first
+    query = (
+        session.query(
+            EvaluationResult.id,
+            EvaluationResult.evaluated_at,
+            EvaluationResult.jd_id,
+            JobDescription.role_title,
+            EvaluationResult.resume_id,
+            Resume.filename,
+            EvaluationResult.hard_match_score,
+            EvaluationResult.semantic_fit_score,
+            EvaluationResult.final_relevance_score,
+            EvaluationResult.suitability_verdict
+        )
+        .outerjoin(Resume, Resume.id == EvaluationResult.resume_id)
+        .outerjoin(JobDescription, JobDescription.id == EvaluationResult.jd_id)
+    )
+    if filters["jd_id"] is not None:
+        query = query.filter(EvaluationResult.jd_id == filters["jd_id"])
+    if filters["verdicts"]:
+        query = query.filter(EvaluationResult.suitability_verdict.in_(filters["verdicts"]))
+    if filters["date_from"]:
+        query = query.filter(EvaluationResult.evaluated_at >= filters["date_from"])
+    if filters["date_to"]:
+        query = query.filter(EvaluationResult.evaluated_at <= filters["date_to"])
+    if filters["date_before"]:
+        query = query.filter(EvaluationResult.evaluated_at < filters["date_before"])
+    for row in query.order_by(EvaluationResult.id).yield_per(batch_size):
+        yield tuple(row)
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def encode_csv(rows, batch_size=EXPORT_BATCH_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in _batches(rows, batch_size):
+        writer.writerows([_json_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def encode_ndjson(rows, batch_size=EXPORT_BATCH_SIZE):
+    for batch in _batches(rows, batch_size):
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, map(_json_value, row)))) + "\n" for row in batch).encode("utf-8")
+
+class _DrainableSink(io.RawIOBase):
+    # Write-only file for ParquetWriter; drain() hands over what has been written so far
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def parquet_schema():
+    return pyarrow.schema([
+        ("evaluation_id", pyarrow.int64()),
+        ("evaluated_at", pyarrow.timestamp("us")),
+        ("jd_id", pyarrow.int64()),
+        ("jd_role_title", pyarrow.string()),
+        ("resume_id", pyarrow.int64()),
+        ("resume_filename", pyarrow.string()),
+        ("hard_match_score", pyarrow.float64()),
+        ("semantic_fit_score", pyarrow.float64()),
+        ("final_relevance_score", pyarrow.float64()),
+        ("suitability_verdict", pyarrow.string()),
+    ])
+
+def encode_parquet(rows, batch_size=EXPORT_BATCH_SIZE):
+    # One row group per batch; the footer is written when the rows run out
+    schema = parquet_schema()
+    sink = _DrainableSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in _batches(rows, batch_size):
+            columns = list(zip(*batch))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+def gzip_stream(chunks, level=6):
+    # Content-Encoding: gzip, compressed chunk by chunk
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_filename(export_format):
+    return f"evaluations-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
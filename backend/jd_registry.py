@@ -0,0 +1,107 @@
+import json
+import hashlib
+import logging
+import numpy as np
+from sqlalchemy.dialects.sqlite import insert
+
+from backend.parser import parse_job_description, clean_text
+from backend.parse_results import ParsedJD
+from backend.matcher import prepare_jd_artifacts, JD_ARTIFACTS_VERSION
+from backend.semantic_matcher import embed_text
+from backend.database.database import SessionLocal
+from backend.database.models import JobDescription, AuditTrail
+from backend.metrics import CACHE_HITS, CACHE_MISSES
+
+# Job descriptions are registered once under a hash of their cleaned text. Registration
+# parses the JD and stores every JD-side artifact (parsed fields, normalized skill lists,
+# BM25 tokens, embedding), so screening N resumes against it does the JD work once.
+
+EMBEDDING_DTYPE = np.float32
+
+class JDNotFoundError(LookupError):
+    pass
+
+def jd_content_hash(jd_text):
+    # Whitespace and header/footer noise do not change the hash
+    return hashlib.sha256(clean_text(jd_text).encode("utf-8")).hexdigest()
+
+def _fill_artifacts(jd_row, parsed_jd=None):
+    if parsed_jd is None:
+        parsed_jd = ParsedJD.from_storage(jd_row.parsed_data, jd_row.raw_text)
+    jd_row.artifacts = json.dumps(prepare_jd_artifacts(parsed_jd))
+    jd_row.embedding = np.asarray(embed_text(jd_row.raw_text or ""), dtype=EMBEDDING_DTYPE).tobytes()
+
+def _needs_artifacts(jd_row):
+    if not jd_row.artifacts or jd_row.embedding is None:
+        return True
+    return json.loads(jd_row.artifacts).get("version") != JD_ARTIFACTS_VERSION
+
+def register_jd(session, jd_text):
+    # Upsert by content hash. Returns (jd_row, created); the caller commits.
+    content_hash = jd_content_hash(jd_text)
+    existing = session.query(JobDescription).filter(JobDescription.content_hash == content_hash).first()
+    if existing is not None:
+        CACHE_HITS.inc(cache="jd_registry")
+        if _needs_artifacts(existing):
+            _fill_artifacts(existing)
+        return existing, False
+
+    CACHE_MISSES.inc(cache="jd_registry")
+    parsed_jd = parse_job_description(jd_text)
+    jd_row = JobDescription(
+        role_title=parsed_jd.role_title or "N/A",
+        raw_text=jd_text,
+        parsed_data=parsed_jd.to_storage(),
+        content_hash=content_hash
+    )
+    _fill_artifacts(jd_row, parsed_jd)
+    # Another worker may register the same JD between our lookup and insert. ON CONFLICT keeps
+    # that out of the transaction (no IntegrityError, no savepoint, which pysqlite does not issue
+    # reliably); rowcount tells whether our row went in.
+    values = {column.key: getattr(jd_row, column.key) for column in JobDescription.__table__.columns if getattr(jd_row, column.key) is not None}
+    inserted = session.execute(insert(JobDescription).values(**values).on_conflict_do_nothing(index_elements=["content_hash"])).rowcount
+    jd_row = session.query(JobDescription).filter(JobDescription.content_hash == content_hash).one()
+    if not inserted:
+        logging.debug(f"JD {content_hash[:12]} registered concurrently, reusing existing row")
+        return jd_row, False
+
+    session.add(AuditTrail(evaluation_id=None, action="Job Description registered", details=f"JD ID: {jd_row.id}, Role: {jd_row.role_title}, Hash: {content_hash[:12]}"))
+    return jd_row, True
+
+def load_jd(session, jd_id):
+    jd_row = session.get(JobDescription, jd_id)
+    if jd_row is None:
+        raise JDNotFoundError(f"Job description {jd_id} not found")
+    if _needs_artifacts(jd_row):
+        # Rows created before the registry existed get their artifacts on first use
+        _fill_artifacts(jd_row)
+    return jd_row
+
+def jd_to_dict(jd_row):
+    # Plain-data view that can be used after the session is closed. parsed_data is a ParsedJD;
+    # send parsed_data.to_dict() in API responses.
+    return {
+        "id": jd_row.id,
+        "content_hash": jd_row.content_hash,
+        "role_title": jd_row.role_title,
+        "raw_text": jd_row.raw_text or "",
+        "parsed_data": ParsedJD.from_storage(jd_row.parsed_data, jd_row.raw_text),
+        "artifacts": json.loads(jd_row.artifacts) if jd_row.artifacts else None,
+        "embedding": np.frombuffer(jd_row.embedding, dtype=EMBEDDING_DTYPE) if jd_row.embedding is not None else None,
+    }
+
+def resolve_jd(jd_id=None, jd_text=None):
+    # Returns (registered_jd, created) for either an existing jd_id or raw JD text
+    session = SessionLocal()
+    try:
+        if jd_id is not None:
+            jd_row, created = load_jd(session, jd_id), False
+        else:
+            jd_row, created = register_jd(session, jd_text)
+        session.commit()
+        return jd_to_dict(jd_row), created
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,58 @@
+from sqlalchemy import tuple_
+
+from backend.database.models import Resume, EvaluationResult
+
+# Top candidates for a JD, best first, served from ix_evaluation_results_jd_score (see
+# backend/database/database.py). Pages continue from a (score, id) cursor instead of an
+# OFFSET, so page 100 costs the same as page 1 and rows inserted meanwhile do not shift pages.
+
+LEADERBOARD_DEFAULT_LIMIT = 20
+LEADERBOARD_MAX_LIMIT = 200
+
+def encode_cursor(score, evaluation_id):
+    return f"{score!r}:{evaluation_id}"
+
+def decode_cursor(cursor):
+    # Raises ValueError for a malformed cursor
+    score, evaluation_id = cursor.rsplit(":", 1)
+    return float(score), int(evaluation_id)
+
+def leaderboard_page(session, jd_id, limit=LEADERBOARD_DEFAULT_LIMIT, cursor=None):
+    query = (
+        session.query(
+            EvaluationResult.id,
+            EvaluationResult.final_relevance_score,
+            EvaluationResult.resume_id,
+            EvaluationResult.suitability_verdict,
+            EvaluationResult.hard_match_score,
+            EvaluationResult.semantic_fit_score
+        )
+        .filter(EvaluationResult.jd_id == jd_id, EvaluationResult.final_relevance_score.isnot(None))
+    )
+    if cursor:
+        # Row-value comparison, which SQLite turns into a range seek on the index
+        query = query.filter(tuple_(EvaluationResult.final_relevance_score, EvaluationResult.id) < tuple_(*decode_cursor(cursor)))
+    # One extra row tells whether there is a next page
+    rows = query.order_by(EvaluationResult.final_relevance_score.desc(), EvaluationResult.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Filenames for this page only: one primary-key lookup per row
+    resume_ids = {row.resume_id for row in rows}
+    filenames = dict(session.query(Resume.id, Resume.filename).filter(Resume.id.in_(resume_ids)).all()) if resume_ids else {}
+    return {
+        "jd_id": jd_id,
+        "candidates": [
+            {
+                "evaluation_id": row.id,
+                "resume_id": row.resume_id,
+                "resume_filename": filenames.get(row.resume_id, "N/A"),
+                "final_relevance_score": row.final_relevance_score,
+                "suitability_verdict": row.suitability_verdict,
+                "hard_match_score": row.hard_match_score,
+                "semantic_fit_score": row.semantic_fit_score,
+            }
+            for row in rows
+        ],
+        "next_cursor": encode_cursor(rows[-1].final_relevance_score, rows[-1].id) if has_more else None,
+    }
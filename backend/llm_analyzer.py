@@ -1,12 +1,107 @@
 import os
 import json
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from transformers import pipeline
 
+from backend.batching import MicroBatcher
+from backend.metrics import timed
+from backend.admission import limit_stage
+from backend import deadlines
+from backend.deadlines import DeadlineExceeded
+from backend import model_client
+
 # Initialize a local Hugging Face text generation pipeline
 # 'distilgpt2' is a small, fast model for text generation.
 # For better quality, consider larger models, but they require more resources.
-text_generator = pipeline("text-generation", model="distilgpt2")
-
+# With a shared model server (backend/model_server.py) the pipeline lives there instead.
+text_generator = None
+if not model_client.use_remote_models():
+    text_generator = pipeline("text-generation", model="distilgpt2")
+
+    # Batched generation needs a pad token (GPT-2 has none) and left padding so prompts end where generation starts
+    text_generator.tokenizer.pad_token_id = text_generator.model.config.eos_token_id
+    text_generator.tokenizer.padding_side = "left"
+
+# Prompts from concurrent requests are generated together in one forward pass
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "4"))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "10"))
+LLM_MAX_NEW_TOKENS = 500
+# Below this much remaining request time a generation is not worth starting
+LLM_MIN_TIME_S = float(os.getenv("LLM_MIN_TIME_S", "1.0"))
+# Requests in one micro-batch share a forward pass only if their deadlines are this close
+LLM_DEADLINE_GROUP_S = float(os.getenv("LLM_DEADLINE_GROUP_S", "2.0"))
+
+def batch_max_time(requests):
+    # requests are (prompt, deadline) pairs, deadline a time.monotonic() value or None.
+    # Generation for the whole group stops at the tightest deadline in it.
+    deadlines_in_batch = [deadline for _, deadline in requests if deadline is not None]
+    if not deadlines_in_batch:
+        return None
+    return max(0.0, min(deadlines_in_batch) - time.monotonic())
+
+def group_by_deadline(requests):
+    # Splits a micro-batch into groups of request indices, tightest deadlines first. A request with
+    # plenty of time is not generated alongside a nearly expired one, whose deadline would cut it off.
+    order = sorted(range(len(requests)), key=lambda i: (requests[i][1] is None, requests[i][1] or 0.0))
+    groups = []
+    for i in order:
+        deadline = requests[i][1]
+        if groups:
+            first = requests[groups[-1][0]][1]
+            if (first is None and deadline is None) or (first is not None and deadline is not None and deadline - first <= LLM_DEADLINE_GROUP_S):
+                groups[-1].append(i)
+                continue
+        groups.append([i])
+    return groups
+
+def _generate_group(requests):
+    # Returns (text, cut_short) per request; cut_short when max_time stopped the generation
+    prompts = [prompt for prompt, _ in requests]
+    max_time = batch_max_time(requests)
+    if text_generator is None:
+        return [tuple(output) for output in model_client.call("generate", prompts, max_time)]
+    # max_time adds transformers' MaxTimeCriteria, checked after every generated token
+    generate_kwargs = {"max_time": max_time} if max_time is not None else {}
+    started = time.monotonic()
+    outputs = text_generator(prompts, max_new_tokens=LLM_MAX_NEW_TOKENS, num_return_sequences=1, batch_size=len(prompts), **generate_kwargs)
+    cut_short = max_time is not None and time.monotonic() - started >= max_time
+    return [(output[0]['generated_text'], cut_short) for output in outputs]
+
+def _generate_batch(requests):
+    results = [None] * len(requests)
+    for group in group_by_deadline(requests):
+        for i, result in zip(group, _generate_group([requests[i] for i in group])):
+            results[i] = result
+    return results
+
+generation_batcher = MicroBatcher(
+    _generate_batch,
+    max_batch_size=LLM_BATCH_MAX_SIZE,
+    max_wait_ms=LLM_BATCH_MAX_WAIT_MS,
+    name="text-generation"
+)
+
+def generate_within_deadline(prompt, stage):
+    # Runs one prompt through the batcher, bounded by the request deadline. Output cut short
+    # by a deadline is unusable JSON, so an overrun raises DeadlineExceeded instead, also when
+    # it was the deadline of a request generated in the same group.
+    left = deadlines.remaining()
+    if left is not None and left < LLM_MIN_TIME_S:
+        deadlines.fail(stage)
+    future = generation_batcher.submit((prompt, time.monotonic() + left if left is not None else None))
+    try:
+        raw_output, cut_short = future.result(timeout=left)
+    except FutureTimeoutError:
+        future.cancel()
+        deadlines.fail(stage)
+    if cut_short:
+        deadlines.fail(stage)
+    deadlines.check(stage)
+    return raw_output
+
+@limit_stage("llm")
+@timed("llm_analysis")
 def analyze_match(resume_text, jd_text):
     prompt = f"""Analyze the following resume and job description. 
 
@@ -36,7 +131,7 @@ Output in the following JSON format:
         # We'll set it to a reasonable length for a structured JSON response.
         # num_return_sequences=1 ensures we get only one response.
         # We need to manually parse the JSON output from the raw text generated by a simpler model.
-        raw_output = text_generator(prompt, max_new_tokens=500, num_return_sequences=1)[0]['generated_text']
+        raw_output = generate_within_deadline(prompt, "llm_analysis")
         
         # The model might repeat the prompt, so we try to extract the JSON part.
         # This is a simple heuristic; more robust parsing might be needed for complex outputs.
@@ -56,9 +151,13 @@ Output in the following JSON format:
             print(f"Warning: No JSON structure found in LLM output: {raw_output}")
             return json.dumps({"match_score": 0, "missing_elements": [{"element": "N/A", "suggestion": "LLM output not in expected format."}]})
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise Exception(f"Error calling local LLM for analysis: {str(e)}")
 
+@limit_stage("llm")
+@timed("llm_feedback")
 def generate_feedback(resume_text, jd_text):
     prompt = f"""For this resume, list specific changes required to maximize fit for the uploaded job description. 
 Focus on skills, certifications, and project additions.
@@ -80,7 +179,7 @@ Output in the following JSON format:
 """
 
     try:
-        raw_output = text_generator(prompt, max_new_tokens=500, num_return_sequences=1)[0]['generated_text']
+        raw_output = generate_within_deadline(prompt, "llm_feedback")
 
         json_start = raw_output.find('{\n    "feedback"')
         if json_start != -1:
@@ -95,6 +194,8 @@ Output in the following JSON format:
         else:
             print(f"Warning: No JSON structure found in LLM output: {raw_output}")
             return json.dumps({"feedback": [{"area": "N/A", "suggestion": "LLM feedback not in expected format."}]})
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise Exception(f"Error calling local LLM for feedback generation: {str(e)}")
 
@@ -1,9 +1,15 @@
+import os
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import math
+import hashlib
+import threading
+from collections import Counter, OrderedDict, defaultdict
 from rank_bm25 import BM25Okapi
 from fuzzywuzzy import fuzz
 
+from backend.metrics import timed, time_stage, CACHE_HITS, CACHE_MISSES
+
 # Placeholder for a function to normalize text for matching
 def normalize_text(text_list):
     # Basic normalization: lowercase, remove punctuation, etc.
@@ -16,75 +22,232 @@ def normalize_text(text_list):
             normalized_list.append("") # Handle non-string inputs
     return normalized_list
 
-def calculate_tfidf_similarity(resume_items, jd_items):
-    if not resume_items or not jd_items:
+# TfidfVectorizer's default token pattern
+TFIDF_TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+class PreparedField:
+    # One list-valued field of a document, normalized and tokenized once for every scorer:
+    # term_counts for TF-IDF (same token pattern as TfidfVectorizer), bm25_tokens for BM25,
+    # char_counts for the fuzzy-match prefilter.
+    __slots__ = ("items", "term_counts", "bm25_tokens", "char_counts", "_bm25")
+
+    def __init__(self, items, term_counts, bm25_tokens, char_counts):
+        self.items = items
+        self.term_counts = term_counts
+        self.bm25_tokens = bm25_tokens
+        self.char_counts = char_counts
+        self._bm25 = None
+
+    @classmethod
+    def from_items(cls, raw_items):
+        items = normalize_text(raw_items)
+        return cls(
+            items,
+            [dict(Counter(TFIDF_TOKEN_PATTERN.findall(item))) for item in items],
+            [item.split(" ") for item in items],
+            [dict(Counter(item)) for item in items]
+        )
+
+    def bm25(self):
+        # Built lazily and kept, so a JD field is indexed once however many resumes query it
+        if self._bm25 is None:
+            self._bm25 = BM25Okapi(self.bm25_tokens)
+        return self._bm25
+
+    def to_dict(self):
+        return {"items": self.items, "term_counts": self.term_counts, "bm25_tokens": self.bm25_tokens, "char_counts": self.char_counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["items"], data["term_counts"], data["bm25_tokens"], data["char_counts"])
+
+class PreparedDocument:
+    # The matching view of a parsed resume or JD. Built once per document content and cached
+    # (see prepare_document); a JD's is also stored with it as its artifacts.
+    __slots__ = ("kind", "fingerprint", "fields")
+
+    def __init__(self, kind, fingerprint, fields):
+        self.kind = kind
+        self.fingerprint = fingerprint
+        self.fields = fields
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+    def to_dict(self):
+        return {
+            "version": JD_ARTIFACTS_VERSION,
+            "kind": self.kind,
+            "fingerprint": self.fingerprint,
+            "fields": {name: field.to_dict() for name, field in self.fields.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["kind"], data["fingerprint"], {name: PreparedField.from_dict(field) for name, field in data["fields"].items()})
+
+# Bump when the artifact layout changes so stored artifacts get rebuilt
+JD_ARTIFACTS_VERSION = 2
+
+PREPARED_CACHE_SIZE = int(os.getenv("PREPARED_CACHE_SIZE", "1024"))
+_prepared_cache = OrderedDict()
+_prepared_cache_lock = threading.Lock()
+
+def _cache_get(fingerprint):
+    with _prepared_cache_lock:
+        document = _prepared_cache.get(fingerprint)
+        if document is not None:
+            _prepared_cache.move_to_end(fingerprint)
+        return document
+
+def _cache_put(document):
+    with _prepared_cache_lock:
+        _prepared_cache[document.fingerprint] = document
+        _prepared_cache.move_to_end(document.fingerprint)
+        while len(_prepared_cache) > PREPARED_CACHE_SIZE:
+            _prepared_cache.popitem(last=False)
+    return document
+
+def document_fields(parsed, kind):
+    # The raw list fields match_resume_to_jd compares, by field name
+    if kind == "resume":
+        return {
+            "skills": parsed.get("Skills", []),
+            "education": parsed.get("Education", []),
+            # Flattened to one item per experience line
+            "experience": [exp for exp_list in parsed.get("Experience", []) for exp in exp_list.split('\n') if exp.strip()],
+        }
+    must_have_skills = parsed.get("MustHaveSkills", [])
+    return {
+        "must_have_skills": must_have_skills,
+        # Must-have and good-to-have skills together for TF-IDF/BM25 comparison
+        "all_skills": must_have_skills + parsed.get("GoodToHaveSkills", []),
+        "qualifications": parsed.get("RequiredQualifications", []),
+    }
+
+def prepare_document(parsed, kind):
+    # kind is "resume" or "jd". Documents with the same field contents share one PreparedDocument.
+    raw_fields = document_fields(parsed, kind)
+    fingerprint = hashlib.sha1(json.dumps([kind, raw_fields], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    document = _cache_get(fingerprint)
+    if document is not None:
+        CACHE_HITS.inc(cache="prepared_document")
+        return document
+    CACHE_MISSES.inc(cache="prepared_document")
+    with time_stage("prepare_document"):
+        fields = {name: PreparedField.from_items(items) for name, items in raw_fields.items()}
+    return _cache_put(PreparedDocument(kind, fingerprint, fields))
+
+def prepare_jd_artifacts(parsed_jd):
+    # Stored with a registered JD (backend/jd_registry.py) so later processes skip preparing it
+    return prepare_document(parsed_jd, "jd").to_dict()
+
+def load_jd_document(parsed_jd, jd_artifacts=None):
+    # Stored artifacts are only deserialized once per process; the cached document keeps its BM25 indexes
+    if isinstance(jd_artifacts, PreparedDocument):
+        return jd_artifacts
+    if not jd_artifacts or jd_artifacts.get("version") != JD_ARTIFACTS_VERSION:
+        return prepare_document(parsed_jd, "jd")
+    document = _cache_get(jd_artifacts["fingerprint"])
+    if document is None:
+        document = _cache_put(PreparedDocument.from_dict(jd_artifacts))
+    return document
+
+@timed("hard_match_tfidf")
+def calculate_tfidf_similarity(resume_field, jd_field):
+    # Same result as fitting TfidfVectorizer on resume + JD items (smooth idf, l2-normalized rows),
+    # summing each side's rows and taking the cosine, but from the prepared term counts
+    if not resume_field.items or not jd_field.items:
         return 0.0
-    
-    all_items = resume_items + jd_items
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform(all_items)
-    
-    resume_vector = tfidf_matrix[:len(resume_items)].sum(axis=0)
-    jd_vector = tfidf_matrix[len(resume_items):].sum(axis=0)
-    
-    similarity = cosine_similarity(resume_vector, jd_vector)[0][0]
+
+    rows = resume_field.term_counts + jd_field.term_counts
+    document_frequency = Counter(term for row in rows for term in row)
+    if not document_frequency:
+        return 0.0  # Nothing but one-character tokens; TfidfVectorizer raises here
+    idf = {term: math.log((1 + len(rows)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+    def summed_vector(side_rows):
+        vector = defaultdict(float)
+        for row in side_rows:
+            weights = {term: count * idf[term] for term, count in row.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+            if norm > 0:
+                for term, weight in weights.items():
+                    vector[term] += weight / norm
+        return vector
+
+    resume_vector = summed_vector(resume_field.term_counts)
+    jd_vector = summed_vector(jd_field.term_counts)
+    resume_norm = math.sqrt(sum(weight * weight for weight in resume_vector.values()))
+    jd_norm = math.sqrt(sum(weight * weight for weight in jd_vector.values()))
+    if resume_norm == 0 or jd_norm == 0:
+        return 0.0
+    similarity = sum(weight * jd_vector.get(term, 0.0) for term, weight in resume_vector.items()) / (resume_norm * jd_norm)
     return similarity * 100 # Return as percentage
 
-def calculate_bm25_score(resume_items, jd_items):
-    if not resume_items or not jd_items:
+@timed("hard_match_bm25")
+def calculate_bm25_score(resume_field, jd_field):
+    if not resume_field.items or not jd_field.items:
         return 0.0
     
-    tokenized_corpus = [doc.split(" ") for doc in jd_items]
-    bm25 = BM25Okapi(tokenized_corpus)
+    bm25 = jd_field.bm25()
     
     scores = []
-    for resume_item in resume_items:
-        query = resume_item.split(" ")
+    for query in resume_field.bm25_tokens:
         doc_scores = bm25.get_scores(query)
         scores.append(max(doc_scores) if doc_scores.size > 0 else 0)
     
     # Normalize BM25 scores to a 0-100 range
-    max_possible_score = len(resume_items) * 10 # A heuristic max score
+    max_possible_score = len(resume_field.items) * 10 # A heuristic max score
     total_score = sum(scores)
     percentage = (total_score / max_possible_score) * 100 if max_possible_score > 0 else 0.0
     return min(percentage, 100.0) # Cap at 100%
 
-def calculate_fuzzy_match(resume_items, jd_items, threshold=80):
-    if not resume_items or not jd_items:
+def fuzzy_ratio_upper_bound(a_counts, a_length, b_counts, b_length):
+    # fuzz.ratio is 2 * matched characters / total length, and the matched characters can be
+    # at most the shared character multiset, so this bound is never below the real ratio
+    if a_length + b_length == 0:
+        return 0
+    shared = sum(min(count, b_counts.get(char, 0)) for char, count in a_counts.items())
+    return int(round(200 * shared / (a_length + b_length)))
+
+@timed("hard_match_fuzzy")
+def calculate_fuzzy_match(resume_field, jd_field, threshold=80):
+    if not resume_field.items or not jd_field.items:
         return 0.0
     
     matched_count = 0
-    for r_item in resume_items:
-        for jd_item in jd_items:
-            if fuzz.ratio(r_item.lower(), jd_item.lower()) >= threshold:
+    for r_item, r_counts in zip(resume_field.items, resume_field.char_counts):
+        for jd_item, jd_counts in zip(jd_field.items, jd_field.char_counts):
+            if r_item == jd_item:
+                matched_count += 1
+                break
+            # Only pairs that could reach the threshold pay for the edit-distance ratio
+            if fuzzy_ratio_upper_bound(r_counts, len(r_item), jd_counts, len(jd_item)) < threshold:
+                continue
+            if fuzz.ratio(r_item, jd_item) >= threshold:
                 matched_count += 1
                 break
     
-    percentage = (matched_count / len(resume_items)) * 100
+    percentage = (matched_count / len(resume_field.items)) * 100
     return percentage
 
-def match_resume_to_jd(parsed_resume, parsed_jd):
-    # Extract relevant data
-    resume_skills = normalize_text(parsed_resume.get("Skills", []))
-    jd_must_have_skills = normalize_text(parsed_jd.get("MustHaveSkills", []))
-    jd_good_to_have_skills = normalize_text(parsed_jd.get("GoodToHaveSkills", []))
-    resume_education = normalize_text(parsed_resume.get("Education", []))
-    jd_qualifications = normalize_text(parsed_jd.get("RequiredQualifications", []))
-    resume_experience = normalize_text([exp for exp_list in parsed_resume.get("Experience", []) for exp in exp_list.split('\n') if exp.strip()]) # Flatten and normalize
+@timed("hard_match")
+def match_resume_to_jd(parsed_resume, parsed_jd, jd_artifacts=None):
+    resume = prepare_document(parsed_resume, "resume")
+    jd = load_jd_document(parsed_jd, jd_artifacts)
 
     # Skills Matching
-    # Combine must-have and good-to-have skills for TF-IDF/BM25 comparison
-    all_jd_skills = jd_must_have_skills + jd_good_to_have_skills
-    tfidf_skill_score = calculate_tfidf_similarity(resume_skills, all_jd_skills)
-    bm25_skill_score = calculate_bm25_score(resume_skills, all_jd_skills)
-    fuzzy_must_have_skill_score = calculate_fuzzy_match(resume_skills, jd_must_have_skills)
+    tfidf_skill_score = calculate_tfidf_similarity(resume["skills"], jd["all_skills"])
+    bm25_skill_score = calculate_bm25_score(resume["skills"], jd["all_skills"])
+    fuzzy_must_have_skill_score = calculate_fuzzy_match(resume["skills"], jd["must_have_skills"])
 
     # Education Matching
-    fuzzy_education_score = calculate_fuzzy_match(resume_education, jd_qualifications)
+    fuzzy_education_score = calculate_fuzzy_match(resume["education"], jd["qualifications"])
 
     # Experience Matching (using TF-IDF and BM25 on flattened experience text)
-    tfidf_experience_score = calculate_tfidf_similarity(resume_experience, jd_qualifications) # JD qualifications might contain experience requirements
-    bm25_experience_score = calculate_bm25_score(resume_experience, jd_qualifications)
+    tfidf_experience_score = calculate_tfidf_similarity(resume["experience"], jd["qualifications"]) # JD qualifications might contain experience requirements
+    bm25_experience_score = calculate_bm25_score(resume["experience"], jd["qualifications"])
 
     # Aggregate scores into a hard-match percentage
     # This aggregation logic can be customized heavily based on weighting different factors.
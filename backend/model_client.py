@@ -0,0 +1,61 @@
+import os
+import json
+import socket
+import struct
+
+from backend import deadlines
+
+# Thin client for backend/model_server.py. When MODEL_SERVER_SOCKET is set, web workers
+# do not load spaCy, MiniLM or distilgpt2 themselves; parser, semantic_matcher and
+# llm_analyzer forward their model calls to the shared server over a Unix domain socket.
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET")
+MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", "300"))
+
+# Set by the model server before it imports the model modules, so it loads them locally
+serving_models_locally = False
+
+# Frames are a 4-byte big-endian length followed by a UTF-8 JSON payload
+_HEADER = struct.Struct(">I")
+
+class ModelServerError(Exception):
+    pass
+
+def use_remote_models():
+    return bool(MODEL_SERVER_SOCKET) and not serving_models_locally
+
+def send_message(sock, message):
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Model server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def recv_message(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+def call(op, *args, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout or MODEL_SERVER_TIMEOUT)
+        try:
+            sock.connect(MODEL_SERVER_SOCKET)
+        except OSError as e:
+            raise ModelServerError(f"Model server not reachable at {MODEL_SERVER_SOCKET}: {e}")
+        try:
+            send_message(sock, {"op": op, "args": list(args)})
+            response = recv_message(sock)
+        except socket.timeout:
+            # The caller's request deadline bounded the timeout; abandon the call
+            if deadlines.expired():
+                deadlines.fail(op)
+            raise
+    if not response.get("ok"):
+        raise ModelServerError(response.get("error", "Unknown model server error"))
+    return response["result"]
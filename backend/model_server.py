@@ -0,0 +1,99 @@
+import io
+import os
+import sys
+import time
+import base64
+import logging
+import argparse
+import socketserver
+
+# Add the parent directory to sys.path to allow absolute imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import model_client
+from backend import admission
+
+# This process hosts the models; make sure the imports below load them locally
+model_client.serving_models_locally = True
+# Web workers apply admission control before calling in; the server just batches
+admission.ADMISSION_ENABLED = False
+
+from backend import parser
+from backend import semantic_matcher
+from backend import llm_analyzer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_SOCKET_PATH = "/tmp/resume_checker_models.sock"
+
+def handle_embed(texts):
+    # Requests from all web workers go through this process's micro-batcher
+    futures = [semantic_matcher.embedding_batcher.submit(text) for text in texts]
+    return [future.result().tolist() for future in futures]
+
+def handle_generate(prompts, max_time=None):
+    # max_time is the caller's remaining budget in seconds; re-anchor it on this process's clock.
+    # Returns (text, cut_short) pairs, see llm_analyzer._generate_group.
+    deadline = time.monotonic() + max_time if max_time is not None else None
+    futures = [llm_analyzer.generation_batcher.submit((prompt, deadline)) for prompt in prompts]
+    return [future.result() for future in futures]
+
+# Parse results travel as their dict form; the client side rebuilds the typed objects
+def handle_parse_resume(path):
+    return parser.parse_resume(path).to_dict()
+
+def handle_parse_resume_bytes(content_b64, filename):
+    return parser.parse_resume(io.BytesIO(base64.b64decode(content_b64)), filename).to_dict()
+
+def handle_parse_job_description(text):
+    return parser.parse_job_description(text).to_dict()
+
+OPERATIONS = {
+    "ping": lambda: "pong",
+    "parse_resume": handle_parse_resume,
+    "parse_resume_bytes": handle_parse_resume_bytes,
+    "parse_job_description": handle_parse_job_description,
+    "embed": handle_embed,
+    "generate": handle_generate,
+}
+
+class ModelRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            message = model_client.recv_message(self.request)
+        except (ConnectionError, ValueError) as e:
+            logging.warning(f"Model server: dropped malformed request: {e}")
+            return
+        op = message.get("op")
+        try:
+            if op not in OPERATIONS:
+                raise ValueError(f"Unknown operation: {op}")
+            response = {"ok": True, "result": OPERATIONS[op](*message.get("args", []))}
+        except Exception as e:
+            logging.error(f"Model server: {op} failed: {e}", exc_info=True)
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        try:
+            model_client.send_message(self.request, response)
+        except OSError as e:
+            logging.warning(f"Model server: could not send {op} response: {e}")
+
+class ThreadingUnixModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socket_path):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Stale socket from a previous run
+    with ThreadingUnixModelServer(socket_path, ModelRequestHandler) as server:
+        os.chmod(socket_path, 0o660)
+        logging.info(f"Model server listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Host spaCy, MiniLM and distilgpt2 once for all web workers.")
+    arg_parser.add_argument("--socket", default=model_client.MODEL_SERVER_SOCKET or DEFAULT_SOCKET_PATH)
+    args = arg_parser.parse_args()
+    serve(args.socket)
@@ -0,0 +1,105 @@
+import json
+
+# Typed parse results. The cleaned document text is held once, in raw_text; the extracted
+# sections are what gets serialized into Resume.parsed_data / JobDescription.parsed_data,
+# since those rows keep the text in their own raw_text column.
+# get()/[] accept the original dict keys ("Skills", "RawContent", ...) so code written
+# against parse dicts keeps working, and to_dict() is the original API shape.
+
+# 1 was the plain parse dict with an embedded copy of the text under RawContent
+PARSE_FORMAT_VERSION = 2
+
+class ParseResult:
+    __slots__ = ("raw_text",)
+    # (attribute, original key, default factory), set by subclasses
+    FIELDS = ()
+
+    def __init__(self, raw_text="", **sections):
+        self.raw_text = raw_text or ""
+        for attribute, _, default in self.FIELDS:
+            setattr(self, attribute, sections[attribute] if sections.get(attribute) is not None else default())
+
+    @classmethod
+    def _attribute(cls, key):
+        if key in ("raw_text", "RawContent"):
+            return "raw_text"
+        for attribute, original_key, _ in cls.FIELDS:
+            if key in (attribute, original_key):
+                return attribute
+        return None
+
+    def get(self, key, default=None):
+        attribute = self._attribute(key)
+        return getattr(self, attribute) if attribute else default
+
+    def __getitem__(self, key):
+        attribute = self._attribute(key)
+        if attribute is None:
+            raise KeyError(key)
+        return getattr(self, attribute)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(getattr(self, a) == getattr(other, a) for a in self._all_attributes())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{a}={getattr(self, a)!r}' for a in self._all_attributes() if a != 'raw_text')}, raw_text=<{len(self.raw_text)} chars>)"
+
+    @classmethod
+    def _all_attributes(cls):
+        return [attribute for attribute, _, _ in cls.FIELDS] + ["raw_text"]
+
+    def sections(self):
+        return {original_key: getattr(self, attribute) for attribute, original_key, _ in self.FIELDS}
+
+    def to_dict(self):
+        # Original API shape, text included as RawContent
+        return {**self.sections(), "RawContent": self.raw_text}
+
+    def to_storage(self):
+        # Versioned JSON for the parsed_data column, without the text
+        return json.dumps({"v": PARSE_FORMAT_VERSION, **self.sections()}, separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, data):
+        # From to_dict() output, e.g. a model server response or a client payload
+        return cls(
+            data.get("RawContent") or data.get("raw_text") or "",
+            **{attribute: data.get(original_key) for attribute, original_key, _ in cls.FIELDS}
+        )
+
+    @classmethod
+    def from_storage(cls, parsed_data, raw_text=None):
+        # parsed_data is the stored JSON (any version); raw_text is the row's raw_text column.
+        # Version 1 rows carry their own copy of the text, used if the column is empty.
+        data = json.loads(parsed_data) if isinstance(parsed_data, (str, bytes)) else (parsed_data or {})
+        version = data.get("v", 1)
+        if version > PARSE_FORMAT_VERSION:
+            raise ValueError(f"Parse result format {version} is newer than this code understands ({PARSE_FORMAT_VERSION})")
+        result = cls.from_dict(data)
+        if raw_text:
+            result.raw_text = raw_text
+        return result
+
+class ParsedResume(ParseResult):
+    __slots__ = ("name", "education", "skills", "projects", "certifications", "experience")
+    FIELDS = (
+        ("name", "Name", str),
+        ("education", "Education", list),
+        ("skills", "Skills", list),
+        ("projects", "Projects", list),
+        ("certifications", "Certifications", list),
+        ("experience", "Experience", list),
+    )
+
+class ParsedJD(ParseResult):
+    __slots__ = ("role_title", "must_have_skills", "good_to_have_skills", "required_qualifications")
+    FIELDS = (
+        ("role_title", "RoleTitle", str),
+        ("must_have_skills", "MustHaveSkills", list),
+        ("good_to_have_skills", "GoodToHaveSkills", list),
+        ("required_qualifications", "RequiredQualifications", list),
+    )
+
+def as_json_value(value):
+    # Parse results inside API payloads are sent in their original dict shape
+    return value.to_dict() if isinstance(value, ParseResult) else value
@@ -1,24 +1,44 @@
 import pdfplumber
 from docx import Document
+import io
 import os
 import re
+import base64
+import shutil
+import tempfile
 import spacy
 
-# Load spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model 'en_core_web_sm'...")
-    os.system("python -m spacy download en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+from backend.metrics import timed, time_stage
+from backend.admission import limit_stage
+from backend import deadlines
+from backend import model_client
+from backend.parse_results import ParsedResume, ParsedJD
 
+# Load spaCy model, unless a shared model server (backend/model_server.py) hosts it
+nlp = None
+if not model_client.use_remote_models():
+    try:
+        nlp = spacy.load("en_core_web_sm")
+    except OSError:
+        print("Downloading spaCy model 'en_core_web_sm'...")
+        os.system("python -m spacy download en_core_web_sm")
+        nlp = spacy.load("en_core_web_sm")
+
+# Uploads larger than this are spooled to an anonymous temp file instead of being kept in memory
+UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", str(5 * 1024 * 1024)))
+
+# pdfplumber and python-docx both accept either a path or a seekable binary stream
+@timed("extraction_pdf")
 def extract_text_from_pdf(pdf_path):
     text = ""
     with pdfplumber.open(pdf_path) as pdf:
         for page in pdf.pages:
+            # A single page cannot be interrupted, but a long PDF stops at the request deadline
+            deadlines.check("extraction_pdf")
             text += page.extract_text(x_tolerance=1) + "\n"
     return text
 
+@timed("extraction_docx")
 def extract_text_from_docx(docx_path):
     doc = Document(docx_path)
     text = ""
@@ -91,38 +111,76 @@ def extract_sections(text):
 
     return sections
 
-def parse_resume(file_path):
-    file_extension = os.path.splitext(file_path)[1].lower()
+def as_seekable_stream(stream):
+    # Upload streams from Flask and Starlette are already spooled and seekable; anything
+    # else is copied into a SpooledTemporaryFile that only touches disk above the threshold.
+    if hasattr(stream, "seekable") and stream.seekable():
+        stream.seek(0)
+        return stream
+    spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY)
+    shutil.copyfileobj(stream, spooled)
+    spooled.seek(0)
+    return spooled
+
+@limit_stage("extraction")
+def parse_resume(source, filename=None):
+    # source is a file path, raw bytes, or a binary file-like object. For bytes and
+    # streams, filename is required to tell PDF from DOCX.
+    if isinstance(source, (str, os.PathLike)):
+        filename = filename or os.fspath(source)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif filename is None and isinstance(getattr(source, "name", None), str):
+        filename = source.name
+    if not filename:
+        raise ValueError("A filename is required to parse a resume from a stream.")
+
+    deadlines.check("extraction")
+    if model_client.use_remote_models():
+        timeout = deadlines.bounded_timeout(model_client.MODEL_SERVER_TIMEOUT)
+        if isinstance(source, (str, os.PathLike)):
+            return ParsedResume.from_dict(model_client.call("parse_resume", os.path.abspath(source), timeout=timeout))
+        content = as_seekable_stream(source).read()
+        return ParsedResume.from_dict(model_client.call("parse_resume_bytes", base64.b64encode(content).decode("ascii"), filename, timeout=timeout))
+
+    if not isinstance(source, (str, os.PathLike)):
+        source = as_seekable_stream(source)
+
+    file_extension = os.path.splitext(filename)[1].lower()
     
     if file_extension == '.pdf':
-        raw_text = extract_text_from_pdf(file_path)
+        raw_text = extract_text_from_pdf(source)
     elif file_extension == '.docx':
-        raw_text = extract_text_from_docx(file_path)
+        raw_text = extract_text_from_docx(source)
     else:
         raise ValueError("Unsupported file type. Only PDF and DOCX are supported.")
     
     cleaned_text = clean_text(raw_text)
 
-    doc = nlp(cleaned_text)
+    deadlines.check("spacy_resume")
+    with time_stage("spacy_resume"):
+        doc = nlp(cleaned_text)
     
     name = extract_name(doc)
     extracted_sections = extract_sections(cleaned_text)
 
-    parsed_sections = {
-        "Name": name,
-        "Education": extracted_sections["Education"],
-        "Skills": extracted_sections["Skills"],
-        "Projects": extracted_sections["Projects"],
-        "Certifications": extracted_sections["Certifications"],
-        "Experience": extracted_sections["Experience"],
-        "RawContent": cleaned_text
-    }
-    
-    return parsed_sections
+    return ParsedResume(
+        cleaned_text,
+        name=name,
+        education=extracted_sections["Education"],
+        skills=extracted_sections["Skills"],
+        projects=extracted_sections["Projects"],
+        certifications=extracted_sections["Certifications"],
+        experience=extracted_sections["Experience"]
+    )
 
 def parse_job_description(text):
+    if model_client.use_remote_models():
+        return ParsedJD.from_dict(model_client.call("parse_job_description", text))
+
     cleaned_text = clean_text(text)
-    doc = nlp(cleaned_text)
+    with time_stage("spacy_jd"):
+        doc = nlp(cleaned_text)
 
     role_title = ""
     must_have_skills = []
@@ -188,15 +246,13 @@ def parse_job_description(text):
                     elif current_section == "GOOD_TO_HAVE_SKILLS" and ent.text not in good_to_have_skills:
                         good_to_have_skills.append(ent.text)
 
-    parsed_jd = {
-        "RoleTitle": role_title,
-        "MustHaveSkills": must_have_skills,
-        "GoodToHaveSkills": good_to_have_skills,
-        "RequiredQualifications": required_qualifications,
-        "RawContent": cleaned_text
-    }
-
-    return parsed_jd
+    return ParsedJD(
+        cleaned_text,
+        role_title=role_title,
+        must_have_skills=must_have_skills,
+        good_to_have_skills=good_to_have_skills,
+        required_qualifications=required_qualifications
+    )
 
 if __name__ == '__main__':
     print("Parser script is intended to be imported and used by other modules (e.g., Flask app).")
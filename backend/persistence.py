@@ -0,0 +1,92 @@
+import json
+
+from backend.database.models import Resume, EvaluationResult, ImprovementSuggestion, AuditTrail
+
+# Writes evaluation results. save_evaluation is the per-request path used by the API;
+# save_evaluations_bulk writes a whole batch with one flush per table for the batch CLI.
+
+def suggestion_element(suggestion_text):
+    lowered = suggestion_text.lower()
+    if "skills" in lowered:
+        return "skills"
+    if "project" in lowered:
+        return "projects"
+    if "certifications" in lowered:
+        return "certifications"
+    return "general"
+
+def build_suggestions(evaluation_id, aggregated_results):
+    return [
+        ImprovementSuggestion(evaluation_id=evaluation_id, element=suggestion_element(suggestion_text), suggestion=suggestion_text)
+        for suggestion_text in aggregated_results.get("improvement_suggestions", [])
+    ]
+
+def save_evaluation(session, jd_db, resume_filename, resume_raw_text, parsed_resume_data, hard_match_score, semantic_fit_score, aggregated_results, llm_analysis):
+    # Adds the resume, evaluation, suggestions and audit rows for one candidate; the caller commits
+    new_resume_db = Resume(filename=resume_filename, raw_text=resume_raw_text, parsed_data=parsed_resume_data.to_storage())
+    session.add(new_resume_db)
+    session.flush()  # Get ID before commit
+
+    evaluation_result = EvaluationResult(
+        resume_id=new_resume_db.id,
+        jd_id=jd_db.id,
+        hard_match_score=hard_match_score,
+        semantic_fit_score=semantic_fit_score,
+        final_relevance_score=aggregated_results.get("final_relevance_score", 0),
+        suitability_verdict=aggregated_results.get("suitability_verdict", "N/A"),
+        llm_analysis_raw=json.dumps(llm_analysis)
+    )
+    session.add(evaluation_result)
+    session.flush()  # Get ID before commit
+
+    session.add_all(build_suggestions(evaluation_result.id, aggregated_results))
+
+    action = "Full pipeline executed"
+    near_duplicate = aggregated_results.get("near_duplicate") or {}
+    if near_duplicate.get("reused"):
+        action = f"Near-duplicate of resume {near_duplicate['resume_id']}, reused evaluation {near_duplicate['evaluation_id']}"
+    elif aggregated_results.get("llm_skipped"):
+        action = "Cheap pipeline executed (LLM skipped by cascade)"
+    audit_entry = AuditTrail(
+        evaluation_id=evaluation_result.id,
+        action=action,
+        details=f"Resume ID: {new_resume_db.id}, JD ID: {jd_db.id}, Final Score: {aggregated_results.get('final_relevance_score', 0)}"
+    )
+    session.add(audit_entry)
+    return new_resume_db, evaluation_result
+
+def save_evaluations_bulk(session, jd_id, records, audit_details=None):
+    # records: dicts with filename, raw_text, parsed_resume (a ParsedResume), hard_match_score, semantic_fit_score,
+    # aggregated_results and llm_analysis. Rows of each table go out in one flush, and the whole
+    # batch gets a single audit entry. Returns the EvaluationResult rows; the caller commits.
+    resumes = [
+        Resume(filename=record["filename"], raw_text=record["raw_text"], parsed_data=record["parsed_resume"].to_storage())
+        for record in records
+    ]
+    session.add_all(resumes)
+    session.flush()
+
+    evaluations = [
+        EvaluationResult(
+            resume_id=resume.id,
+            jd_id=jd_id,
+            hard_match_score=record["hard_match_score"],
+            semantic_fit_score=record["semantic_fit_score"],
+            final_relevance_score=record["aggregated_results"].get("final_relevance_score", 0),
+            suitability_verdict=record["aggregated_results"].get("suitability_verdict", "N/A"),
+            llm_analysis_raw=json.dumps(record["llm_analysis"])
+        )
+        for resume, record in zip(resumes, records)
+    ]
+    session.add_all(evaluations)
+    session.flush()
+
+    for evaluation, record in zip(evaluations, records):
+        session.add_all(build_suggestions(evaluation.id, record["aggregated_results"]))
+    if evaluations:
+        session.add(AuditTrail(
+            evaluation_id=None,
+            action="Batch scoring executed",
+            details=f"JD ID: {jd_id}, Evaluations: {len(evaluations)} (IDs {evaluations[0].id}-{evaluations[-1].id})" + (f", {audit_details}" if audit_details else "")
+        ))
+    return evaluations
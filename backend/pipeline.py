@@ -0,0 +1,197 @@
+import json
+import logging
+
+from backend.parser import parse_resume, parse_job_description
+from backend.matcher import match_resume_to_jd
+from backend.semantic_matcher import calculate_semantic_fit_score
+from backend.llm_analyzer import analyze_match, generate_feedback
+from backend.aggregator import aggregate_scores, compute_final_relevance_score, available_scores
+from backend.cascade import should_run_llm_for_request, templated_llm_analysis, templated_feedback, mark_deadline_exceeded
+from backend.admission import AdmissionRejected
+from backend.deadlines import DeadlineExceeded
+from backend.database.near_duplicates import find_reusable_evaluation
+
+# Order in which evaluate_stages yields its results
+STAGES = ["parsed_resume", "parsed_jd", "hard_match", "semantic_fit", "llm_analysis", "feedback", "aggregate"]
+
+class StageError(Exception):
+    def __init__(self, stage, message, status_code=500):
+        super().__init__(message)
+        self.stage = stage
+        self.message = message
+        self.status_code = status_code
+
+def evaluate_stages(resume_source, resume_filename, job_description_text, hard_match_weight=0.5, semantic_match_weight=0.5, cascade_threshold=None, registered_jd=None):
+    # Runs the evaluation pipeline and yields (stage, result) as soon as each stage finishes,
+    # so callers can stream the cheap scores long before the LLM stages are done.
+    # Failures are raised as StageError with the message the API returns to clients.
+    # resume_source is anything parse_resume accepts: a path, bytes or an upload stream.
+    # registered_jd (see backend/jd_registry.py) supplies the JD text, parsed fields and
+    # precomputed artifacts, so only resume-side work is done per candidate.
+    # Under a request deadline (backend/deadlines.py) the semantic and LLM stages that run out
+    # of time are abandoned: semantic_fit yields None and the LLM stages yield templated output.
+    # The aggregate then covers the finished stages and lists the others in timed_out_stages.
+    # Without a resume or JD there is nothing to aggregate, so those overruns fail with 504.
+    # A resume that is a near-duplicate of one already evaluated against the registered JD
+    # (backend/database/near_duplicates.py) reuses that evaluation's semantic fit and LLM
+    # analysis; the aggregate then names it under near_duplicate.
+    timed_out_stages = []
+    jd_artifacts = None
+    jd_embedding = None
+    if registered_jd is not None:
+        job_description_text = registered_jd["raw_text"]
+        jd_artifacts = registered_jd["artifacts"]
+        jd_embedding = registered_jd["embedding"]
+
+    # 1. Parse Resume
+    try:
+        parsed_resume_data = parse_resume(resume_source, resume_filename)
+        resume_raw_text = parsed_resume_data.raw_text
+        if not resume_raw_text:
+            logging.warning(f"Resume Parsing Warning: No raw text extracted from {resume_filename}.")
+        logging.debug(f"Resume parsed: {json.dumps(parsed_resume_data.name or 'N/A')}")
+    except AdmissionRejected:
+        raise  # Surfaced as 429 by the API, not as a stage failure
+    except DeadlineExceeded:
+        logging.warning(f"Resume Parsing Timeout: Deadline exceeded while parsing {resume_filename}.")
+        raise StageError("parsed_resume", "Request deadline exceeded while parsing the resume", 504)
+    except Exception as e:
+        logging.error(f"Resume Parsing Error: Failed to parse resume file {resume_filename}. Error: {e}", exc_info=True)
+        raise StageError("parsed_resume", f"Failed to parse resume: {str(e)}")
+    yield "parsed_resume", parsed_resume_data
+
+    # 2. Parse Job Description (already parsed for registered JDs)
+    try:
+        if registered_jd is not None:
+            parsed_jd_data = registered_jd["parsed_data"]
+        else:
+            parsed_jd_data = parse_job_description(job_description_text)
+        if not parsed_jd_data.role_title:
+            logging.warning("JD Parsing Warning: No role title extracted from JD.")
+        logging.debug(f"JD parsed: {json.dumps(parsed_jd_data.role_title or 'N/A')}")
+    except DeadlineExceeded:
+        logging.warning("JD Parsing Timeout: Deadline exceeded while parsing the job description.")
+        raise StageError("parsed_jd", "Request deadline exceeded while parsing the job description", 504)
+    except Exception as e:
+        logging.error(f"JD Parsing Error: Failed to parse job description. Error: {e}", exc_info=True)
+        raise StageError("parsed_jd", f"Failed to parse job description: {str(e)}")
+    yield "parsed_jd", parsed_jd_data
+
+    near_duplicate = None
+    if registered_jd is not None:
+        try:
+            near_duplicate = find_reusable_evaluation(resume_raw_text, registered_jd["id"])
+        except Exception as e:
+            # Detection is an optimization; the full pipeline still runs without it
+            logging.warning(f"Near-duplicate lookup failed for {resume_filename}: {e}", exc_info=True)
+    reused = near_duplicate is not None and near_duplicate["evaluation_id"] is not None
+    if reused:
+        logging.info(f"{resume_filename} is a near-duplicate ({near_duplicate['similarity']:.2f}) of resume {near_duplicate['resume_id']}, reusing evaluation {near_duplicate['evaluation_id']}")
+
+    # 3. Hard Match
+    try:
+        hard_match_score = match_resume_to_jd(parsed_resume_data, parsed_jd_data, jd_artifacts)
+        logging.debug(f"Hard match score: {hard_match_score}")
+    except Exception as e:
+        logging.error(f"Hard Matching Error: Failed to compute hard match score. Error: {e}", exc_info=True)
+        raise StageError("hard_match", f"Failed to compute hard match: {str(e)}")
+    yield "hard_match", hard_match_score
+
+    # 4. Semantic Match
+    try:
+        if reused:
+            semantic_fit_score = near_duplicate["semantic_fit_score"]
+        else:
+            semantic_fit_score = calculate_semantic_fit_score(resume_raw_text, job_description_text, jd_embedding)
+        logging.debug(f"Semantic fit score: {semantic_fit_score}")
+    except AdmissionRejected:
+        raise  # Surfaced as 429 by the API, not as a stage failure
+    except DeadlineExceeded:
+        semantic_fit_score = None
+        timed_out_stages.append("semantic_fit")
+        logging.warning("Semantic Matching Timeout: Deadline exceeded, scoring on the hard match alone.")
+    except Exception as e:
+        logging.error(f"Semantic Matching Error: Failed to compute semantic fit score. Error: {e}", exc_info=True)
+        raise StageError("semantic_fit", f"Failed to compute semantic match: {str(e)}")
+    yield "semantic_fit", semantic_fit_score
+    scoring_semantic_fit, scoring_hard_weight, scoring_semantic_weight = available_scores(semantic_fit_score, hard_match_weight, semantic_match_weight)
+
+    # 5. LLM Analysis (skipped for clear rejects, see backend/cascade.py)
+    # Only a real LLM analysis is copied from a near-duplicate. A templated one was the old run's
+    # cascade decision, so this request makes its own from the current scores and threshold.
+    reused_llm_analysis = reused and not near_duplicate["llm_skipped"]
+    llm_skipped = False
+    try:
+        preliminary_score = compute_final_relevance_score(hard_match_score, scoring_semantic_fit, scoring_hard_weight, scoring_semantic_weight)
+        if reused_llm_analysis:
+            llm_analysis = near_duplicate["llm_analysis"]
+        elif should_run_llm_for_request(preliminary_score, cascade_threshold):
+            llm_analysis = analyze_match(resume_raw_text, job_description_text)
+            logging.debug(f"LLM analysis received: {llm_analysis}")
+        else:
+            llm_skipped = True
+            llm_analysis = templated_llm_analysis(parsed_resume_data, parsed_jd_data, preliminary_score)
+            logging.debug(f"LLM stages skipped by cascade. Preliminary score: {preliminary_score}")
+    except AdmissionRejected:
+        raise  # Surfaced as 429 by the API, not as a stage failure
+    except DeadlineExceeded:
+        timed_out_stages.append("llm_analysis")
+        llm_analysis = mark_deadline_exceeded(templated_llm_analysis(parsed_resume_data, parsed_jd_data, preliminary_score))
+        logging.warning("LLM Analysis Timeout: Deadline exceeded, using templated analysis.")
+    except Exception as e:
+        logging.error(f"LLM Analysis Error: Failed to get LLM analysis or feedback. Error: {e}", exc_info=True)
+        raise StageError("llm_analysis", f"Failed to get LLM analysis/feedback: {str(e)}")
+    yield "llm_analysis", llm_analysis
+
+    # 6. LLM Feedback
+    try:
+        if llm_skipped or reused_llm_analysis:
+            # Feedback is not stored, so a reused analysis gets the templated version
+            llm_feedback = templated_feedback(parsed_resume_data, parsed_jd_data)
+        elif "llm_analysis" in timed_out_stages:
+            # No time left for a second generation
+            timed_out_stages.append("feedback")
+            llm_feedback = mark_deadline_exceeded(templated_feedback(parsed_resume_data, parsed_jd_data))
+        else:
+            llm_feedback = generate_feedback(resume_raw_text, job_description_text)
+            logging.debug(f"LLM feedback received: {llm_feedback}")
+    except AdmissionRejected:
+        raise  # Surfaced as 429 by the API, not as a stage failure
+    except DeadlineExceeded:
+        timed_out_stages.append("feedback")
+        llm_feedback = mark_deadline_exceeded(templated_feedback(parsed_resume_data, parsed_jd_data))
+        logging.warning("LLM Feedback Timeout: Deadline exceeded, using templated feedback.")
+    except Exception as e:
+        logging.error(f"LLM Analysis Error: Failed to get LLM analysis or feedback. Error: {e}", exc_info=True)
+        raise StageError("feedback", f"Failed to get LLM analysis/feedback: {str(e)}")
+    yield "feedback", llm_feedback
+
+    # 7. Aggregate Scores
+    try:
+        aggregated_results = aggregate_scores(
+            hard_match_score,
+            scoring_semantic_fit,
+            llm_analysis,
+            scoring_hard_weight,
+            scoring_semantic_weight
+        )
+        aggregated_results["llm_skipped"] = llm_skipped
+        aggregated_results["partial"] = bool(timed_out_stages)
+        aggregated_results["timed_out_stages"] = timed_out_stages
+        if near_duplicate is not None:
+            aggregated_results["near_duplicate"] = {
+                "resume_id": near_duplicate["resume_id"],
+                "similarity": near_duplicate["similarity"],
+                "evaluation_id": near_duplicate["evaluation_id"],
+                "reused": reused,
+                "llm_analysis_reused": reused_llm_analysis,
+            }
+        logging.debug(f"Aggregated results: {aggregated_results}")
+    except Exception as e:
+        logging.error(f"Aggregation Error: Failed to aggregate scores. Error: {e}", exc_info=True)
+        raise StageError("aggregate", f"Failed to aggregate scores: {str(e)}")
+    yield "aggregate", aggregated_results
+
+def run_evaluation(resume_source, resume_filename, job_description_text, hard_match_weight=0.5, semantic_match_weight=0.5, cascade_threshold=None, registered_jd=None):
+    # Non-streaming form: runs every stage and returns {stage: result}
+    return dict(evaluate_stages(resume_source, resume_filename, job_description_text, hard_match_weight, semantic_match_weight, cascade_threshold, registered_jd))
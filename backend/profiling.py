@@ -0,0 +1,138 @@
+import os
+import io
+import hmac
+import re
+import json
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from functools import wraps
+from datetime import datetime
+from flask import request
+
+# Opt-in per-request CPU and memory profiling. A request is profiled when it sends the
+# X-Profile: 1 header together with the admin token, or when the admin toggle is on and the
+# request is sampled. When neither applies the wrapped view is called directly.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_HEADER = "X-Profile"
+# Only the newest PROFILE_MAX_COUNT profiles are kept; older ones are deleted as new ones are written
+PROFILE_MAX_COUNT = int(os.getenv("PROFILE_MAX_COUNT", "50"))
+PROFILE_EXTENSIONS = (".prof", ".txt", ".json")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
+
+profiling_settings = {
+    "enabled": os.getenv("PROFILING_ENABLED", "0") == "1",
+    "sample_rate": float(os.getenv("PROFILING_SAMPLE_RATE", "0.0")),
+}
+
+# tracemalloc is process-wide, so only one request is profiled at a time; others run normally
+_profile_lock = threading.Lock()
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}_[0-9a-f]{8}$")
+
+def set_profiling(enabled=None, sample_rate=None):
+    # Raises ValueError for anything but a JSON boolean / a number in [0, 1]; nothing is changed then
+    if enabled is not None and not isinstance(enabled, bool):
+        raise ValueError("enabled must be true or false")
+    if sample_rate is not None:
+        if isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) or not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be a number between 0 and 1")
+    if enabled is not None:
+        profiling_settings["enabled"] = enabled
+    if sample_rate is not None:
+        profiling_settings["sample_rate"] = float(sample_rate)
+    return dict(profiling_settings)
+
+def should_profile():
+    # The header forces a profile only with a valid X-Admin-Token, and never when ADMIN_TOKEN is unset
+    if request.headers.get(PROFILE_HEADER) == "1" and ADMIN_TOKEN:
+        if hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), ADMIN_TOKEN.encode()):
+            return True
+    return profiling_settings["enabled"] and random.random() < profiling_settings["sample_rate"]
+
+def _prune_profiles():
+    # Profile ids start with their timestamp, so name order is age order
+    names = {name.rsplit(".", 1)[0] for name in os.listdir(PROFILE_DIR) if name.endswith(PROFILE_EXTENSIONS)}
+    profile_ids = sorted(name for name in names if is_valid_profile_id(name))
+    for profile_id in profile_ids[:max(len(profile_ids) - PROFILE_MAX_COUNT, 0)]:
+        for extension in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + extension))
+            except FileNotFoundError:
+                pass
+
+def _write_profile(profile_id, endpoint, profiler, snapshot, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+
+    stats_stream = io.StringIO()
+    pstats.Stats(profiler, stream=stats_stream).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+
+    allocation_lines = []
+    for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+        allocation_lines.append(f"{stat.size / 1024:10.1f} KiB  {stat.count:8d} blocks  {stat.traceback}")
+
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.txt"), "w") as f:
+        f.write(f"Endpoint: {endpoint}\nElapsed: {elapsed:.3f} s\n")
+        # Model inference runs on the micro-batcher threads, which cProfile does not follow;
+        # that time shows up here as waiting on a future.
+        f.write("\n=== CPU (cumulative, request thread) ===\n")
+        f.write(stats_stream.getvalue())
+        f.write("\n=== Top allocation sites ===\n")
+        f.write("\n".join(allocation_lines) + "\n")
+
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+        json.dump({"id": profile_id, "endpoint": endpoint, "elapsed_s": elapsed, "created_at": datetime.now().isoformat()}, f)
+
+def profile_request(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not should_profile() or not _profile_lock.acquire(blocking=False):
+            return view(*args, **kwargs)
+        try:
+            profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+            profiler = cProfile.Profile()
+            tracemalloc.start()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = view(*args, **kwargs)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            try:
+                _write_profile(profile_id, request.path, profiler, snapshot, elapsed)
+                _prune_profiles()
+                logging.info(f"Request profile captured: {profile_id} ({elapsed:.3f} s)")
+            except Exception as e:
+                logging.error(f"Could not write request profile {profile_id}: {e}", exc_info=True)
+            return response
+        finally:
+            _profile_lock.release()
+    return wrapper
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return profiles
+
+def is_valid_profile_id(profile_id):
+    return bool(PROFILE_ID_PATTERN.match(profile_id))
@@ -0,0 +1,121 @@
+import logging
+import numpy as np
+
+from backend.aggregator import rescore_arrays, validate_weights, validate_verdict_thresholds, VERDICT_HIGH_THRESHOLD, VERDICT_MEDIUM_THRESHOLD
+from backend.database.models import Resume, EvaluationResult, ScoringProfile, AuditTrail
+from backend.metrics import time_stage
+
+# Re-ranking of stored evaluations. The final score only depends on the stored hard match
+# and semantic fit scores, so trying new weights or verdict thresholds is one vectorized
+# pass over the JD's evaluations instead of re-running the pipeline.
+
+DEFAULT_SCORING_PARAMS = {
+    "hard_match_weight": 0.5,
+    "semantic_match_weight": 0.5,
+    "high_threshold": VERDICT_HIGH_THRESHOLD,
+    "medium_threshold": VERDICT_MEDIUM_THRESHOLD,
+}
+
+class ScoringProfileNotFoundError(LookupError):
+    pass
+
+def profile_to_dict(profile):
+    return {
+        "name": profile.name,
+        "hard_match_weight": profile.hard_match_weight,
+        "semantic_match_weight": profile.semantic_match_weight,
+        "high_threshold": profile.high_threshold,
+        "medium_threshold": profile.medium_threshold,
+        "updated_at": profile.updated_at.isoformat() if profile.updated_at else None,
+    }
+
+def resolve_scoring_params(session, data):
+    # Defaults, then the named profile (if any), then explicit values from the request.
+    # Raises ScoringProfileNotFoundError or ValueError.
+    params = dict(DEFAULT_SCORING_PARAMS)
+    profile_name = data.get("profile")
+    if profile_name:
+        profile = session.query(ScoringProfile).filter(ScoringProfile.name == profile_name).first()
+        if profile is None:
+            raise ScoringProfileNotFoundError(f"Scoring profile '{profile_name}' not found")
+        params.update({key: getattr(profile, key) for key in DEFAULT_SCORING_PARAMS})
+    for key in DEFAULT_SCORING_PARAMS:
+        if data.get(key) is not None:
+            params[key] = float(data[key])
+    validate_weights(params["hard_match_weight"], params["semantic_match_weight"])
+    validate_verdict_thresholds(params["high_threshold"], params["medium_threshold"])
+    return params
+
+def save_scoring_profile(session, name, params):
+    # Upsert by name; the caller commits
+    profile = session.query(ScoringProfile).filter(ScoringProfile.name == name).first()
+    if profile is None:
+        profile = ScoringProfile(name=name)
+        session.add(profile)
+    for key in DEFAULT_SCORING_PARAMS:
+        setattr(profile, key, params[key])
+    session.add(AuditTrail(evaluation_id=None, action="Scoring profile saved", details=f"Profile: {name}, Params: {params}"))
+    return profile
+
+def rescore_jd(session, jd_id, params, limit=None):
+    # Returns the JD's evaluations ranked under params, without modifying them
+    with time_stage("rescore_query"):
+        rows = (
+            session.query(
+                EvaluationResult.id,
+                Resume.filename,
+                EvaluationResult.hard_match_score,
+                EvaluationResult.semantic_fit_score,
+                EvaluationResult.final_relevance_score,
+                EvaluationResult.suitability_verdict
+            )
+            .outerjoin(Resume, Resume.id == EvaluationResult.resume_id)
+            .filter(EvaluationResult.jd_id == jd_id)
+            .all()
+        )
+    if not rows:
+        return {"count": 0, "verdict_counts": {"High": 0, "Medium": 0, "Low": 0}, "changed_verdicts": 0, "ranking": []}
+
+    with time_stage("rescore_compute"):
+        evaluation_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        hard_scores = np.fromiter((row[2] or 0 for row in rows), dtype=np.float64, count=len(rows))
+        semantic_scores = np.fromiter((row[3] or 0 for row in rows), dtype=np.float64, count=len(rows))
+        # A semantic stage that timed out stored NULL; those rows rest on the hard match (see available_scores)
+        semantic_missing = np.fromiter((row[3] is None for row in rows), dtype=bool, count=len(rows))
+        stored_verdicts = np.array([row[5] or "" for row in rows])
+
+        final_scores, verdicts = rescore_arrays(
+            hard_scores,
+            semantic_scores,
+            params["hard_match_weight"],
+            params["semantic_match_weight"],
+            params["high_threshold"],
+            params["medium_threshold"],
+            semantic_missing=semantic_missing
+        )
+        # Highest score first, ties broken by evaluation id so the ranking is stable
+        order = np.lexsort((evaluation_ids, -final_scores))
+        if limit is not None:
+            order = order[:limit]
+
+    ranking = []
+    for rank, i in enumerate(order, start=1):
+        row = rows[i]
+        ranking.append({
+            "rank": rank,
+            "evaluation_id": row[0],
+            "resume_filename": row[1] or "N/A",
+            "hard_match_score": row[2],
+            "semantic_fit_score": row[3],
+            "stored_final_relevance_score": row[4],
+            "stored_suitability_verdict": row[5],
+            "final_relevance_score": int(final_scores[i]),
+            "suitability_verdict": str(verdicts[i]),
+        })
+    logging.debug(f"Rescored {len(rows)} evaluations for JD {jd_id} with {params}")
+    return {
+        "count": len(rows),
+        "verdict_counts": {verdict: int(np.count_nonzero(verdicts == verdict)) for verdict in ("High", "Medium", "Low")},
+        "changed_verdicts": int(np.count_nonzero(verdicts != stored_verdicts)),
+        "ranking": ranking,
+    }
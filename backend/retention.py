@@ -0,0 +1,304 @@
+import os
+import re
+import sys
+import glob
+import gzip
+import json
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import DateTime, text
+
+# Allow running as `python backend/retention.py` from the repo root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database.database import SessionLocal, engine, init_db
+from backend.database.models import Resume, JobDescription, EvaluationResult, ImprovementSuggestion, AuditTrail
+from backend.database.compression import CompressedText, compress_text, COMPRESSION_MIN_BYTES
+from backend.database.score_stats import SKIP_SCORE_STATS
+
+# Retention: evaluations (with their suggestions and audit rows) and standalone audit rows
+# older than RETENTION_DAYS move out of SQLite into gzip-compressed NDJSON files, one per
+# kind and month: evaluations-2024-05.ndjson.gz, audit-2024-05.ndjson.gz. Resumes and JDs
+# stay, so archived evaluations can be restored with their references intact.
+# Archives are written and fsynced before the rows are deleted. A crash in between leaves
+# the rows in the database and in an archive; readers drop the duplicate ids.
+# python -m backend.retention archive|list|query|restore|compress
+
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "365"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archives")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_KINDS = ("evaluations", "audit")
+
+_ARCHIVE_NAME = re.compile(r"^(evaluations|audit)-(\d{4}-\d{2}|unknown)\.ndjson\.gz$")
+
+def utcnow():
+    # func.now() defaults are SQLite's CURRENT_TIMESTAMP, which is naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def row_to_dict(row):
+    data = {}
+    for column in row.__table__.columns:
+        value = getattr(row, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+def dict_to_row(model, data):
+    values = {}
+    for column in model.__table__.columns:
+        value = data.get(column.key)
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        values[column.key] = value
+    return model(**values)
+
+def archive_path(archive_dir, kind, month):
+    return os.path.join(archive_dir, f"{kind}-{month}.ndjson.gz")
+
+def month_of(timestamp):
+    return timestamp.strftime("%Y-%m") if timestamp else "unknown"
+
+def append_archive(archive_dir, kind, month, records):
+    # Each call appends one gzip member; gzip readers treat concatenated members as one stream
+    os.makedirs(archive_dir, exist_ok=True)
+    with open(archive_path(archive_dir, kind, month), "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            for record in records:
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def _group_by_month(records, timestamp_of):
+    months = {}
+    for record, timestamp in zip(records, timestamp_of):
+        months.setdefault(month_of(timestamp), []).append(record)
+    return months
+
+def _archive_evaluation_batch(session, evaluations, archive_dir):
+    ids = [evaluation.id for evaluation in evaluations]
+    suggestions = session.query(ImprovementSuggestion).filter(ImprovementSuggestion.evaluation_id.in_(ids)).all()
+    audit_rows = session.query(AuditTrail).filter(AuditTrail.evaluation_id.in_(ids)).all()
+    resume_ids = {evaluation.resume_id for evaluation in evaluations}
+    filenames = dict(session.query(Resume.id, Resume.filename).filter(Resume.id.in_(resume_ids)).all())
+
+    suggestions_by_evaluation, audit_by_evaluation = {}, {}
+    for suggestion in suggestions:
+        suggestions_by_evaluation.setdefault(suggestion.evaluation_id, []).append(row_to_dict(suggestion))
+    for audit_row in audit_rows:
+        audit_by_evaluation.setdefault(audit_row.evaluation_id, []).append(row_to_dict(audit_row))
+
+    records = [
+        {
+            "evaluation": row_to_dict(evaluation),
+            "resume_filename": filenames.get(evaluation.resume_id),
+            "suggestions": suggestions_by_evaluation.get(evaluation.id, []),
+            "audit": audit_by_evaluation.get(evaluation.id, []),
+        }
+        for evaluation in evaluations
+    ]
+    for month, month_records in _group_by_month(records, [e.evaluated_at for e in evaluations]).items():
+        append_archive(archive_dir, "evaluations", month, month_records)
+
+    session.query(ImprovementSuggestion).filter(ImprovementSuggestion.evaluation_id.in_(ids)).delete(synchronize_session=False)
+    session.query(AuditTrail).filter(AuditTrail.evaluation_id.in_(ids)).delete(synchronize_session=False)
+    session.query(EvaluationResult).filter(EvaluationResult.id.in_(ids)).delete(synchronize_session=False)
+    session.commit()
+    return len(evaluations), len(suggestions), len(audit_rows)
+
+def archive_expired(session, older_than_days=RETENTION_DAYS, archive_dir=ARCHIVE_DIR, dry_run=False, batch_size=ARCHIVE_BATCH_SIZE):
+    # Moves expired rows into the monthly archives, committing per batch. Returns counts.
+    cutoff = utcnow() - timedelta(days=older_than_days)
+    expired_evaluations = session.query(EvaluationResult).filter(EvaluationResult.evaluated_at < cutoff)
+    expired_audit = session.query(AuditTrail).filter(AuditTrail.evaluation_id.is_(None), AuditTrail.timestamp < cutoff)
+    if dry_run:
+        return {"cutoff": cutoff.isoformat(), "dry_run": True, "evaluations": expired_evaluations.count(), "audit": expired_audit.count()}
+
+    counts = {"cutoff": cutoff.isoformat(), "dry_run": False, "evaluations": 0, "suggestions": 0, "evaluation_audit": 0, "audit": 0}
+    while True:
+        evaluations = expired_evaluations.order_by(EvaluationResult.id).limit(batch_size).all()
+        if not evaluations:
+            break
+        archived, suggestions, audit_rows = _archive_evaluation_batch(session, evaluations, archive_dir)
+        counts["evaluations"] += archived
+        counts["suggestions"] += suggestions
+        counts["evaluation_audit"] += audit_rows
+
+    while True:
+        audit_rows = expired_audit.order_by(AuditTrail.id).limit(batch_size).all()
+        if not audit_rows:
+            break
+        records = [row_to_dict(audit_row) for audit_row in audit_rows]
+        for month, month_records in _group_by_month(records, [a.timestamp for a in audit_rows]).items():
+            append_archive(archive_dir, "audit", month, month_records)
+        session.query(AuditTrail).filter(AuditTrail.id.in_([a.id for a in audit_rows])).delete(synchronize_session=False)
+        session.commit()
+        counts["audit"] += len(audit_rows)
+
+    if counts["evaluations"] or counts["audit"]:
+        session.add(AuditTrail(evaluation_id=None, action="Retention archive", details=f"Archived {counts['evaluations']} evaluations and {counts['audit']} audit rows older than {counts['cutoff']} to {archive_dir}"))
+        session.commit()
+    logging.info(f"Retention: {counts}")
+    return counts
+
+def list_archives(archive_dir=ARCHIVE_DIR):
+    archives = []
+    for path in sorted(glob.glob(os.path.join(archive_dir, "*.ndjson.gz"))):
+        match = _ARCHIVE_NAME.match(os.path.basename(path))
+        if match:
+            archives.append({"kind": match.group(1), "month": match.group(2), "file": os.path.basename(path), "bytes": os.path.getsize(path)})
+    return archives
+
+def _record_id(kind, record):
+    return record["evaluation"]["id"] if kind == "evaluations" else record["id"]
+
+def iter_archive(kind, archive_dir=ARCHIVE_DIR, month_from=None, month_to=None):
+    # Records of one kind in month order, each id once
+    if kind not in ARCHIVE_KINDS:
+        raise ValueError(f"Unknown archive kind '{kind}', expected one of {ARCHIVE_KINDS}")
+    seen = set()
+    for archive in list_archives(archive_dir):
+        if archive["kind"] != kind:
+            continue
+        if (month_from and archive["month"] < month_from) or (month_to and archive["month"] > month_to):
+            continue
+        with gzip.open(os.path.join(archive_dir, archive["file"]), "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record_id = _record_id(kind, record)
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                yield record
+
+def query_archive(kind, archive_dir=ARCHIVE_DIR, month_from=None, month_to=None, jd_id=None, ids=None, limit=None):
+    # month_from/month_to are inclusive "YYYY-MM"; jd_id only applies to evaluations
+    ids = set(ids) if ids else None
+    results = []
+    for record in iter_archive(kind, archive_dir, month_from, month_to):
+        if ids is not None and _record_id(kind, record) not in ids:
+            continue
+        if jd_id is not None and (kind != "evaluations" or record["evaluation"]["jd_id"] != jd_id):
+            continue
+        results.append(record)
+        if limit is not None and len(results) >= limit:
+            break
+    return results
+
+def _restore_row(session, model, data):
+    # Rows keep their original ids; an id taken in the meantime is reported, not overwritten
+    if session.get(model, data["id"]) is not None:
+        return False
+    session.add(dict_to_row(model, data))
+    return True
+
+def restore_records(session, kind, records):
+    # Puts archived records back into the database; the caller commits. Archives are left as they are.
+    # Restored evaluations were counted in the score statistics when they were first scored.
+    session.info[SKIP_SCORE_STATS] = True
+    counts = {"restored": 0, "skipped": 0}
+    for record in records:
+        if kind == "evaluations":
+            if not _restore_row(session, EvaluationResult, record["evaluation"]):
+                counts["skipped"] += 1
+                continue
+            session.flush()
+            for suggestion in record["suggestions"]:
+                _restore_row(session, ImprovementSuggestion, suggestion)
+            for audit_row in record["audit"]:
+                _restore_row(session, AuditTrail, audit_row)
+        elif not _restore_row(session, AuditTrail, record):
+            counts["skipped"] += 1
+            continue
+        counts["restored"] += 1
+    if counts["restored"]:
+        session.add(AuditTrail(evaluation_id=None, action="Archive restore", details=f"Restored {counts['restored']} {kind} records"))
+    return counts
+
+def compress_existing(batch_size=ARCHIVE_BATCH_SIZE, vacuum=False):
+    # Rewrites plain-text values written before compression was enabled. Works on raw SQL so
+    # rows are never loaded as ORM objects; VACUUM then returns the freed pages to the filesystem.
+    counts = {}
+    for model in (Resume, JobDescription, EvaluationResult):
+        table = model.__tablename__
+        for column in model.__table__.columns:
+            if not isinstance(column.type, CompressedText):
+                continue
+            rewritten = 0
+            while True:
+                with engine.begin() as connection:
+                    rows = connection.execute(
+                        text(f"SELECT id, {column.name} FROM {table} WHERE typeof({column.name}) = 'text' AND length(CAST({column.name} AS BLOB)) >= :min_bytes LIMIT :limit"),
+                        {"min_bytes": COMPRESSION_MIN_BYTES, "limit": batch_size}
+                    ).all()
+                    updates = [{"id": row_id, "value": compress_text(value)} for row_id, value in rows]
+                    updates = [update for update in updates if not isinstance(update["value"], str)]
+                    if updates:
+                        connection.execute(text(f"UPDATE {table} SET {column.name} = :value WHERE id = :id"), updates)
+                rewritten += len(updates)
+                # Nothing compressible left, or compression is switched off
+                if len(rows) < batch_size or not updates:
+                    break
+            counts[f"{table}.{column.name}"] = rewritten
+    if vacuum:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+    logging.info(f"Compressed existing values: {counts}")
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive, query and restore old evaluations and audit rows.")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    archive = commands.add_parser("archive", help="Move expired rows into the monthly archives")
+    archive.add_argument("--days", type=int, default=RETENTION_DAYS, help="Archive rows older than this many days")
+    archive.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+
+    commands.add_parser("list", help="List archive files")
+
+    for name, help_text in (("query", "Print archived records as NDJSON"), ("restore", "Put archived records back into the database")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("kind", choices=ARCHIVE_KINDS)
+        command.add_argument("--from", dest="month_from", help="First month, YYYY-MM")
+        command.add_argument("--to", dest="month_to", help="Last month, YYYY-MM")
+        command.add_argument("--jd-id", type=int)
+        command.add_argument("--ids", type=int, nargs="+", help="Evaluation ids (or audit row ids)")
+        command.add_argument("--limit", type=int)
+
+    compress = commands.add_parser("compress", help="Compress values stored before compression was enabled")
+    compress.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the database file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    init_db()
+    if args.command == "list":
+        for archive in list_archives(args.archive_dir):
+            print(f"{archive['file']:40s} {archive['bytes']:>12,d} bytes")
+        return
+    if args.command == "query":
+        for record in query_archive(args.kind, args.archive_dir, args.month_from, args.month_to, args.jd_id, args.ids, args.limit):
+            print(json.dumps(record))
+        return
+    if args.command == "compress":
+        print(json.dumps(compress_existing(vacuum=args.vacuum), indent=2))
+        return
+
+    session = SessionLocal()
+    try:
+        if args.command == "archive":
+            result = archive_expired(session, args.days, args.archive_dir, args.dry_run)
+        else:
+            records = query_archive(args.kind, args.archive_dir, args.month_from, args.month_to, args.jd_id, args.ids, args.limit)
+            result = restore_records(session, args.kind, records)
+            session.commit()
+        print(json.dumps(result, indent=2))
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
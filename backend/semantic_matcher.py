@@ -1,32 +1,83 @@
 import os
+import hashlib
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from sentence_transformers import SentenceTransformer
 from langchain_community.vectorstores import Chroma
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
+from backend.batching import MicroBatcher
+from backend.metrics import timed, time_stage, CACHE_HITS, CACHE_MISSES
+from backend.admission import limit_stage
+from backend import deadlines
+from backend import vector_store
+from backend import model_client
+
 # Initialize a local SentenceTransformer embedding model
 # You can choose different models from https://www.sbert.net/docs/pretrained_models.html
 # 'all-MiniLM-L6-v2' is a good balance of size and performance for many tasks.
-embeddings_model = SentenceTransformer('all-MiniLM-L6-v2')
+# With a shared model server (backend/model_server.py) the model lives there instead.
+embeddings_model = None
+if not model_client.use_remote_models():
+    embeddings_model = SentenceTransformer('all-MiniLM-L6-v2')
+
+def encode_texts(texts):
+    if embeddings_model is None:
+        return [np.array(vector) for vector in model_client.call("embed", texts)]
+    return list(embeddings_model.encode(texts, batch_size=len(texts)))
+
+# Concurrent requests share one encode() call instead of each running the model with batch size 1
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+embedding_batcher = MicroBatcher(
+    encode_texts,
+    max_batch_size=EMBED_BATCH_MAX_SIZE,
+    max_wait_ms=EMBED_BATCH_MAX_WAIT_MS,
+    name="embedding"
+)
 
 # Initialize ChromaDB
 # We'll use a simple in-memory client for now. For production, consider persistent storage.
 # Or configure a specific directory for ChromaDB to store its data.
-CHROMA_PERSIST_DIR = "./chroma_db"
-if not os.path.exists(CHROMA_PERSIST_DIR):
-    os.makedirs(CHROMA_PERSIST_DIR)
-
-# A simple persistent client. Create a new collection each time for demonstration.
-# In a real application, you'd manage collections more carefully.
-chroma_client = Chroma(
-    persist_directory=CHROMA_PERSIST_DIR, 
-    embedding_function=lambda text: embeddings_model.encode(text).tolist() # Wrap with lambda
-)
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+
+# "chroma" (default) or "flat" for the memory-mapped store in backend/vector_store.py
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+if VECTOR_STORE_BACKEND not in ("chroma", "flat"):
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND '{VECTOR_STORE_BACKEND}', expected 'chroma' or 'flat'")
+
+chroma_client = None
+if VECTOR_STORE_BACKEND == "chroma":
+    if not os.path.exists(CHROMA_PERSIST_DIR):
+        os.makedirs(CHROMA_PERSIST_DIR)
+
+    # A simple persistent client. Create a new collection each time for demonstration.
+    # In a real application, you'd manage collections more carefully.
+    chroma_client = Chroma(
+        persist_directory=CHROMA_PERSIST_DIR, 
+        embedding_function=lambda text: encode_texts([text])[0].tolist() # Wrap with lambda
+    )
+
+@limit_stage("embedding")
+def embed_text(text):
+    # Generate embedding for the text through the micro-batcher, giving up at the request deadline
+    deadlines.check("embedding")
+    with time_stage("embedding"):
+        future = embedding_batcher.submit(text)
+        try:
+            return future.result(timeout=deadlines.remaining())
+        except FutureTimeoutError:
+            future.cancel()
+            deadlines.fail("embedding")
 
 def generate_and_store_embedding(text, doc_id, collection_name="default_collection"):
     # Generate embedding for the text
-    # The SentenceTransformer model expects a list of strings, even for a single text
-    embedding = embeddings_model.encode([text])[0].tolist()
+    embedding = embed_text(text)
+
+    if VECTOR_STORE_BACKEND == "flat":
+        vector_store.get_store(collection_name).add([doc_id], [embedding])
+        return
+    embedding = embedding.tolist()
     
     # Get or create collection
     collection = chroma_client._client.get_or_create_collection(name=collection_name)
@@ -41,23 +92,38 @@ def generate_and_store_embedding(text, doc_id, collection_name="default_collecti
     )
 
 def get_embedding(doc_id, collection_name="default_collection"):
+    if VECTOR_STORE_BACKEND == "flat":
+        # Unit-normalized, which cosine similarity does not mind
+        return vector_store.get_store(collection_name).get([doc_id])[0]
     collection = chroma_client._client.get_or_create_collection(name=collection_name)
     results = collection.get(ids=[doc_id], include=['embeddings'])
-    if results and results['embeddings']:
+    # Chroma may return a numpy array here, so check the length rather than truthiness
+    if results and results['embeddings'] is not None and len(results['embeddings']) > 0:
         return np.array(results['embeddings'][0])
     return None
 
-def calculate_semantic_fit_score(resume_text, jd_text):
-    # Generate and store embeddings (can be optimized to only generate if not exists)
-    resume_id = "resume_" + str(hash(resume_text))
-    jd_id = "jd_" + str(hash(jd_text))
-    
-    # Generate and store if not present
-    generate_and_store_embedding(resume_text, resume_id)
-    generate_and_store_embedding(jd_text, jd_id)
-    
-    resume_embedding = get_embedding(resume_id)
-    jd_embedding = get_embedding(jd_id)
+def get_or_create_embedding(text, doc_id, collection_name="default_collection"):
+    # Only generate the embedding if it is not already stored
+    embedding = get_embedding(doc_id, collection_name)
+    if embedding is not None:
+        CACHE_HITS.inc(cache="embedding")
+        return embedding
+    CACHE_MISSES.inc(cache="embedding")
+    generate_and_store_embedding(text, doc_id, collection_name)
+    return get_embedding(doc_id, collection_name)
+
+def text_doc_id(prefix, text):
+    # Stable across processes and restarts, unlike hash(), which is salted per process
+    return prefix + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+@timed("semantic_fit")
+def calculate_semantic_fit_score(resume_text, jd_text, jd_embedding=None):
+    # jd_embedding can be passed in for registered JDs, which store theirs in the database
+    resume_id = text_doc_id("resume_", resume_text)
+    resume_embedding = get_or_create_embedding(resume_text, resume_id)
+    if jd_embedding is None:
+        jd_id = text_doc_id("jd_", jd_text)
+        jd_embedding = get_or_create_embedding(jd_text, jd_id)
     
     if resume_embedding is None or jd_embedding is None:
         return 0.0
@@ -72,4 +138,22 @@ def calculate_semantic_fit_score(resume_text, jd_text):
     # Return as percentage, rounded to integer
     return int(similarity * 100)
 
+@limit_stage("embedding")
+@timed("semantic_fit_batch")
+def calculate_semantic_fit_scores(resume_texts, jd_text=None, jd_embedding=None):
+    # Batch form for offline scoring: one encode call for all resumes, and resume vectors are
+    # not written to the vector store. Same scale as calculate_semantic_fit_score.
+    deadlines.check("embedding")
+    texts = list(resume_texts)
+    if jd_embedding is None:
+        texts.append(jd_text)
+    with time_stage("embedding"):
+        embeddings = np.asarray(encode_texts(texts)) if texts else np.zeros((0, 1))
+    if jd_embedding is None:
+        embeddings, jd_embedding = embeddings[:-1], embeddings[-1]
+    if len(embeddings) == 0:
+        return []
+    similarities = cosine_similarity(embeddings, np.asarray(jd_embedding).reshape(1, -1))[:, 0]
+    return [int(similarity * 100) for similarity in similarities]
+
 # No __main__ block needed here as this module is imported by app.py
@@ -0,0 +1,212 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, so use one writer process per store
+    fcntl = None
+
+# Embedded flat vector store: one memory-mapped matrix per collection, an id -> row map and an
+# append-only id log. Rows are unit-normalized on insert, so cosine similarity is a dot
+# product and top-K search is a chunked matrix multiplication.
+# Several processes (e.g. gunicorn workers) can share a directory: writers hold an exclusive
+# flock on store.lock, and every access first replays ids other processes appended to the log.
+# float16 halves the memory of float32; int8 quarters it, with one float32 scale per row.
+# Made for up to ~1M MiniLM vectors per collection; beyond that use a real ANN index.
+
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "./vector_store")
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float16")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))  # all-MiniLM-L6-v2
+
+INITIAL_CAPACITY = 1024
+# Rows scored per matrix multiplication; bounds the float32 working set during search
+SEARCH_CHUNK_ROWS = 65536
+
+_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+class FlatVectorStore:
+    def __init__(self, directory, dim=EMBEDDING_DIM, dtype=VECTOR_STORE_DTYPE):
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported vector store dtype '{dtype}'. Use one of {sorted(_DTYPES)}.")
+        self.directory = directory
+        self.dim = dim
+        self.dtype = dtype
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, f"vectors.{dtype}.{dim}.mmap")
+        self._scales_path = os.path.join(directory, "scales.f32.mmap")
+        self._log_path = os.path.join(directory, "ids.log")
+        self._lock_file = open(os.path.join(directory, "store.lock"), "a")
+
+        self._ids = []
+        self._rows = {}
+        self._log_offset = 0
+        self._log = open(self._log_path, "ab")
+        self._capacity = 0
+        self._vectors = None
+        self._scales = None
+        with self._file_lock(exclusive=False):
+            self._catch_up()
+        self._ensure_capacity(INITIAL_CAPACITY)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        # Cross-process lock; callers hold self._lock, so threads never share the flock
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        # Replays the log from where this process last read it: line n names the id stored in row n.
+        # Called under the file lock, so no writer is halfway through a line.
+        if os.path.getsize(self._log_path) <= self._log_offset:
+            return
+        with open(self._log_path, "rb") as log:
+            log.seek(self._log_offset)
+            data = log.read()
+        data = data[:data.rfind(b"\n") + 1]
+        self._log_offset += len(data)
+        for line in data.decode("utf-8").splitlines():
+            if line:
+                self._rows[line] = len(self._ids)
+                self._ids.append(line)
+        self._ensure_capacity(len(self._ids))
+
+    def _open_matrix(self, path, dtype, shape):
+        # Grow (or create) the backing file, then map it
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _ensure_capacity(self, needed):
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2, INITIAL_CAPACITY)
+        # The files only ever grow and the mappings are shared, so rows written through the old
+        # mapping are visible through the new one without an msync; a search still holding the
+        # old mapping keeps reading valid rows.
+        self._vectors = self._open_matrix(self._vectors_path, _DTYPES[self.dtype], (capacity, self.dim))
+        self._scales = self._open_matrix(self._scales_path, np.float32, (capacity,))
+        self._capacity = capacity
+
+    def _normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _encode(self, unit_vectors):
+        # Returns (stored rows, per-row scales)
+        if self.dtype == "int8":
+            scales = np.abs(unit_vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(unit_vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return unit_vectors.astype(np.float16), np.ones(len(unit_vectors), dtype=np.float32)
+
+    def _decode(self, rows, scales):
+        decoded = np.asarray(rows, dtype=np.float32)
+        if self.dtype == "int8":
+            decoded *= np.asarray(scales, dtype=np.float32)[:, None]
+        return decoded
+
+    def add(self, ids, vectors):
+        # Inserts or overwrites; existing ids keep their row
+        encoded, scales = self._encode(self._normalize(vectors))
+        if len(ids) != len(encoded):
+            raise ValueError(f"Got {len(ids)} ids for {len(encoded)} vectors")
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            new_ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self._rows]
+            self._ensure_capacity(len(self._ids) + len(new_ids))
+            for doc_id in new_ids:
+                self._rows[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+            rows = np.fromiter((self._rows[doc_id] for doc_id in ids), dtype=np.int64, count=len(ids))
+            self._vectors[rows] = encoded
+            self._scales[rows] = scales
+            # Vectors are written before their ids are logged, so a replayed log never points at an unwritten row
+            if new_ids:
+                data = "".join(f"{doc_id}\n" for doc_id in new_ids).encode("utf-8")
+                self._log.write(data)
+                self._log.flush()
+                self._log_offset += len(data)
+
+    def get(self, ids):
+        # Unit-normalized vectors (None for unknown ids), in the order of ids
+        with self._lock:
+            with self._file_lock(exclusive=False):
+                self._catch_up()
+            rows = [self._rows.get(doc_id) for doc_id in ids]
+            found = [row for row in rows if row is not None]
+            decoded = iter(self._decode(self._vectors[found], self._scales[found]) if found else [])
+        return [next(decoded) if row is not None else None for row in rows]
+
+    def search(self, queries, k=10):
+        # Exact cosine top-K for each query. Returns [[(id, score), ...], ...] best first.
+        queries = self._normalize(queries)
+        with self._lock:
+            with self._file_lock(exclusive=False):
+                self._catch_up()
+            count = len(self._ids)
+            vectors, scales, ids = self._vectors, self._scales, list(self._ids)
+        if count == 0 or k < 1:
+            return [[] for _ in range(len(queries))]
+        k = min(k, count)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+        for start in range(0, count, SEARCH_CHUNK_ROWS):
+            stop = min(start + SEARCH_CHUNK_ROWS, count)
+            # Scores are linear in the row scale, so int8 rows are scaled after the product
+            chunk_scores = queries @ np.asarray(vectors[start:stop], dtype=np.float32).T
+            if self.dtype == "int8":
+                chunk_scores *= scales[start:stop]
+            # Merge this chunk's candidates with the running top-K
+            merged_scores = np.concatenate([best_scores, chunk_scores], axis=1)
+            merged_rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, stop), chunk_scores.shape)], axis=1)
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, top, axis=1)
+            best_rows = np.take_along_axis(merged_rows, top, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(ids[row], float(score)) for row, score in zip(rows, row_scores)]
+            for rows, row_scores in zip(best_rows, best_scores)
+        ]
+
+    def flush(self):
+        with self._lock:
+            self._vectors.flush()
+            self._scales.flush()
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._log.close()
+            self._lock_file.close()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(collection_name, base_dir=None):
+    # One store per collection, shared by every thread in the process
+    directory = os.path.join(base_dir or VECTOR_STORE_DIR, collection_name)
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = FlatVectorStore(directory)
+        return store
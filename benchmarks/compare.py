@@ -0,0 +1,42 @@
+import sys
+import json
+import argparse
+
+# Compares two reports written by run_benchmarks.py and exits non-zero on regressions.
+
+def compare(baseline, candidate, metric="p50_ms", threshold=0.10):
+    rows = []
+    for stage, base_summary in baseline["stages"].items():
+        new_summary = candidate["stages"].get(stage)
+        if not new_summary or metric not in base_summary or metric not in new_summary:
+            continue
+        before = base_summary[metric]
+        after = new_summary[metric]
+        change = (after - before) / before if before > 0 else 0.0
+        rows.append((stage, before, after, change, change > threshold))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p50_ms", help="Summary field to compare, e.g. p50_ms, p95_ms, mean_ms")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.metric, args.threshold)
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')} ({args.metric})")
+    for stage, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{stage:32s} {before:10.2f} -> {after:10.2f}  {change:+7.1%}  {flag}")
+
+    if any(row[4] for row in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
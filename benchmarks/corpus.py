@@ -0,0 +1,97 @@
+import os
+import random
+
+import sample_data
+
+# Synthesizes large resume/JD corpora from the hand-written templates in sample_data.py.
+# Generation is seeded, so the same arguments always produce the same corpus.
+
+RESUME_TEMPLATES = [sample_data.resume_high_match, sample_data.resume_medium_match, sample_data.resume_low_match]
+JD_TEMPLATES = [sample_data.software_engineer_jd, sample_data.data_scientist_jd]
+
+FIRST_NAMES = ["Alex", "Priya", "Chen", "Maria", "Samuel", "Aisha", "Lukas", "Fatima", "Diego", "Mei", "Omar", "Elena"]
+LAST_NAMES = ["Kumar", "Garcia", "Nguyen", "Okafor", "Schmidt", "Rossi", "Tanaka", "Haddad", "Silva", "Novak", "Patel", "Moreau"]
+SKILL_POOL = [
+    "Python", "Java", "C++", "Go", "Rust", "JavaScript", "TypeScript", "SQL", "NoSQL", "PostgreSQL", "MongoDB",
+    "Docker", "Kubernetes", "AWS", "Azure", "GCP", "Terraform", "CI/CD", "React", "Angular", "Vue.js", "Flask",
+    "Django", "FastAPI", "Spark", "Hadoop", "TensorFlow", "PyTorch", "Scikit-learn", "pandas", "Tableau", "SEO",
+    "Content Marketing", "Google Analytics", "Microservices", "RESTful APIs", "Data Visualization", "Statistics"
+]
+ROLE_TITLES = ["Software Engineer", "Backend Engineer", "Data Scientist", "ML Engineer", "Platform Engineer", "Data Analyst"]
+EXTRA_BULLETS = [
+    "- Reduced API latency by 40% by introducing caching and query optimizations.",
+    "- Mentored two junior engineers and led weekly code reviews.",
+    "- Migrated legacy services to containers orchestrated by Kubernetes.",
+    "- Built dashboards that tracked key business metrics for leadership.",
+    "- Automated data quality checks for nightly ETL pipelines.",
+    "- Ran A/B tests and presented results to product stakeholders.",
+]
+
+def synthesize_resume(rng):
+    lines = rng.choice(RESUME_TEMPLATES).strip().split("\n")
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    lines[0] = f"{first} {last}"
+    lines[1] = f"Email: {first.lower()}.{last.lower()}{rng.randint(1, 999)}@email.com | Phone: ({rng.randint(200, 999)}) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+    output = []
+    for line in lines:
+        # Drop some bullets and add others so documents differ in length and content
+        if line.startswith("- ") and rng.random() < 0.2:
+            continue
+        output.append(line)
+        if line.strip() == "Skills:":
+            output.append("Additional: " + ", ".join(rng.sample(SKILL_POOL, rng.randint(3, 10))))
+        elif line.startswith("- ") and rng.random() < 0.3:
+            output.append(rng.choice(EXTRA_BULLETS))
+    return "\n".join(output) + "\n"
+
+def synthesize_jd(rng):
+    lines = rng.choice(JD_TEMPLATES).strip().split("\n")
+    output = []
+    section = None
+    for line in lines:
+        if line.startswith("Job Title:"):
+            line = f"Job Title: {rng.choice(['Senior ', 'Junior ', ''])}{rng.choice(ROLE_TITLES)}"
+        if line.endswith(":"):
+            section = line
+        output.append(line)
+        if section in ("Required Skills:", "Good-to-Have Skills:") and line == section:
+            output.append("- Experience with " + ", ".join(rng.sample(SKILL_POOL, rng.randint(2, 5))) + ".")
+    return "\n".join(output) + "\n"
+
+def generate_corpus(num_resumes, num_jds, seed=42):
+    rng = random.Random(seed)
+    resumes = [synthesize_resume(rng) for _ in range(num_resumes)]
+    jds = [synthesize_jd(rng) for _ in range(num_jds)]
+    return resumes, jds
+
+def render_pdf(text, path):
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    lines = text.split("\n")
+    lines_per_page = 60
+    for start in range(0, len(lines), lines_per_page):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), "\n".join(lines[start:start + lines_per_page]), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def render_docx(text, path):
+    from docx import Document
+    doc = Document()
+    for line in text.split("\n"):
+        doc.add_paragraph(line)
+    doc.save(path)
+
+def write_resume_files(resumes, output_dir, formats=("pdf", "docx")):
+    # Renders resumes alternating between the requested formats; returns the file paths
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i, text in enumerate(resumes):
+        fmt = formats[i % len(formats)]
+        path = os.path.join(output_dir, f"resume_{i:05d}.{fmt}")
+        if fmt == "pdf":
+            render_pdf(text, path)
+        else:
+            render_docx(text, path)
+        paths.append(path)
+    return paths
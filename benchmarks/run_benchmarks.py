@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+# Allow running as `python benchmarks/run_benchmarks.py` from the repo root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.corpus import generate_corpus, write_resume_files
+
+def summarize(durations):
+    # durations in seconds -> summary in milliseconds
+    if not durations:
+        return {"count": 0}
+    ordered = sorted(durations)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "total_s": total,
+        "throughput_per_s": len(ordered) / total if total > 0 else 0.0,
+    }
+
+def time_calls(fn, inputs):
+    durations = []
+    outputs = []
+    for args in inputs:
+        start = time.perf_counter()
+        outputs.append(fn(*args))
+        durations.append(time.perf_counter() - start)
+    return durations, outputs
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def benchmark_db_writes(parsed_resumes, parsed_jd, jd_text, scores):
+    # Writes into a throwaway SQLite database so benchmarks never touch sql_app.db
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from backend.database.database import Base
+    from backend.database.models import Resume, JobDescription, EvaluationResult
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        session = Session()
+        try:
+            jd_row = JobDescription(role_title=parsed_jd.role_title or "N/A", raw_text=jd_text, parsed_data=parsed_jd.to_storage())
+            session.add(jd_row)
+            session.commit()
+            durations = []
+            for parsed_resume, (hard, semantic, aggregated) in zip(parsed_resumes, scores):
+                start = time.perf_counter()
+                resume_row = Resume(filename="bench", raw_text=parsed_resume.raw_text, parsed_data=parsed_resume.to_storage())
+                session.add(resume_row)
+                session.flush()
+                session.add(EvaluationResult(
+                    resume_id=resume_row.id,
+                    jd_id=jd_row.id,
+                    hard_match_score=hard,
+                    semantic_fit_score=semantic,
+                    final_relevance_score=aggregated["final_relevance_score"],
+                    suitability_verdict=aggregated["suitability_verdict"],
+                    llm_analysis_raw="{}"
+                ))
+                session.commit()
+                durations.append(time.perf_counter() - start)
+            return durations
+        finally:
+            session.close()
+            engine.dispose()
+
+def run(args):
+    from backend.parser import parse_resume, parse_job_description
+    from backend.matcher import match_resume_to_jd
+    from backend.semantic_matcher import calculate_semantic_fit_score
+    from backend.aggregator import aggregate_scores
+    from backend.pipeline import run_evaluation
+
+    resumes, jds = generate_corpus(args.resumes, args.jds, seed=args.seed)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_resume_files(resumes, tmp, formats=tuple(args.formats))
+
+        durations, parsed_resumes = time_calls(parse_resume, [(p,) for p in paths])
+        results["parse_resume"] = summarize(durations)
+        for fmt in args.formats:
+            results[f"parse_resume_{fmt}"] = summarize([d for d, p in zip(durations, paths) if p.endswith(fmt)])
+
+        durations, parsed_jds = time_calls(parse_job_description, [(jd,) for jd in jds])
+        results["parse_job_description"] = summarize(durations)
+
+        # Every resume against a rotating JD keeps the pair count equal to the resume count
+        pairs = [(i, i % len(jds)) for i in range(len(resumes))]
+
+        durations, hard_scores = time_calls(match_resume_to_jd, [(parsed_resumes[r], parsed_jds[j]) for r, j in pairs])
+        results["match_resume_to_jd"] = summarize(durations)
+
+        durations, semantic_scores = time_calls(calculate_semantic_fit_score, [(resumes[r], jds[j]) for r, j in pairs])
+        results["calculate_semantic_fit_score"] = summarize(durations)
+
+        if args.llm_samples > 0:
+            from backend.llm_analyzer import analyze_match, generate_feedback
+            llm_pairs = pairs[:args.llm_samples]
+            durations, _ = time_calls(analyze_match, [(resumes[r], jds[j]) for r, j in llm_pairs])
+            results["analyze_match"] = summarize(durations)
+            durations, _ = time_calls(generate_feedback, [(resumes[r], jds[j]) for r, j in llm_pairs])
+            results["generate_feedback"] = summarize(durations)
+
+        llm_placeholder = json.dumps({"match_score": 0, "missing_elements": []})
+        durations, aggregated = time_calls(aggregate_scores, [(h, s, llm_placeholder) for h, s in zip(hard_scores, semantic_scores)])
+        results["aggregate_scores"] = summarize(durations)
+
+        results["db_write"] = summarize(benchmark_db_writes(parsed_resumes, parsed_jds[0], jds[0], list(zip(hard_scores, semantic_scores, aggregated))))
+
+        if args.end_to_end > 0:
+            e2e_inputs = [(paths[r], os.path.basename(paths[r]), jds[j]) for r, j in pairs[:args.end_to_end]]
+            durations, _ = time_calls(run_evaluation, e2e_inputs)
+            results["end_to_end"] = summarize(durations)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "stages": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each resume-checker stage on a synthesized corpus.")
+    parser.add_argument("--resumes", type=int, default=1000, help="Number of resumes to synthesize")
+    parser.add_argument("--jds", type=int, default=100, help="Number of job descriptions to synthesize")
+    parser.add_argument("--formats", nargs="+", default=["pdf", "docx"], choices=["pdf", "docx"], help="Resume file formats to render")
+    parser.add_argument("--llm-samples", type=int, default=3, help="Pairs to run through the LLM stages (0 to skip)")
+    parser.add_argument("--end-to-end", type=int, default=10, help="Pairs to run through the full pipeline (0 to skip)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    # Embeddings computed here go to a throwaway store, not the application's chroma_db or VECTOR_STORE_DIR.
+    # Set before run() imports backend.semantic_matcher, which reads them at import time.
+    with tempfile.TemporaryDirectory(prefix="bench_vectors_", ignore_cleanup_errors=True) as vectors_dir:
+        os.environ["CHROMA_PERSIST_DIR"] = os.path.join(vectors_dir, "chroma_db")
+        os.environ["VECTOR_STORE_DIR"] = os.path.join(vectors_dir, "vector_store")
+        report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for stage, summary in report["stages"].items():
+        if summary.get("count"):
+            print(f"{stage:32s} n={summary['count']:6d}  p50={summary['p50_ms']:9.2f} ms  p95={summary['p95_ms']:9.2f} ms  {summary['throughput_per_s']:9.1f}/s")
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
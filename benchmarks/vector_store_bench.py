@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+# Allow running as `python benchmarks/vector_store_bench.py` from the repo root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.run_benchmarks import git_commit
+
+# Compares the flat memmap store (backend/vector_store.py) with Chroma on insert, lookup
+# by id, top-K search and memory. Each backend runs in its own subprocess so peak RSS
+# is measured in isolation. Vectors are random unit vectors of the MiniLM dimension.
+
+BACKENDS = ["flat-float16", "flat-int8", "chroma"]
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def directory_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total / (1024 * 1024)
+
+def random_vectors(count, dim, rng):
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+class FlatBackend:
+    def __init__(self, directory, dim, dtype):
+        from backend.vector_store import FlatVectorStore
+        self.store = FlatVectorStore(directory, dim=dim, dtype=dtype)
+
+    def add(self, ids, vectors):
+        self.store.add(ids, vectors)
+
+    def get(self, ids):
+        return self.store.get(ids)
+
+    def search(self, queries, k):
+        return self.store.search(queries, k)
+
+    def close(self):
+        self.store.close()
+
+class ChromaBackend:
+    def __init__(self, directory, dim):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=directory)
+        self.collection = self.client.get_or_create_collection(name="bench", metadata={"hnsw:space": "cosine"})
+
+    def add(self, ids, vectors):
+        self.collection.add(ids=list(ids), embeddings=vectors.tolist())
+
+    def get(self, ids):
+        return self.collection.get(ids=list(ids), include=["embeddings"])
+
+    def search(self, queries, k):
+        return self.collection.query(query_embeddings=queries.tolist(), n_results=k)
+
+    def close(self):
+        pass
+
+def throughput(count, seconds):
+    return count / seconds if seconds > 0 else 0.0
+
+def run_backend(args):
+    rng = np.random.default_rng(args.seed)
+    vectors = random_vectors(args.vectors, args.dim, rng)
+    ids = [f"doc_{i}" for i in range(args.vectors)]
+    results = {"backend": args.backend, "vectors": args.vectors, "dim": args.dim}
+    rss_before = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "chroma":
+            store = ChromaBackend(tmp, args.dim)
+        else:
+            store = FlatBackend(tmp, args.dim, args.backend.split("-", 1)[1])
+
+        # Single inserts are what the app does today: one vector per generate_and_store_embedding call
+        single = min(args.single_inserts, args.vectors)
+        start = time.perf_counter()
+        for i in range(single):
+            store.add([ids[i]], vectors[i:i + 1])
+        results["insert_single_per_s"] = throughput(single, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for offset in range(single, args.vectors, args.batch_size):
+            store.add(ids[offset:offset + args.batch_size], vectors[offset:offset + args.batch_size])
+        results["insert_batch_per_s"] = throughput(args.vectors - single, time.perf_counter() - start)
+
+        lookup_ids = random.Random(args.seed).sample(ids, min(args.lookups, len(ids)))
+        start = time.perf_counter()
+        for doc_id in lookup_ids:
+            store.get([doc_id])
+        results["lookup_per_s"] = throughput(len(lookup_ids), time.perf_counter() - start)
+
+        queries = random_vectors(args.queries, args.dim, rng)
+        start = time.perf_counter()
+        for offset in range(0, args.queries, args.query_batch):
+            store.search(queries[offset:offset + args.query_batch], args.k)
+        results["search_queries_per_s"] = throughput(args.queries, time.perf_counter() - start)
+
+        store.close()
+        results["disk_mb"] = directory_size_mb(tmp)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    results["rss_growth_mb"] = results["peak_rss_mb"] - rss_before
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the flat memmap vector store against Chroma.")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--vectors", type=int, default=100000, help="Vectors to insert")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Vectors per batched insert")
+    parser.add_argument("--single-inserts", type=int, default=1000, help="Vectors inserted one at a time before the batched inserts")
+    parser.add_argument("--lookups", type=int, default=1000, help="Lookups by id")
+    parser.add_argument("--queries", type=int, default=1000, help="Search queries")
+    parser.add_argument("--query-batch", type=int, default=32, help="Queries per search call")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="vector_store_bench.json", help="Where to write the JSON report")
+    parser.add_argument("--backend", help=argparse.SUPPRESS)  # Set when running as a per-backend subprocess
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        print(json.dumps(run_backend(args)))
+        return
+
+    results = []
+    for backend in args.backends:
+        command = [sys.executable, "-m", "benchmarks.vector_store_bench", "--backend", backend, *[
+            str(value) for value in (
+                "--vectors", args.vectors, "--dim", args.dim, "--batch-size", args.batch_size,
+                "--single-inserts", args.single_inserts, "--lookups", args.lookups, "--queries", args.queries,
+                "--query-batch", args.query_batch, "-k", args.k, "--seed", args.seed
+            )
+        ]]
+        cwd = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        completed = subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend}: failed\n{completed.stderr.strip()}")
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "backend"},
+        "backends": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        print(f"{r['backend']:14s} insert {r['insert_single_per_s']:9.1f}/s single {r['insert_batch_per_s']:10.1f}/s batched  "
+              f"lookup {r['lookup_per_s']:9.1f}/s  search {r['search_queries_per_s']:9.1f} q/s  "
+              f"rss +{r['rss_growth_mb']:7.1f} MB  disk {r['disk_mb']:7.1f} MB")
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
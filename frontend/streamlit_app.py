@@ -3,9 +3,14 @@ import requests
 import json
 import os
 import time
+import random
+import concurrent.futures
+from urllib3.exceptions import NewConnectionError
 
 # Backend API URL
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:5000")
+# Requests from the dashboard are served ahead of bulk/background work
+INTERACTIVE_HEADERS = {"X-Request-Priority": "interactive"}
 
 st.set_page_config(
     page_title="Resume-JD Matcher",
@@ -21,9 +26,18 @@ def call_backend_with_retry(method, url, files=None, json=None, data=None, retri
     for i in range(retries):
         try:
             if method == "post":
-                response = requests.post(url, files=files, json=json, data=data)
+                response = requests.post(url, files=files, json=json, data=data, headers=INTERACTIVE_HEADERS)
             elif method == "get":
-                response = requests.get(url)
+                response = requests.get(url, headers=INTERACTIVE_HEADERS)
+            if response.status_code == 429:
+                # The backend is at capacity and says when to come back
+                retry_after = int(response.headers.get("Retry-After", backoff_factor * (2 ** i)))
+                if i < retries - 1:
+                    st.warning(f"Backend is busy. Retrying in {retry_after} seconds...")
+                    time.sleep(retry_after)
+                    continue
+                st.error(f"Backend is busy. Please try again in {retry_after} seconds.")
+                st.stop()
             response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
             return response
         except requests.exceptions.ConnectionError:
@@ -38,8 +52,315 @@ def call_backend_with_retry(method, url, files=None, json=None, data=None, retri
             st.stop()
     return None # Should not be reached if st.stop() is called
 
+# Streams NDJSON events from the backend, calling on_event for each one as it arrives
+def stream_backend(url, files=None, data=None, on_event=None):
+    try:
+        with requests.post(url, files=files, data=data, stream=True, headers=INTERACTIVE_HEADERS) as response:
+            if response.status_code == 429:
+                st.error(f"Backend is busy. Please try again in {response.headers.get('Retry-After', 'a few')} seconds.")
+                return None
+            if response.status_code != 200:
+                st.error(f"Error during matching: {response.json().get('error', 'Unknown error')}")
+                return None
+            last_event = None
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                last_event = json.loads(line)
+                if on_event:
+                    on_event(last_event)
+            return last_event
+    except requests.exceptions.ConnectionError:
+        st.error(f"Backend not reachable at {BACKEND_URL}. Please ensure the backend is running and accessible.")
+        st.stop()
+    except requests.exceptions.RequestException as e:
+        st.error(f"An unexpected error occurred: {e}")
+        st.stop()
+
+# Labels for the streamed pipeline stages, in the order the backend emits them
+STAGE_LABELS = {
+    "parsed_resume": "Parsed Resume",
+    "parsed_jd": "Parsed Job Description",
+    "hard_match": "Hard Match Score",
+    "semantic_fit": "Semantic Fit Score",
+    "llm_analysis": "LLM Analysis",
+    "feedback": "Feedback",
+    "aggregate": "Final Result",
+}
+
+# Result browsing: the list is fetched a page of summary rows at a time and each
+# evaluation's full details only when its expander asks for them
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "50"))
+RESULTS_CACHE_TTL = int(os.getenv("RESULTS_CACHE_TTL", "60"))  # seconds
+
+def get_evaluations_page(before_id=None, after_id=None, query=None):
+    # Raises requests exceptions; callers report them
+    params = {"limit": RESULTS_PAGE_SIZE}
+    if before_id is not None:
+        params["before_id"] = before_id
+    if after_id is not None:
+        params["after_id"] = after_id
+    if query:
+        params["q"] = query
+    response = requests.get(f"{BACKEND_URL}/evaluations", params=params, headers=INTERACTIVE_HEADERS, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+# Reruns and repeated button presses within the TTL are served from the cache.
+# Checking for new evaluations goes straight to get_evaluations_page, since it must see fresh rows.
+@st.cache_data(ttl=RESULTS_CACHE_TTL, show_spinner=False)
+def cached_evaluations_page(before_id=None, query=None):
+    return get_evaluations_page(before_id=before_id, query=query)
+
+@st.cache_data(ttl=RESULTS_CACHE_TTL, show_spinner=False)
+def cached_evaluation_details(evaluation_id):
+    response = requests.get(f"{BACKEND_URL}/evaluations/{evaluation_id}", headers=INTERACTIVE_HEADERS, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def backend_error_message(error):
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return f"Backend not reachable at {BACKEND_URL}. Please ensure the backend is running and accessible."
+    if isinstance(error, requests.exceptions.HTTPError):
+        try:
+            return f"Error fetching results: {error.response.json().get('error', 'Unknown error')}"
+        except ValueError:
+            return f"Error fetching results: HTTP {error.response.status_code}"
+    return f"Error fetching results: {error}"
+
+def results_view(key):
+    # Rows loaded so far for one page of the dashboard, kept across reruns
+    if key not in st.session_state:
+        st.session_state[key] = {"key": key, "rows": None, "query": None, "next_before_id": None, "newest_id": None}
+    return st.session_state[key]
+
+def load_first_page(view, query=None):
+    try:
+        page_data = cached_evaluations_page(query=query)
+    except requests.exceptions.RequestException as e:
+        st.error(backend_error_message(e))
+        return
+    view["rows"] = list(page_data["evaluations"])
+    view["query"] = query
+    view["next_before_id"] = page_data["next_before_id"]
+    view["newest_id"] = view["rows"][0]["evaluation_id"] if view["rows"] else None
+
+def load_older(view):
+    try:
+        page_data = cached_evaluations_page(before_id=view["next_before_id"], query=view["query"])
+    except requests.exceptions.RequestException as e:
+        st.error(backend_error_message(e))
+        return
+    seen = {row["evaluation_id"] for row in view["rows"]}
+    view["rows"].extend(row for row in page_data["evaluations"] if row["evaluation_id"] not in seen)
+    view["next_before_id"] = page_data["next_before_id"]
+
+def load_newer(view):
+    # Only evaluations after the newest one on screen; returns how many were added
+    added = []
+    after_id = view["newest_id"] or 0
+    try:
+        while True:
+            page_data = get_evaluations_page(after_id=after_id, query=view["query"])
+            added.extend(page_data["evaluations"])
+            if not page_data["has_more"] or not page_data["evaluations"]:
+                break
+            after_id = page_data["evaluations"][-1]["evaluation_id"]
+    except requests.exceptions.RequestException as e:
+        st.error(backend_error_message(e))
+    if added:
+        # Pages come back oldest first; the list shows newest first
+        view["rows"][:0] = reversed(added)
+        view["newest_id"] = added[-1]["evaluation_id"]
+    return len(added)
+
+def render_evaluation_details(evaluation_id):
+    try:
+        details = cached_evaluation_details(evaluation_id)
+    except requests.exceptions.RequestException as e:
+        st.error(backend_error_message(e))
+        return
+    if details.get('improvement_suggestions'):
+        st.write("**Missing Elements & Suggestions:**")
+        for item in details['improvement_suggestions']:
+            st.markdown(f"- **{item['element']}**: {item['suggestion']}")
+    st.json(details, expanded=False)
+
+def render_results_view(view, empty_message="No evaluation results found yet."):
+    if view["rows"] is None:
+        return
+    key = view["key"]
+    if st.button("Check for New Results", key=f"newer_{key}"):
+        st.toast(f"{load_newer(view)} new evaluation(s)")
+    if not view["rows"]:
+        st.info(empty_message)
+        return
+
+    st.caption(f"Showing {len(view['rows'])} evaluation(s), newest first")
+    for eval_result in view["rows"]:
+        evaluation_id = eval_result['evaluation_id']
+        st.subheader(f"Evaluation ID: {evaluation_id} (Score: {eval_result['final_relevance_score']}%)")
+        st.write(f"Suitability: {eval_result['suitability_verdict']}")
+        st.write(f"Resume Filename: {eval_result['resume_filename']}")
+        st.write(f"JD Role: {eval_result['jd_role_title']}")
+        with st.expander("Details and Suggestions"):
+            # Collapsed expanders still run their body, so the fetch waits for the checkbox
+            if st.checkbox("Load details", key=f"details_{key}_{evaluation_id}"):
+                render_evaluation_details(evaluation_id)
+        st.markdown("---")
+
+    if view["next_before_id"] is not None and st.button("Load More", key=f"older_{key}"):
+        with st.spinner("Fetching more results..."):
+            load_older(view)
+        st.rerun()
+
+# Bulk matching: many resumes against one JD, sent concurrently in the backend's bulk lane
+# so they queue behind interactive requests instead of competing with them
+BULK_HEADERS = {"X-Request-Priority": "bulk"}
+BULK_MAX_WORKERS = int(os.getenv("BULK_MAX_WORKERS", "4"))
+BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", "5"))
+BULK_BACKOFF_BASE = float(os.getenv("BULK_BACKOFF_BASE", "1.0"))  # seconds
+BULK_BACKOFF_MAX = float(os.getenv("BULK_BACKOFF_MAX", "30.0"))  # seconds
+BULK_REQUEST_TIMEOUT = int(os.getenv("BULK_REQUEST_TIMEOUT", "300"))  # seconds
+# Bulk matches opt in to the backend's LLM cascade: resumes scoring below this get a templated analysis
+BULK_CASCADE_THRESHOLD = float(os.getenv("BULK_CASCADE_THRESHOLD", "50"))
+
+class BulkRequestError(Exception):
+    pass
+
+@st.cache_resource
+def bulk_http_session():
+    # One keep-alive connection per worker, shared across reruns
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=BULK_MAX_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(BULK_HEADERS)
+    return session
+
+def bulk_backoff(attempt, retry_after=None):
+    # Full jitter, so workers throttled together do not come back together.
+    # A Retry-After from the backend is the floor.
+    delay = random.uniform(0, min(BULK_BACKOFF_MAX, BULK_BACKOFF_BASE * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay += float(retry_after)
+        except ValueError:
+            pass
+    return delay
+
+def request_not_sent(error):
+    # True only when the connection was never made, so the POST cannot have been processed.
+    # A read timeout or a dropped connection may come after the backend saved the evaluation.
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    cause = error.args[0] if error.args else None
+    return isinstance(getattr(cause, "reason", cause), NewConnectionError)
+
+def bulk_post(url, on_retry=None, **kwargs):
+    # Runs on worker threads, so it reports through on_retry and exceptions rather than st.*.
+    # Retries 429s, 5xx responses and failed connects; other errors are not retried (POSTs save results).
+    session = bulk_http_session()
+    for attempt in range(BULK_MAX_ATTEMPTS):
+        try:
+            response = session.post(url, timeout=BULK_REQUEST_TIMEOUT, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if not request_not_sent(e):
+                raise BulkRequestError(f"{type(e).__name__}; not retried, as the backend may already have saved the result")
+            reason, retry_after = type(e).__name__, None
+        else:
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            reason, retry_after = f"HTTP {response.status_code}", response.headers.get("Retry-After")
+        if attempt == BULK_MAX_ATTEMPTS - 1:
+            raise BulkRequestError(f"{reason} after {BULK_MAX_ATTEMPTS} attempts")
+        delay = bulk_backoff(attempt, retry_after)
+        if on_retry:
+            on_retry(attempt + 1, reason, delay)
+        time.sleep(delay)
+
+def response_error(response):
+    try:
+        return response.json().get("error", "Unknown error")
+    except ValueError:
+        return f"HTTP {response.status_code}"
+
+def match_resume_bulk(name, content, mime_type, data, on_retry=None):
+    response = bulk_post(
+        f"{BACKEND_URL}/aggregate_match_results",
+        files={"resume_file": (name, content, mime_type)},
+        data=data,
+        on_retry=on_retry
+    )
+    if response.status_code != 200:
+        raise BulkRequestError(response_error(response))
+    return response.json()
+
+def bulk_result_row(name, status, result=None, error=None):
+    aggregate = (result or {}).get("results") or {}
+    return {
+        "File": name,
+        "Status": status,
+        "Final Score": aggregate.get("final_relevance_score"),
+        "Verdict": aggregate.get("suitability_verdict"),
+        "Evaluation ID": (result or {}).get("evaluation_id"),
+        "Error": error,
+    }
+
+def sorted_bulk_rows(rows):
+    # Scored files first, best first; pending and failed files after them
+    return sorted(rows.values(), key=lambda row: (row["Final Score"] is None, -(row["Final Score"] or 0), row["File"]))
+
+def run_bulk_match(uploaded_files, data, progress, status, table):
+    # The JD is registered once up front; every resume then refers to it by jd_id
+    response = bulk_post(f"{BACKEND_URL}/upload_jd", json={"job_description": data.pop("job_description_text")})
+    if response.status_code != 200:
+        raise BulkRequestError(f"Error registering job description: {response_error(response)}")
+    data["jd_id"] = response.json()["jd_id"]
+
+    # Keyed by upload position, since two files may share a name
+    rows = {index: bulk_result_row(uploaded.name, "Queued") for index, uploaded in enumerate(uploaded_files)}
+    # Workers only write their status here; the table is redrawn from this thread
+    worker_status = {}
+
+    def match_one(index, name, content, mime_type):
+        worker_status[index] = "Processing"
+
+        def on_retry(attempt, reason, delay):
+            worker_status[index] = f"Retry {attempt} ({reason}, waiting {delay:.1f}s)"
+        return match_resume_bulk(name, content, mime_type, dict(data), on_retry)
+
+    finished = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(match_one, index, uploaded.name, uploaded.getvalue(), uploaded.type): index
+            for index, uploaded in enumerate(uploaded_files)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=0.5, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                worker_status.pop(index, None)
+                name = rows[index]["File"]
+                try:
+                    rows[index] = bulk_result_row(name, "Done", result=future.result())
+                except Exception as e:
+                    rows[index] = bulk_result_row(name, "Failed", error=str(e))
+                finished += 1
+            for index, worker_state in list(worker_status.items()):
+                rows[index]["Status"] = worker_state
+            progress.progress(finished / len(futures), text=f"{finished} of {len(futures)} resumes processed")
+            table.dataframe(sorted_bulk_rows(rows), use_container_width=True, hide_index=True)
+    failed = sum(1 for row in rows.values() if row["Status"] == "Failed")
+    if failed:
+        status.warning(f"Finished with {failed} failed file(s) out of {len(rows)}.")
+    else:
+        status.success(f"All {len(rows)} resumes matched.")
+    return sorted_bulk_rows(rows)
+
 # --- Sidebar Navigation ---
-page = st.sidebar.radio("Navigation", ["Upload JD", "Upload Resume & Match", "View Results", "Search & Review"])
+page = st.sidebar.radio("Navigation", ["Upload JD", "Upload Resume & Match", "Bulk Match", "View Results", "Search & Review"])
 
 # --- Page Content ---
 if page == "Upload JD":
@@ -69,9 +390,54 @@ elif page == "Upload Resume & Match":
     
     hard_match_weight = st.slider("Hard Match Weight", 0.0, 1.0, 0.5, 0.1)
     semantic_match_weight = st.slider("Semantic Match Weight", 0.0, 1.0, 0.5, 0.1)
+    stream_results = st.checkbox("Show results as each stage finishes", value=True)
 
     if st.button("Match Resume to JD"):
-        if uploaded_resume_file and jd_text_for_match:
+        if uploaded_resume_file and jd_text_for_match and stream_results:
+            files = {"resume_file": (uploaded_resume_file.name, uploaded_resume_file.getvalue(), uploaded_resume_file.type)}
+            data = {
+                "job_description_text": jd_text_for_match,
+                "hard_match_weight": hard_match_weight,
+                "semantic_match_weight": semantic_match_weight
+            }
+            status = st.empty()
+            score_columns = st.columns(2)
+            hard_match_placeholder = score_columns[0].empty()
+            semantic_placeholder = score_columns[1].empty()
+            stage_results = {}
+
+            def show_event(event):
+                stage = event.get("stage")
+                if stage == "error":
+                    status.error(f"Error during matching: {event.get('error', 'Unknown error')}")
+                    return
+                if stage == "saved":
+                    status.success(f"Matching completed successfully! Evaluation ID: {event.get('evaluation_id')}")
+                    return
+                stage_results[stage] = event.get("result")
+                status.info(f"Received: {STAGE_LABELS.get(stage, stage)}")
+                if stage == "hard_match":
+                    hard_match_placeholder.metric("Hard Match", f"{event['result']}%")
+                elif stage == "semantic_fit":
+                    # No result means the stage ran out of request time
+                    semantic_placeholder.metric("Semantic Fit", f"{event['result']}%" if event.get("result") is not None else "Timed out")
+                elif stage == "aggregate":
+                    st.subheader(f"Final Score: {event['result']['final_relevance_score']}% ({event['result']['suitability_verdict']})")
+                    if event["result"].get("partial"):
+                        st.warning(f"Partial result: {', '.join(event['result'].get('timed_out_stages', []))} ran out of time.")
+                    st.json(event["result"])
+                else:
+                    with st.expander(STAGE_LABELS.get(stage, stage)):
+                        st.json(event.get("result"))
+
+            status.info("Matching Resume to Job Description...")
+            last_event = stream_backend(f"{BACKEND_URL}/aggregate_match_results/stream", files=files, data=data, on_event=show_event)
+            if last_event and last_event.get("stage") == "saved":
+                st.session_state['last_match_result'] = {
+                    "evaluation_id": last_event.get("evaluation_id"),
+                    "results": stage_results.get("aggregate")
+                }
+        elif uploaded_resume_file and jd_text_for_match:
             with st.spinner("Matching Resume to Job Description..."):
                 files = {"resume_file": (uploaded_resume_file.name, uploaded_resume_file.getvalue(), uploaded_resume_file.type)}
                 data = {
@@ -91,67 +457,59 @@ elif page == "Upload Resume & Match":
         else:
             st.warning("Please upload a resume and paste the job description text.")
 
+elif page == "Bulk Match":
+    st.header("Match Many Resumes Against One JD")
+
+    uploaded_resume_files = st.file_uploader("Upload Resumes (PDF/DOCX)", type=["pdf", "docx"], accept_multiple_files=True)
+    jd_text_for_bulk = st.text_area("Paste Job Description Text for Matching:", height=200)
+
+    hard_match_weight = st.slider("Hard Match Weight", 0.0, 1.0, 0.5, 0.1)
+    semantic_match_weight = st.slider("Semantic Match Weight", 0.0, 1.0, 0.5, 0.1)
+    st.caption(f"Up to {BULK_MAX_WORKERS} resumes are processed at a time; busy or failing requests are retried.")
+
+    if st.button("Match All Resumes"):
+        if uploaded_resume_files and jd_text_for_bulk:
+            data = {
+                "job_description_text": jd_text_for_bulk,
+                "hard_match_weight": hard_match_weight,
+                "semantic_match_weight": semantic_match_weight,
+                "cascade_threshold": BULK_CASCADE_THRESHOLD
+            }
+            status = st.empty()
+            progress = st.progress(0.0, text=f"0 of {len(uploaded_resume_files)} resumes processed")
+            table = st.empty()
+            status.info("Matching resumes...")
+            try:
+                st.session_state['bulk_results'] = run_bulk_match(uploaded_resume_files, data, progress, status, table)
+            except BulkRequestError as e:
+                status.error(str(e))
+        else:
+            st.warning("Please upload at least one resume and paste the job description text.")
+    elif st.session_state.get('bulk_results'):
+        # Results of the last run, kept across reruns; click a column header to sort
+        st.dataframe(st.session_state['bulk_results'], use_container_width=True, hide_index=True)
+
 elif page == "View Results":
     st.header("View All Evaluation Results")
 
-    if st.button("Fetch All Results"):
+    view = results_view("view_results")
+    if st.button("Fetch Results") or view["rows"] is None:
         with st.spinner("Fetching results from database..."):
-            response = call_backend_with_retry("get", f"{BACKEND_URL}/evaluations")
-            if response:
-                if response.status_code == 200:
-                    evaluations = response.json()
-                    if evaluations:
-                        for eval_result in evaluations:
-                            st.subheader(f"Evaluation ID: {eval_result['id']} (Score: {eval_result['final_relevance_score']}%)")
-                            st.write(f"Suitability: {eval_result['suitability_verdict']}")
-                            st.write(f"Resume Filename: {eval_result['resume_filename']}")
-                            st.write(f"JD Role: {eval_result['jd_role_title']}")
-                            with st.expander("Details"):
-                                st.json(eval_result)
-                            st.markdown("---")
-                    else:
-                        st.info("No evaluation results found yet.")
-                else:
-                    st.error(f"Error fetching results: {response.json().get('error', 'Unknown error')}")
+            load_first_page(view)
+    render_results_view(view)
 
 elif page == "Search & Review":
     st.header("Search and Review Candidate Suggestions")
 
-    search_query = st.text_input("Search by JD Role Title or Resume Filename:")
-    
+    search_query = st.text_input("Search by JD Role Title or Resume Filename:").strip()
+    view = results_view("search_results")
+
     if st.button("Search Evaluations"):
         if search_query:
             with st.spinner(f"Searching for '{search_query}'..."):
-                # This would ideally be a dedicated search endpoint, but for simplicity
-                # we'll fetch all and filter in frontend for now.
-                # In a real app, optimize this with backend search.
-                response = call_backend_with_retry("get", f"{BACKEND_URL}/evaluations")
-                if response:
-                    if response.status_code == 200:
-                        all_evaluations = response.json()
-                        search_results = [
-                            e for e in all_evaluations 
-                            if search_query.lower() in e.get('jd_role_title', '').lower() or \
-                               search_query.lower() in e.get('resume_filename', '').lower()
-                        ]
-
-                        if search_results:
-                            st.subheader(f"Found {len(search_results)} results for '{search_query}':")
-                            for eval_result in search_results:
-                                st.subheader(f"Evaluation ID: {eval_result['id']} (Score: {eval_result['final_relevance_score']}%)")
-                                st.write(f"Suitability: {eval_result['suitability_verdict']}")
-                                st.write(f"Resume Filename: {eval_result['resume_filename']}")
-                                st.write(f"JD Role: {eval_result['jd_role_title']}")
-                                with st.expander("Details and Suggestions"):
-                                    st.json(eval_result)
-                                    if eval_result.get('missing_elements'):
-                                        st.write("**Missing Elements & Suggestions:**")
-                                        for item in eval_result['missing_elements']:
-                                            st.markdown(f"- **{item['element']}**: {item['suggestion']}")
-                                st.markdown("---")
-                        else:
-                            st.info(f"No results found for '{search_query}'.")
-                    else:
-                        st.error(f"Error fetching evaluations for search: {response.json().get('error', 'Unknown error')}")
+                load_first_page(view, search_query)
         else:
             st.warning("Please enter a search query.")
+    if view["query"]:
+        st.subheader(f"Results for '{view['query']}':")
+        render_results_view(view, empty_message=f"No results found for '{view['query']}'.")
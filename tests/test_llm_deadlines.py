@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Importing llm_analyzer loads distilgpt2 unless models are served remotely; the tests swap in
+# a fake generator, so point the client at a socket that is never used
+os.environ.setdefault("MODEL_SERVER_SOCKET", "/nonexistent/resume_checker_models.sock")
+pytest.importorskip("transformers")
+
+from backend import deadlines, llm_analyzer
+from backend.deadlines import DeadlineExceeded
+
+FULL_OUTPUT = '{\n    "match_score": 80, "missing_elements": []}\n'
+
+class FakeGenerator:
+    # Finishes in GENERATION_S unless max_time stops it first, like MaxTimeCriteria
+    GENERATION_S = 0.5
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompts, max_new_tokens, num_return_sequences, batch_size, max_time=None):
+        self.calls.append((list(prompts), max_time))
+        if max_time is not None and max_time < self.GENERATION_S:
+            time.sleep(max_time)
+            return [[{"generated_text": prompt + ' {\n    "match'}] for prompt in prompts]
+        time.sleep(self.GENERATION_S)
+        return [[{"generated_text": prompt + " " + FULL_OUTPUT}] for prompt in prompts]
+
+@pytest.fixture
+def fake_generator(monkeypatch):
+    generator = FakeGenerator()
+    monkeypatch.setattr(llm_analyzer, "text_generator", generator)
+    monkeypatch.setattr(llm_analyzer, "LLM_MIN_TIME_S", 0.0)
+    # Long enough for both requests to land in one micro-batch
+    monkeypatch.setattr(llm_analyzer.generation_batcher, "max_wait", 0.2)
+    return generator
+
+def generate_with_budget(prompt, budget_s, results):
+    with deadlines.budget(budget_s):
+        try:
+            results[prompt] = llm_analyzer.generate_within_deadline(prompt, "llm_analysis")
+        except DeadlineExceeded as e:
+            results[prompt] = e
+
+def test_co_batched_requests_keep_their_own_deadlines(fake_generator):
+    results = {}
+    threads = [
+        threading.Thread(target=generate_with_budget, args=("short", 0.25, results)),
+        threading.Thread(target=generate_with_budget, args=("long", 30, results)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(results["short"], DeadlineExceeded)
+    assert results["long"].endswith(FULL_OUTPUT)
+    # Both arrived in one batch but were generated separately, each bounded by its own deadline
+    assert sorted(prompts for prompts, _ in fake_generator.calls) == [["long"], ["short"]]
+    assert all(max_time > FakeGenerator.GENERATION_S for prompts, max_time in fake_generator.calls if prompts == ["long"])
+
+def test_request_cut_short_in_its_group_raises(fake_generator, monkeypatch):
+    # Deadlines within LLM_DEADLINE_GROUP_S share a generation; one that is stopped by a
+    # neighbour's deadline is reported as timed out, not returned as truncated output
+    monkeypatch.setattr(llm_analyzer, "LLM_DEADLINE_GROUP_S", 10.0)
+    now = time.monotonic()
+    outputs = llm_analyzer._generate_batch([("a", now + 0.2), ("b", now + 5)])
+    assert [cut_short for _, cut_short in outputs] == [True, True]
+
+def test_group_by_deadline():
+    now = time.monotonic()
+    requests = [("a", None), ("b", now + 10), ("c", now + 1), ("d", now + 1.5), ("e", None)]
+    assert llm_analyzer.group_by_deadline(requests) == [[2, 3], [1], [0, 4]]
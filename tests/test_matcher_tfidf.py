@@ -0,0 +1,53 @@
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# calculate_tfidf_similarity replaced a TfidfVectorizer fit per pair; it must keep giving the same scores
+np = pytest.importorskip("numpy")
+pytest.importorskip("rank_bm25")
+pytest.importorskip("fuzzywuzzy")
+feature_extraction = pytest.importorskip("sklearn.feature_extraction.text")
+pairwise = pytest.importorskip("sklearn.metrics.pairwise")
+
+from backend.matcher import PreparedField, calculate_tfidf_similarity
+
+PAIRS = 2000
+WORDS = [
+    "python", "java", "sql", "aws", "docker", "kubernetes", "machine", "learning", "data", "analysis",
+    "c", "r", "go", "C++", "Node.js", "B.Sc.", "M.Tech", "5+", "years", "experience", "team", "lead",
+    "Computer", "Science", "engineering", "REST", "APIs", "x", "2", "3.5", "", "  ", "--", "ML/AI",
+]
+
+def sklearn_tfidf_similarity(resume_items, jd_items):
+    # The implementation this function replaced, on the same normalized items
+    if not resume_items or not jd_items:
+        return 0.0
+    try:
+        tfidf_matrix = feature_extraction.TfidfVectorizer().fit_transform(resume_items + jd_items)
+    except ValueError:  # Empty vocabulary
+        return 0.0
+    resume_vector = np.asarray(tfidf_matrix[:len(resume_items)].sum(axis=0))
+    jd_vector = np.asarray(tfidf_matrix[len(resume_items):].sum(axis=0))
+    return pairwise.cosine_similarity(resume_vector, jd_vector)[0][0] * 100
+
+def random_items(rng):
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(0, 8))]
+
+def test_tfidf_similarity_matches_sklearn():
+    rng = random.Random(41)
+    for _ in range(PAIRS):
+        resume_field = PreparedField.from_items(random_items(rng))
+        jd_field = PreparedField.from_items(random_items(rng))
+        expected = sklearn_tfidf_similarity(resume_field.items, jd_field.items)
+        assert calculate_tfidf_similarity(resume_field, jd_field) == pytest.approx(expected, abs=1e-9)
+
+def test_tfidf_similarity_survives_serialized_fields():
+    # JD fields usually come from stored artifacts (PreparedField.to_dict/from_dict)
+    resume_field = PreparedField.from_items(["Python, SQL and AWS", "Docker"])
+    jd_field = PreparedField.from_dict(PreparedField.from_items(["python", "Kubernetes and Docker"]).to_dict())
+    expected = sklearn_tfidf_similarity(resume_field.items, jd_field.items)
+    assert calculate_tfidf_similarity(resume_field, jd_field) == pytest.approx(expected, abs=1e-9)